@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+#  -*- coding: utf-8 -*-
+
+"""Benchmark the block-oriented RLE against the original per-byte version.
+
+Run from the project root: python3 -m benchmarks.rle [FILE]
+Without a file, 4 MB of move-to-front like data is generated.
+"""
+
+import io
+import random
+import sys
+import time
+
+from multipack.bwt import rle_encode, rle_decode
+from multipack.stages import read_chunks
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def reference_rle_encode(byte_arr):
+    """The original RLE encoder, which takes one byte at a time."""
+    output = b""
+    streak = 1
+    try:
+        prev = next(byte_arr)
+    except StopIteration:
+        return b""
+    while True:
+        try:
+            char = next(byte_arr)
+        except StopIteration:
+            break
+        if char == prev and streak < 255:
+            streak += 1
+        else:
+            output += prev + bytes([streak])
+            streak = 1
+        prev = char
+
+    output += prev + bytes([streak])
+    return output
+
+
+def reference_rle_decode(stream):
+    """The original RLE decoder, which yields one byte at a time."""
+    while True:
+        byte = stream.read(1)
+        if not byte:
+            break
+        count = int.from_bytes(stream.read(1), byteorder="little")
+        for i in range(count):
+            yield byte
+
+
+def generate(size):
+    """Generate data with zero runs and small values, like MTF output."""
+    rand = random.Random(0)
+    output = bytearray()
+    while len(output) < size:
+        output += bytes(rand.choice((1, 1, 2, 5, 40, 300)))
+        length = rand.randrange(8)
+        output += bytes(rand.randrange(1, 20) for _ in range(length))
+    return bytes(output[:size])
+
+
+def measure(function):
+    """Run the function and return its result and the elapsed seconds."""
+    start_ts = time.time()
+    result = function()
+    return result, time.time() - start_ts
+
+
+def main():
+    """Print encoding and decoding times for both implementations."""
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb") as in_stream:
+            data = in_stream.read()
+    else:
+        data = generate(4 * 1024 * 1024)
+    chunks = list(read_chunks(io.BytesIO(data), CHUNK_SIZE))
+
+    old, old_enc = measure(lambda: reference_rle_encode(
+        bytes([byte]) for byte in data))
+    new, new_enc = measure(lambda: b"".join(rle_encode(chunks)))
+    if old != new:
+        raise Exception("Encoded outputs differ.")
+
+    _, old_dec = measure(lambda: b"".join(
+        reference_rle_decode(io.BytesIO(old))))
+    decoded, new_dec = measure(lambda: b"".join(rle_decode(
+        read_chunks(io.BytesIO(new), CHUNK_SIZE))))
+    if decoded != data:
+        raise Exception("Decoded output differs from the input.")
+
+    print("Input size: {:.1f} KB, encoded {:.1f} KB".format(
+        len(data) / 1024, len(new) / 1024))
+    print("encode: {:.0f} ms -> {:.0f} ms ({:.1f}x)".format(
+        old_enc * 1000, new_enc * 1000, old_enc / new_enc))
+    print("decode: {:.0f} ms -> {:.0f} ms ({:.1f}x)".format(
+        old_dec * 1000, new_dec * 1000, old_dec / new_dec))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 
-from multipack.compress import main
+from multipack.__main__ import main
 
 if __name__ == "__main__":
     main()
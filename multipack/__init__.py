@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+#  -*- coding: utf-8 -*-
+
+"""Compression with LZW and BWT.
+
+compress() and decompress() work on bytes, compress_stream() and
+decompress_stream() on binary streams, and compress_file() and
+decompress_file() on files. open() returns a file object of a compressed
+file, like gzip.open(). The command line is in the cli module.
+"""
+
+from multipack.api import compress, decompress, compress_stream, \
+    decompress_stream, compress_file, decompress_file
+from multipack.mpfile import MultipackFile, open
+
+__all__ = ["compress", "decompress", "compress_stream", "decompress_stream",
+           "compress_file", "decompress_file", "MultipackFile", "open"]
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+#  -*- coding: utf-8 -*-
+
+"""Command line entry point: python3 -m multipack"""
+
+import sys
+
+
+def main():
+    """Run the search command, or compression with the other arguments."""
+    if sys.argv[1:2] == ["search"]:
+        from multipack.search import main as search_main
+        search_main(sys.argv[2:])
+    else:
+        from multipack.cli import main as cli_main
+        cli_main(sys.argv[1:])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+#  -*- coding: utf-8 -*-
+
+"""Compression functions for use in other programs.
+
+The functions compress to the container format and uncompress it. Unlike the
+command line, they don't parse arguments, print anything or remove files. The
+codec options are:
+
+* block_size: size of the independently compressed blocks in bytes, the
+  segment size for LZW and the block size for BWT.
+* max_bits: maximum width of the LZW codes.
+* reset: clear the LZW dictionary when the compression ratio drops.
+* fm_index: store the BWT blocks with an FM-index for searching.
+"""
+
+import io
+import os
+
+from multipack.bwt import BLOCK_SIZE, MIN_BLOCK_SIZE, MAX_BLOCK_SIZE
+from multipack.container import LzwParams, BwtParams, \
+    compress_stream as compress_container, uncompress_stream, \
+    uncompressed_blocks
+from multipack.fmindex import SAMPLE_RATE
+from multipack.lzw import MIN_BITS, MAX_BITS, SEGMENT_SIZE
+
+SUFFIXES = (".lzw", ".bwt")
+
+
+def compress(data, codec="bwt", jobs=1, **options):
+    """Compress bytes.
+    :param data: bytes-like object.
+    :param codec: "lzw" or "bwt".
+    :param jobs: number of processes compressing the blocks.
+    :param options: codec options.
+    :return: compressed bytes.
+    """
+    with io.BytesIO(data) as in_stream, io.BytesIO() as out_stream:
+        compress_stream(in_stream, out_stream, codec, jobs, **options)
+        return out_stream.getvalue()
+
+
+def decompress(data, jobs=1, skip_corrupted=False):
+    """Uncompress bytes.
+    :param data: bytes-like object of compressed data.
+    :param jobs: number of processes decoding the blocks.
+    :param skip_corrupted: leave out damaged blocks instead of raising.
+    :return: uncompressed bytes.
+    :raises ValueError: if the data is not compressed or is damaged.
+    """
+    with io.BytesIO(data) as in_stream, io.BytesIO() as out_stream:
+        decompress_stream(in_stream, out_stream, jobs, skip_corrupted)
+        return out_stream.getvalue()
+
+
+def compress_stream(in_stream, out_stream, codec="bwt", jobs=1, **options):
+    """Compress a binary stream to another. The input is read in blocks, so
+    the memory use doesn't depend on the length of the stream.
+    :param in_stream: binary input stream.
+    :param out_stream: binary output stream.
+    :param codec: "lzw" or "bwt".
+    :param jobs: number of processes compressing the blocks.
+    :param options: codec options.
+    :return: tuple of the lengths of the input and the output.
+    """
+    return compress_container(in_stream, out_stream, codec,
+                              codec_params(codec, **options), jobs)
+
+
+def decompress_stream(in_stream, out_stream, jobs=1, skip_corrupted=False):
+    """Uncompress a binary stream to another. A seekable stream is read from
+    its start.
+    :param in_stream: binary input stream of a container.
+    :param out_stream: binary output stream.
+    :param jobs: number of processes decoding the blocks.
+    :param skip_corrupted: leave out damaged blocks instead of raising.
+    :return: list of the numbers of the left out blocks.
+    :raises ValueError: if the data is not compressed or is damaged.
+    """
+    _rewind(in_stream)
+    return uncompress_stream(in_stream, out_stream, skip_corrupted, jobs)
+
+
+def decompressed_chunks(in_stream, jobs=1):
+    """Uncompress a binary stream lazily. A seekable stream is read from its
+    start, and the data is read only as the chunks are taken.
+    :param in_stream: binary input stream of a container.
+    :param jobs: number of processes decoding the blocks.
+    :return: generator of uncompressed chunks.
+    :raises ValueError: if the data is not compressed, or later from the
+    generator, if it is damaged.
+    """
+    _rewind(in_stream)
+    return uncompressed_blocks(in_stream, jobs)
+
+
+def _rewind(in_stream):
+    """Move a seekable stream to its start."""
+    if in_stream.seekable():
+        in_stream.seek(0)
+
+
+def compress_file(filename, out_name=None, codec="bwt", jobs=1, **options):
+    """Compress a file. The original file is kept.
+    :param filename: name of the file.
+    :param out_name: name of the compressed file, the name of the file with
+    the codec as the suffix by default.
+    :param codec: "lzw" or "bwt".
+    :param jobs: number of processes compressing the blocks.
+    :param options: codec options.
+    :return: name of the compressed file.
+    """
+    if out_name is None:
+        out_name = filename + "." + codec
+    with open(filename, "rb") as in_stream:
+        with open(out_name, "wb") as out_stream:
+            compress_stream(in_stream, out_stream, codec, jobs, **options)
+    return out_name
+
+
+def decompress_file(filename, out_name=None, jobs=1, skip_corrupted=False):
+    """Uncompress a file. The compressed file is kept.
+    :param filename: name of the compressed file.
+    :param out_name: name of the uncompressed file, the name of the
+    compressed file without the suffix by default.
+    :param jobs: number of processes decoding the blocks.
+    :param skip_corrupted: leave out damaged blocks instead of raising.
+    :return: name of the uncompressed file.
+    :raises ValueError: if the file is not compressed or is damaged, or the
+    output name is not given and the suffix is not .lzw or .bwt.
+    """
+    if out_name is None:
+        out_name, suffix = os.path.splitext(filename)
+        if suffix not in SUFFIXES:
+            raise ValueError("Unknown suffix of {}, expected .lzw or .bwt."
+                             .format(filename))
+    with open(filename, "rb") as in_stream:
+        with open(out_name, "wb") as out_stream:
+            decompress_stream(in_stream, out_stream, jobs, skip_corrupted)
+    return out_name
+
+
+def codec_params(codec, block_size=None, max_bits=MAX_BITS, reset=False,
+                 fm_index=False):
+    """Check the codec options and create the container parameters.
+    :param codec: "lzw" or "bwt".
+    :param block_size: block size in bytes, the default of the codec if None.
+    :param max_bits: maximum width of the LZW codes.
+    :param reset: clear the LZW dictionary when the compression ratio drops.
+    :param fm_index: store the BWT blocks with an FM-index for searching.
+    :return: LzwParams or BwtParams.
+    :raises ValueError: if an option is not valid for the codec.
+    """
+    if codec == "lzw":
+        if fm_index:
+            raise ValueError("The FM-index is only for BWT.")
+        if not MIN_BITS <= max_bits <= MAX_BITS:
+            raise ValueError("Code width must be between {} and {} bits."
+                             .format(MIN_BITS, MAX_BITS))
+        block_size = SEGMENT_SIZE if block_size is None else block_size
+        if block_size < 1:
+            raise ValueError("Segment size must be positive.")
+        return LzwParams(block_size, max_bits, reset)
+    if codec == "bwt":
+        if max_bits != MAX_BITS or reset:
+            raise ValueError("Code width and reset are only for LZW.")
+        block_size = BLOCK_SIZE if block_size is None else block_size
+        if not MIN_BLOCK_SIZE <= block_size <= MAX_BLOCK_SIZE:
+            raise ValueError("Block size must be between {} and {} bytes."
+                             .format(MIN_BLOCK_SIZE, MAX_BLOCK_SIZE))
+        return BwtParams(block_size, SAMPLE_RATE if fm_index else 0)
+    raise ValueError("Unknown codec: {}".format(codec))
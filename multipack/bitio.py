@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+#  -*- coding: utf-8 -*-
+
+"""Bit-level writing and reading of integers of any width.
+
+The bits are packed most significant bit first, so a stream of 8-bit values is
+the same as the bytes themselves. Many values of the same width are packed
+and unpacked in one pass with write_many and read_many, which use NumPy when
+it is installed.
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from multipack.stages import read_exact
+
+REFILL_BYTES = 7
+
+
+class BitWriter:
+    """Pack integers of given widths to bytes."""
+
+    def __init__(self):
+        self.output = bytearray()
+        self.bits = 0
+        self.count = 0
+
+    def write(self, value, width):
+        """Append the lowest width bits of a value.
+        :param value: non-negative integer below 2 ** width.
+        :param width: number of bits.
+        """
+        self.bits = self.bits << width | value
+        self.count += width
+        if self.count >= 64:
+            whole = self.count >> 3
+            self.count &= 7
+            self.output += (self.bits >> self.count).to_bytes(whole, "big")
+            self.bits &= (1 << self.count) - 1
+
+    def write_many(self, values, width):
+        """Append many values of the same width.
+        :param values: sequence of non-negative integers below 2 ** width.
+        :param width: number of bits of every value, at most 32.
+        """
+        if not values:
+            return
+        if numpy is not None:
+            bits = _pack_numpy(values, width)
+        else:
+            bits = _pack_string(values, width)
+        self.bits = self.bits << (len(values) * width) | bits
+        self.count += len(values) * width
+        whole = self.count >> 3
+        self.count &= 7
+        self.output += (self.bits >> self.count).to_bytes(whole, "big")
+        self.bits &= (1 << self.count) - 1
+
+    def take(self):
+        """Remove and return the complete bytes written so far. Up to seven
+        bits may stay in the writer.
+        :return: bytes.
+        """
+        whole = self.count >> 3
+        self.count &= 7
+        self.output += (self.bits >> self.count).to_bytes(whole, "big")
+        self.bits &= (1 << self.count) - 1
+        output = bytes(self.output)
+        self.output.clear()
+        return output
+
+    def flush(self):
+        """Pad the last byte with zero bits and return all the remaining
+        bytes.
+        :return: bytes.
+        """
+        padding = -self.count & 7
+        self.bits <<= padding
+        self.count += padding
+        return self.take()
+
+
+class BitReader:
+    """Unpack integers of given widths from byte chunks."""
+
+    def __init__(self, chunks):
+        """
+        :param chunks: iterable of byte chunks.
+        """
+        self.source = iter(chunks)
+        self.buffer = bytearray()
+        self.bits = 0
+        self.count = 0
+
+    def feed(self, data):
+        """Add bytes after the ones given so far. A reader which is fed has
+        an empty iterable of chunks, and the reads return what they can from
+        the bytes fed so far.
+        :param data: bytes-like object.
+        """
+        self.buffer += data
+
+    def read(self, width):
+        """Read the next width bits as an integer.
+        :param width: number of bits.
+        :return: integer, or None if fewer than width bits are left. The
+        bits which are left are padding.
+        """
+        while self.count < width:
+            data = read_exact(self.source, REFILL_BYTES, self.buffer)
+            if not data:
+                return None
+            self.bits = self.bits << (len(data) << 3) | int.from_bytes(data,
+                                                                      "big")
+            self.count += len(data) << 3
+        self.count -= width
+        value = self.bits >> self.count
+        self.bits &= (1 << self.count) - 1
+        return value
+
+    def read_many(self, count, width):
+        """Read up to count values of the same width.
+        :param count: number of values.
+        :param width: number of bits of every value, at most 32.
+        :return: list of integers, shorter than count if the bits ran out.
+        """
+        missing = count * width - self.count
+        if missing > 0:
+            data = read_exact(self.source, (missing + 7) >> 3, self.buffer)
+            self.bits = self.bits << (len(data) << 3) | int.from_bytes(data,
+                                                                      "big")
+            self.count += len(data) << 3
+        count = min(count, self.count // width)
+        if not count:
+            return []
+        self.count -= count * width
+        value = self.bits >> self.count
+        self.bits &= (1 << self.count) - 1
+        if numpy is not None:
+            return _unpack_numpy(value, count, width)
+        return _unpack_string(value, count, width)
+
+    def unread(self, values, width):
+        """Give back values which were read, so that they are read again next.
+        :param values: sequence of the last values read.
+        :param width: number of bits of every value, at most 32.
+        """
+        if not values:
+            return
+        if numpy is not None:
+            bits = _pack_numpy(values, width)
+        else:
+            bits = _pack_string(values, width)
+        self.bits |= bits << self.count
+        self.count += len(values) * width
+
+
+def _pack_numpy(values, width):
+    """Concatenate the values to one integer with NumPy: the bits of every
+    value are unpacked to a row of a bit matrix, and the last width columns are
+    packed again.
+    """
+    array = numpy.asarray(values, dtype=">u4")
+    bits = numpy.unpackbits(array.view(numpy.uint8)).reshape(-1, 32)
+    packed = numpy.packbits(bits[:, 32 - width:])
+    padding = -(len(values) * width) & 7
+    return int.from_bytes(packed.tobytes(), "big") >> padding
+
+
+def _pack_string(values, width):
+    """Concatenate the values to one integer through a string of bits."""
+    to_bits = "{{:0{}b}}".format(width).format
+    return int("".join(map(to_bits, values)), 2)
+
+
+def _unpack_numpy(value, count, width):
+    """Split an integer of count * width bits to values with NumPy."""
+    total = count * width
+    padding = -total & 7
+    data = (value << padding).to_bytes((total + padding) >> 3, "big")
+    bits = numpy.unpackbits(numpy.frombuffer(data, dtype=numpy.uint8))
+    bits = bits[:total].reshape(count, width).astype(numpy.uint32)
+    weights = numpy.left_shift(numpy.uint32(1),
+                               numpy.arange(width - 1, -1, -1,
+                                            dtype=numpy.uint32))
+    return (bits @ weights).tolist()
+
+
+def _unpack_string(value, count, width):
+    """Split an integer of count * width bits to values through a string of
+    bits."""
+    bits = "{:0{}b}".format(value, count * width)
+    return [int(bits[start:start + width], 2)
+            for start in range(0, count * width, width)]
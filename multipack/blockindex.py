@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+#  -*- coding: utf-8 -*-
+
+"""Trailing block index of compressed files.
+
+The index is written after the compressed blocks. It has one entry for every
+block: the offset and length of the block in the compressed file, and the
+length of the decoded block. A footer with the number of entries and a magic
+string ends the file, so the index can be found by reading the end of the file.
+"""
+
+import os
+import struct
+from collections import namedtuple
+
+INDEX_ENTRY = struct.Struct(">QII")
+INDEX_FOOTER = struct.Struct(">I4s")
+INDEX_MAGIC = b"MPIX"
+
+IndexEntry = namedtuple("IndexEntry", ["offset", "length", "original_length"])
+
+
+class IndexWriter:
+    """Write blocks to a stream and keep track of their offsets."""
+
+    def __init__(self, stream, offset=0):
+        """
+        :param stream: binary output stream.
+        :param offset: offset of the first block in the stream, after the
+        bytes already written.
+        """
+        self.stream = stream
+        self.offset = offset
+        self.entries = []
+
+    def write_block(self, data, original_length):
+        """Write one compressed block.
+        :param data: compressed block.
+        :param original_length: length of the block before compression.
+        """
+        self.stream.write(data)
+        self.entries.append(IndexEntry(self.offset, len(data),
+                                       original_length))
+        self.offset += len(data)
+
+    def write_index(self, end_marker=b""):
+        """Write the end marker, the index and the footer after the blocks.
+        :param end_marker: bytes which tell a sequential reader that there are
+        no more blocks.
+        :return: offset after the index, the length of a file written from
+        the start.
+        """
+        self.stream.write(end_marker)
+        for entry in self.entries:
+            self.stream.write(INDEX_ENTRY.pack(*entry))
+        self.stream.write(INDEX_FOOTER.pack(len(self.entries), INDEX_MAGIC))
+        return (self.offset + len(end_marker) +
+                len(self.entries) * INDEX_ENTRY.size + INDEX_FOOTER.size)
+
+
+def read_index(stream):
+    """Read the block index from the end of a seekable stream.
+    :param stream: seekable binary stream of a compressed file.
+    :return: list of IndexEntry tuples, or None if the file has no index.
+    """
+    size = stream.seek(0, os.SEEK_END)
+    if size < INDEX_FOOTER.size:
+        return None
+    stream.seek(size - INDEX_FOOTER.size)
+    count, magic = INDEX_FOOTER.unpack(stream.read(INDEX_FOOTER.size))
+    index_size = count * INDEX_ENTRY.size
+    if magic != INDEX_MAGIC or index_size > size - INDEX_FOOTER.size:
+        return None
+    stream.seek(size - INDEX_FOOTER.size - index_size)
+    data = stream.read(index_size)
+    return [IndexEntry(*INDEX_ENTRY.unpack_from(data, i))
+            for i in range(0, index_size, INDEX_ENTRY.size)]
+
+
+def output_offsets(entries):
+    """Count where every block starts in the decoded output.
+    :param entries: list of IndexEntry tuples.
+    :return: list of offsets, and the total decoded length as the last item.
+    """
+    offsets = [0]
+    for entry in entries:
+        offsets.append(offsets[-1] + entry.original_length)
+    return offsets
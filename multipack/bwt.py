@@ -1,148 +1,420 @@
 #!/usr/bin/env python3
 #  -*- coding: utf-8 -*-
 
-"""BWT compression using run-length encoding."""
+"""BWT compression using move-to-front and run-length encoding."""
 
-from multipack.sorting import counting_sorted, merge_sort
+import io
+import re
+import struct
+from functools import partial
+from operator import itemgetter, mul
 
-CHUNK_SIZE = 10000
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
+from multipack.sorting import rotation_sort
+from multipack.blockindex import IndexWriter
+from multipack.datastructures import TypedArray
+from multipack.huffman import encode_frame, decode_frame, huffman_decode, \
+    FRAME_HEADER, LENGTHS_SIZE, END_MARKER
+from multipack.stages import pipeline, regroup, read_exact
 
-def bwt_encode(stream):
+BLOCK_SIZE = 900 * 1024
+MIN_BLOCK_SIZE = 100 * 1024
+MAX_BLOCK_SIZE = 8 * 1024 * 1024
+
+BLOCK_HEADER = struct.Struct(">II")
+
+RLE_BUFFER_SIZE = 64 * 1024
+_RUN = re.compile(rb"((.)\2{0,254})", re.DOTALL)
+_SINGLE_BYTES = [bytes([byte]) for byte in range(256)]
+
+
+def encode_blocks(chunks, block_size=BLOCK_SIZE):
+    """Encode input in independent blocks with all the BWT stages.
+    :param chunks: iterable of input chunks.
+    :param block_size: maximum length of one block.
+    :return: generator of Huffman frames, one for each block.
+    """
+    for block in regroup(chunks, block_size):
+        yield encode_block(block)
+
+
+def decode_blocks(chunks):
+    """Decode blocks encoded with encode_blocks.
+    :param chunks: iterable of encoded chunks.
+    :return: generator of decoded blocks.
+    """
+    for frame in huffman_decode(chunks):
+        yield decode_block(frame)
+
+
+def encode_block(block):
+    """Encode one block with BWT, move-to-front, RLE and Huffman coding.
+    Every stage starts from a clean state, so the blocks can be encoded and
+    decoded independently of each other, for example in separate processes.
+    :param block: input bytes.
+    :return: encoded block as one Huffman frame.
+    """
+    encoded = pipeline([block], partial(bwt_encode, block_size=len(block)),
+                       mtf_encode, rle_encode)
+    return encode_frame(b"".join(encoded))
+
+
+def decode_block(frame):
+    """Decode one block, which is already Huffman decoded.
+    :param frame: decoded Huffman frame of one block.
+    :return: original block.
+    """
+    return b"".join(pipeline([frame], rle_decode, mtf_decode, bwt_decode))
+
+
+def compressobj(block_size=BLOCK_SIZE):
+    """Create an incremental compressor, like zlib.compressobj().
+    :param block_size: maximum length of one block.
+    :return: BwtCompressor.
+    """
+    return BwtCompressor(block_size)
+
+
+def decompressobj():
+    """Create an incremental uncompressor, like zlib.decompressobj().
+    :return: BwtDecompressor.
+    """
+    return BwtDecompressor()
+
+
+class BwtCompressor:
+    """Compress data given in pieces to a BWT file. A block is encoded when
+    there is enough input for it, and flush() encodes the last block and writes
+    the block index."""
+
+    def __init__(self, block_size=BLOCK_SIZE):
+        """
+        :param block_size: maximum length of one block.
+        """
+        self.block_size = block_size
+        self.input = bytearray()
+        self.output = io.BytesIO()
+        self.writer = IndexWriter(self.output)
+        self.finished = False
+
+    def compress(self, data):
+        """Compress the next piece of the input.
+        :param data: bytes-like object.
+        :return: compressed bytes, which may be empty.
+        """
+        if self.finished:
+            raise ValueError("Compressor is already flushed.")
+        self.input += data
+        while len(self.input) >= self.block_size:
+            self._encode(bytes(self.input[:self.block_size]))
+            del self.input[:self.block_size]
+        return self._take()
+
+    def flush(self):
+        """End the input. The compressor can't be used after this.
+        :return: the rest of the compressed bytes.
+        """
+        if self.finished:
+            raise ValueError("Compressor is already flushed.")
+        self.finished = True
+        if self.input:
+            self._encode(bytes(self.input))
+            self.input.clear()
+        self.writer.write_index(END_MARKER)
+        return self._take()
+
+    def _encode(self, block):
+        """Encode one block to the output."""
+        self.writer.write_block(encode_block(block), len(block))
+
+    def _take(self):
+        """Remove and return the output written so far."""
+        output = self.output.getvalue()
+        self.output.seek(0)
+        self.output.truncate()
+        return output
+
+
+class BwtDecompressor:
+    """Uncompress a BWT file given in pieces.
+
+    Like zlib, decompress() takes max_length to limit the output. Input which
+    is not uncompressed because of it is kept in the object, and the next call
+    continues from it, also with empty data. The data after the end marker of
+    the blocks, the block index, is in unused_data.
+    """
+
+    def __init__(self):
+        self.input = bytearray()
+        self.output = bytearray()
+        self.blocked = False
+        self.eof = False
+        self.unused_data = b""
+
+    @property
+    def needs_input(self):
+        """True if more output can't be uncompressed without more input."""
+        return not self.eof and not self.output and self.blocked
+
+    def decompress(self, data, max_length=0):
+        """Uncompress the next piece of the file.
+        :param data: bytes-like object.
+        :param max_length: maximum length of the output, 0 for no limit.
+        :return: uncompressed bytes, which may be empty.
+        """
+        if self.eof:
+            self.unused_data += bytes(data)
+        else:
+            self.input += data
+            self.blocked = False
+            while not max_length or len(self.output) < max_length:
+                if not self._step():
+                    self.blocked = True
+                    break
+        return self._take(max_length)
+
+    def flush(self):
+        """End the input, and uncompress all of it.
+        :return: the rest of the uncompressed bytes.
+        :raises ValueError: if the input ends in the middle of a block.
+        """
+        while self._step():
+            pass
+        if self.input:
+            raise ValueError("Truncated BWT data.")
+        return self._take(0)
+
+    def _take(self, max_length):
+        """Remove and return up to max_length bytes of the output, or all of
+        it if max_length is 0."""
+        if not max_length:
+            max_length = len(self.output)
+        output = bytes(self.output[:max_length])
+        del self.output[:max_length]
+        return output
+
+    def _step(self):
+        """Decode the next block, if all of it has been given.
+        :return: False if there isn't a whole block.
+        """
+        header = bytes(self.input[:FRAME_HEADER.size])
+        if len(header) < FRAME_HEADER.size:
+            return False
+        if header == END_MARKER:
+            self.eof = True
+            self.unused_data = bytes(self.input[FRAME_HEADER.size:])
+            self.input.clear()
+            return False
+        _, payload_length = FRAME_HEADER.unpack(header)
+        size = FRAME_HEADER.size + LENGTHS_SIZE + payload_length
+        if len(self.input) < size:
+            return False
+        frame = bytes(self.input[:size])
+        del self.input[:size]
+        self.output += decode_block(decode_frame(frame))
+        return True
+
+
+def bwt_encode(chunks, block_size=BLOCK_SIZE):
     """Rearrange a string to more easily compressable string.
-    :param stream: input stream for the transform.
-    :return: generator for bwt-rearranged string.
-    """
-    chunk = stream.read(CHUNK_SIZE)
-    if not chunk:
-        yield b"\x03\x02"
-    while chunk:
-        chunk = b"\x02" + chunk + b"\x03"
-        table = _create_table(chunk)
-        for rotation in table:
-            yield rotation[-1:]
-        chunk = stream.read(CHUNK_SIZE)
-
-
-def _create_table(string):
-    """Create the table of different rotations.
-    :param string: base for the different rotations.
-    :return: Sorted list of rotations. There is len(string) different rotations
-    altogether.
-    """
-    table = [None] * len(string)
-    for index, _ in enumerate(string):
-        start = string[index:]
-        end = string[:index]
-        table[-index] = (start + end)
-    merge_sort(table)
-    return table
+    Every block starts with a header, which has the block length and the
+    primary index, the row of the original block in the sorted rotations.
+    :param chunks: iterable of input chunks for the transform.
+    :param block_size: maximum length of one transformed block.
+    :return: generator for bwt-rearranged blocks, one chunk for each block.
+    """
+    for block in regroup(chunks, block_size):
+        order = rotation_sort(block)
+        header = BLOCK_HEADER.pack(len(block), order.index(0))
+        yield header + bytes([block[start - 1] for start in order])
 
 
 def bwt_decode(enc_input):
-    """Decode bwt-rearranged byte generator.
-    :param enc_input: byte generator of encoded BWT data.
-    :return: byte generator of decoded data. The yielded chunks are very large.
-    """
-    input_chunk = _read_chunk(enc_input)
-
-    while input_chunk:
-        input_length = len(input_chunk)
-        byte_start, indices = _create_indices(input_chunk)
-        local_index = input_chunk.index(b"\x03")
-        output = [b""] * input_length
-        for i in range(input_length):
-            next_byte = input_chunk[local_index]
-            output[input_length - i - 1] = next_byte
-            local_index = byte_start[next_byte] + indices[local_index]
-        yield bytes(output).rstrip(b"\x03").strip(b"\x02")
-        input_chunk = _read_chunk(enc_input)
-
-
-def _read_chunk(source):
-    """Read chunk of data from generator and return it.
-    :param source: source generator for the bytes.
-    :return: chunk of bwt encoded data.
-    """
-    next_bytes = b""
-    for byte in range(CHUNK_SIZE + 2):
-        try:
-            next_bytes += next(source)
-        except StopIteration:
-            break
-    return next_bytes
+    """Decode bwt-rearranged byte chunks.
+    :param enc_input: iterable of byte chunks of encoded BWT data.
+    :return: generator of decoded blocks.
+    """
+    source = iter(enc_input)
+    buffer = bytearray()
+    header = read_exact(source, BLOCK_HEADER.size, buffer)
+    while header:
+        if len(header) < BLOCK_HEADER.size:
+            raise ValueError("Truncated BWT block header.")
+        input_length, local_index = BLOCK_HEADER.unpack(header)
+        input_chunk = read_exact(source, input_length, buffer)
+        if len(input_chunk) < input_length or local_index >= input_length:
+            raise ValueError("Truncated or corrupted BWT block.")
+        yield _inverse_transform(input_chunk, local_index)
+        header = read_exact(source, BLOCK_HEADER.size, buffer)
+
+
+def _inverse_transform(last_column, primary):
+    """Restore the original block from the last column of the rotations.
+    NumPy is used when it is installed.
+    :param last_column: bwt-rearranged block.
+    :param primary: row of the original block in the sorted rotations.
+    :return: decoded block as bytes.
+    """
+    if numpy is not None:
+        return _inverse_numpy(last_column, primary)
+    return _inverse_lf(last_column, primary)
+
+
+def _inverse_lf(last_column, primary):
+    """Walk the LF-mapping backwards from the primary row, one byte at a time.
+    :param last_column: bwt-rearranged block.
+    :param primary: row of the original block in the sorted rotations.
+    :return: decoded block as bytes.
+    """
+    input_length = len(last_column)
+    byte_start, indices = _create_indices(last_column)
+    output = bytearray(input_length)
+    local_index = primary
+    for i in range(input_length - 1, -1, -1):
+        next_byte = last_column[local_index]
+        output[i] = next_byte
+        local_index = byte_start[next_byte] + indices[local_index]
+    return bytes(output)
+
+
+def _inverse_numpy(last_column, primary):
+    """Restore the block with vectorized NumPy operations.
+    A stable argsort of the last column is the inverse of the LF-mapping: it
+    maps a row to the row of the rotation starting one byte later. The
+    permutation is raised to the power of a stride by repeated squaring, which
+    finds the rows at every stride:th position of the block. All the strides
+    are then decoded side by side, one byte position at a time.
+    :param last_column: bwt-rearranged block.
+    :param primary: row of the original block in the sorted rotations.
+    :return: decoded block as bytes.
+    """
+    input_length = len(last_column)
+    column = numpy.frombuffer(last_column, dtype=numpy.uint8)
+    successor = numpy.argsort(column, kind="stable")
+    stride_bits = max(1, input_length.bit_length() // 3)
+    stride = 1 << stride_bits
+    jump = successor
+    for _ in range(stride_bits):
+        jump = jump[jump]
+
+    lanes = (input_length + stride - 1) // stride
+    rows = numpy.empty(lanes, dtype=successor.dtype)
+    row = primary
+    for lane in range(lanes):
+        rows[lane] = row
+        row = jump[row]
+
+    output = numpy.empty((stride, lanes), dtype=numpy.uint8)
+    for offset in range(stride):
+        rows = successor[rows]
+        output[offset] = column[rows]
+    return output.T.tobytes()[:input_length]
 
 
 def _create_indices(bwt_input):
     """Generate indices helper list for BWT uncompression.
+    The index of a row is the count of its last byte in the rows before it.
+    The indices are in a typed array of four bytes per row, instead of a list
+    of integer objects.
     :param bwt_input: byte string input.
-    :return: indice lists for the uncompression.
+    :return: tuple of the first rows of every byte in the sorted rotations,
+    and a memoryview of the indices.
     """
-    input_length = len(bwt_input)
-    byte_start = [None] * 256
-    indices = [None] * input_length
+    counts = [bwt_input.count(byte) for byte in range(256)]
+    byte_start = [0] * 256
+    for byte in range(1, 256):
+        byte_start[byte] = byte_start[byte - 1] + counts[byte - 1]
 
-    first_column = counting_sorted(bwt_input, 256)
+    indices = TypedArray("I", len(bwt_input)).memoryview()
     count = [0] * 256
-    for byte in range(input_length):
-        index = bwt_input[byte]
-        indices[byte] = count[index]
-        count[index] += 1
-        index = first_column[byte]
-        if byte_start[index] is None:
-            byte_start[index] = byte
+    for row, byte in enumerate(bwt_input):
+        indices[row] = count[byte]
+        count[byte] += 1
 
     return byte_start, indices
 
 
-def _find_decoded(table):
-    """Look for row which ends to "end of text" (ETX) control character.
-    :param table: table of strings, where one should end with ETX control
-    character.
-    :return: decoded string.
+def mtf_encode(byte_arr):
+    """Move-to-front transform. Every byte is replaced with its position in a
+    list of recently used bytes, so runs of any byte turn into runs of zeros.
+    :param byte_arr: iterable of byte chunks.
+    :return: generator of transformed chunks, one for each input chunk.
+    """
+    table = bytearray(range(256))
+    for chunk in byte_arr:
+        output = bytearray(len(chunk))
+        for position, byte in enumerate(chunk):
+            index = table.index(byte)
+            if index:
+                output[position] = index
+                del table[index]
+                table.insert(0, byte)
+        yield bytes(output)
+
+
+def mtf_decode(byte_arr):
+    """Reverse the move-to-front transform.
+    :param byte_arr: iterable of transformed byte chunks.
+    :return: generator of decoded chunks, one for each input chunk.
     """
-    for row in table:
-        if row.endswith(b"\x03"):
-            return row
-    raise Exception("No ETX character-ending row in table.")
+    table = bytearray(range(256))
+    for chunk in byte_arr:
+        output = bytearray(len(chunk))
+        for position, index in enumerate(chunk):
+            byte = table[index]
+            output[position] = byte
+            if index:
+                del table[index]
+                table.insert(0, byte)
+        yield bytes(output)
 
 
 def rle_encode(byte_arr):
     """Use run length encoding on a byte string.
-    :param byte_arr: byte generator.
-    :return: byte string of encoded data.
-    """
-    output = b""
-    streak = 1
-    try:
-        prev = next(byte_arr)
-    except StopIteration:
-        return b""
-    while True:
-        try:
-            char = next(byte_arr)
-        except StopIteration:
-            break
-        if char == prev and streak < 255:
-            streak += 1
-        else:
-            output += prev + bytes([streak])
-            streak = 1
-        prev = char
-
-    output += prev + bytes([streak])
-    return output
-
-
-def rle_decode(stream):
-    """Decode run-length encoded byte stream.
-    :param stream: byte stream for the encoding.
-    :return: byte-generator, which returns one byte at a time.
-    """
-    while True:
-        byte = stream.read(1)
-        if not byte:
-            break
-        count = int.from_bytes(stream.read(1), byteorder="little")
-        for i in range(count):
-            yield byte
+    The input is collected to buffers of RLE_BUFFER_SIZE bytes, and the runs
+    of a whole buffer are found with one regular expression search. The last
+    run of a buffer may continue in the next chunk, so it is carried over.
+    :param byte_arr: iterable of byte chunks.
+    :return: generator of encoded chunks.
+    """
+    pending = bytearray()
+    for chunk in byte_arr:
+        pending += chunk
+        if len(pending) >= RLE_BUFFER_SIZE:
+            runs = _RUN.findall(pending)
+            last_run, _ = runs.pop()
+            yield _encode_runs(runs)
+            pending = bytearray(last_run)
+    if pending:
+        yield _encode_runs(_RUN.findall(pending))
+
+
+def _encode_runs(runs):
+    """Write runs as byte and count pairs.
+    :param runs: list of (run, byte) tuples from the _RUN pattern.
+    :return: encoded bytes.
+    """
+    output = bytearray(2 * len(runs))
+    output[0::2] = b"".join(map(itemgetter(1), runs))
+    output[1::2] = bytes(map(len, map(itemgetter(0), runs)))
+    return bytes(output)
+
+
+def rle_decode(byte_arr):
+    """Decode run-length encoded byte chunks.
+    :param byte_arr: iterable of encoded byte chunks.
+    :return: generator of decoded chunks, one for each input chunk.
+    :raises ValueError: if the last pair has no count.
+    """
+    odd_byte = b""
+    for chunk in byte_arr:
+        chunk = odd_byte + chunk
+        odd_byte = chunk[len(chunk) & ~1:]
+        yield b"".join(map(mul, map(_SINGLE_BYTES.__getitem__, chunk[0::2]),
+                           chunk[1::2]))
+    if odd_byte:
+        raise ValueError("Truncated run-length encoded data.")
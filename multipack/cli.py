@@ -0,0 +1,651 @@
+#!/usr/bin/env python3
+#  -*- coding: utf-8 -*-
+
+"""Command line interface for compressing, uncompressing and testing files.
+
+The options are parsed only when main() is called, and they are passed to the
+functions which need them. The compression itself is in the api module.
+"""
+
+import os
+import sys
+from os.path import isfile
+import time
+import argparse
+from contextlib import contextmanager
+from functools import partial
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from multipack.api import compress_file, compress_stream, \
+    decompress_stream, SUFFIXES
+from multipack.lzw import MIN_BITS, MAX_BITS, SEGMENT_SIZE
+from multipack.bwt import MIN_BLOCK_SIZE, MAX_BLOCK_SIZE, BLOCK_SIZE
+from multipack.blockindex import read_index, output_offsets
+from multipack.container import uncompress_stream, read_file_header, \
+    block_decoder, detect, verify
+
+STDIN = "-"
+
+
+def _compress_file(filename, options, jobs):
+    """Compress a file to the name with the codec as the suffix, and remove
+    the original file.
+    :param filename: File name for the compression.
+    :param options: codec and codec options for compress_file.
+    :param jobs: number of processes compressing the blocks.
+    :return: tuple of the original and compressed sizes.
+    """
+    original_size = os.stat(filename).st_size
+    out_name = compress_file(filename, jobs=jobs, **options)
+    os.remove(filename)
+    return original_size, os.stat(out_name).st_size
+
+
+def container_uncompress(filename, out_name, jobs=1, skip_corrupted=False):
+    """Uncompress a container file. With more than one job, the blocks are
+    decoded in parallel processes. The compressed file is kept if damaged
+    blocks were left out.
+    :param filename: File name for the uncompression.
+    :param out_name: name of the output file.
+    :param jobs: number of processes decoding the blocks.
+    :param skip_corrupted: leave out damaged blocks instead of stopping.
+    :return: list of the numbers of the left out blocks.
+    """
+    skipped = []
+    with open(filename, "rb") as in_stream:
+        header = read_file_header(in_stream)
+        index = None
+        if jobs > 1 and not skip_corrupted:
+            index = read_index(in_stream)
+        if index is None:
+            in_stream.seek(0)
+            with open(out_name, "wb") as out_stream:
+                skipped = uncompress_stream(in_stream, out_stream,
+                                            skip_corrupted)
+    if index is not None:
+        _parallel_decode(filename, out_name, index, block_decoder(header),
+                         jobs)
+    if not skipped:
+        os.remove(filename)
+    return skipped
+
+
+def _parallel_decode(filename, out_name, index, decode, jobs):
+    """Decode the blocks of a file in parallel processes, which write them
+    straight to their offsets in the output file.
+    :param filename: name of the compressed file.
+    :param out_name: name of the output file.
+    :param index: list of IndexEntry tuples of the blocks.
+    :param decode: picklable function, which decodes one block.
+    :param jobs: number of processes.
+    """
+    offsets = output_offsets(index)
+    with open(out_name, "wb") as out_stream:
+        out_stream.truncate(offsets[-1])
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(_decode_into, decode, filename, entry,
+                                   out_name, offset)
+                   for entry, offset in zip(index, offsets)]
+        for future in futures:
+            future.result()
+
+
+def _decode_into(decode, filename, entry, out_name, out_offset):
+    """Decode one block and write it to its place in the output file.
+    :param decode: function, which decodes one block.
+    :param filename: name of the compressed file.
+    :param entry: IndexEntry of the block.
+    :param out_name: name of the output file.
+    :param out_offset: offset of the decoded block in the output file.
+    """
+    with open(filename, "rb") as in_stream:
+        in_stream.seek(entry.offset)
+        frame = in_stream.read(entry.length)
+    block = decode(frame)
+    if len(block) != entry.original_length:
+        raise ValueError("Block at offset {} has wrong length."
+                         .format(entry.offset))
+    with open(out_name, "r+b") as out_stream:
+        out_stream.seek(out_offset)
+        out_stream.write(block)
+
+
+FileResult = namedtuple("FileResult", ["filename", "action", "original_size",
+                                       "compressed_size", "failed",
+                                       "message"])
+
+
+def main(argv=None):
+    """Main function. The arguments are the files for compression. A
+    compressed file is recognized from its contents, and with --lzw or --bwt
+    from its suffix. The file "-" is the standard input, and it is read and
+    written as a stream. Several files are processed in parallel, and a
+    summary is printed at the end.
+    :param argv: list of arguments, sys.argv[1:] by default.
+    """
+    start_ts = time.time()
+    args = parse_args(argv)
+    filenames = list(_input_files(args.filenames or [STDIN],
+                                  args.recursive))
+    if args.stdout or STDIN in filenames:
+        if len(filenames) != 1:
+            _info("The standard input and output take only one file", args)
+            sys.exit(1)
+        if filenames[0] == STDIN and sys.stdin.isatty():
+            _info("Refusing to read data from a terminal", args)
+            sys.exit(1)
+        results = [cli_stream(filenames[0], args)]
+    elif len(filenames) == 1 and not args.recursive:
+        results = [process_file(filenames[0], args, args.jobs)]
+    else:
+        results = process_files(filenames, args,
+                                 partial(_report_file, args=args))
+
+    elapsed = time.time() - start_ts
+    if len(results) == 1 and not args.recursive:
+        _report_single(results[0], args)
+        if args.verbose:
+            _info("Complete in {:.0f} ms".format(elapsed * 1000), args)
+    else:
+        _report_summary(results, elapsed, args)
+    if any(result.failed for result in results):
+        sys.exit(1)
+
+
+def process_file(filename, args, jobs=1):
+    """Compress, uncompress or test one file, as the options say. Errors are
+    returned in the result, so that one bad file doesn't stop a batch.
+    :param filename: name of the file.
+    :param args: parsed command line options.
+    :param jobs: number of processes for the blocks of the file.
+    :return: FileResult.
+    """
+    if os.path.isdir(filename):
+        return _failed(filename, '"{}" is a directory, use -r to process '
+                                 'the files in it'.format(filename))
+    if not isfile(filename):
+        return _failed(filename, 'No file "{}" found'.format(filename))
+    try:
+        compressed = _is_compressed(filename)
+        action = _action(filename, compressed, args)
+        if action == "skip":
+            return _skipped(filename)
+        if action == "test":
+            with open(filename, "rb") as stream:
+                return _test_result(filename, compressed, stream, args, jobs)
+        if action == "compress":
+            original_size, compressed_size = _compress_file(
+                filename, _options(args), jobs)
+            return FileResult(filename, action, original_size,
+                              compressed_size, False, "")
+        if action == "uncompress":
+            return _uncompress_file(filename, args, jobs)
+    except (OSError, ValueError) as error:
+        return _failed(filename, "{}: {}".format(filename, error))
+    return _failed(filename, '"{}" is not compressed, give --lzw or --bwt to '
+                             'compress it'.format(filename))
+
+
+def process_files(filenames, args, report=None):
+    """Process files in a pool of processes, each file in one process. The
+    largest files are started first, so that the small files fill the gaps at
+    the end and the processes finish at about the same time.
+    :param filenames: list of file names.
+    :param args: parsed command line options, args.jobs is the number of
+    processes.
+    :param report: function called with every FileResult when it is ready.
+    :return: list of FileResults in the order of the files.
+    """
+    order = sorted(range(len(filenames)),
+                   key=lambda number: _file_size(filenames[number]),
+                   reverse=True)
+    results = [None] * len(filenames)
+    if args.jobs > 1:
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            futures = {executor.submit(process_file, filenames[number],
+                                       args): number
+                       for number in order}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                if report:
+                    report(future.result())
+    else:
+        for number in order:
+            results[number] = process_file(filenames[number], args)
+            if report:
+                report(results[number])
+    return results
+
+
+def cli_stream(filename, args):
+    """Compress, uncompress or test the standard input, or a file to the
+    standard output.
+    :param filename: name of the file, or STDIN.
+    :param args: parsed command line options.
+    :return: FileResult.
+    """
+    try:
+        compressed = _is_compressed(filename)
+        action = _action(filename, compressed, args)
+        if action is None:
+            return _failed(filename, '"{}" is not compressed, give --lzw or '
+                                     '--bwt to compress it'.format(filename))
+        if action == "skip":
+            return _skipped(filename)
+        if action == "compress" and sys.stdout.isatty():
+            return _failed(filename, "Refusing to write compressed data to a "
+                                     "terminal")
+        with _open_input(filename) as in_stream:
+            if action == "test":
+                return _test_result(filename, compressed, in_stream, args,
+                                    args.jobs)
+            if action == "compress":
+                sizes = compress_stream(in_stream, sys.stdout.buffer,
+                                        jobs=args.jobs, **_options(args))
+                sys.stdout.buffer.flush()
+                return FileResult(filename, action, sizes[0], sizes[1],
+                                  False, "")
+            skipped = decompress_stream(in_stream, sys.stdout.buffer,
+                                        args.jobs, args.skip_corrupted)
+            sys.stdout.buffer.flush()
+            return FileResult(filename, action, 0, 0, False,
+                              _skipped_message(skipped))
+    except (OSError, ValueError) as error:
+        return _failed(filename, "{}: {}".format(filename, error))
+
+
+def _action(filename, compressed, args):
+    """Choose what to do with a file.
+    :param filename: name of the file.
+    :param compressed: the file is a container.
+    :param args: parsed command line options.
+    :return: "test", "compress", "uncompress", "skip" for a file which
+    already has the suffix of the given technique, or None if the file is not
+    compressed and no technique is given.
+    """
+    if args.test:
+        return "test"
+    if args.lzw or args.bwt:
+        if filename.endswith(".lzw" if args.lzw else ".bwt"):
+            return "skip"
+        return "compress"
+    if compressed:
+        return "uncompress"
+    return None
+
+
+def _options(args):
+    """Get the codec and its options for the api functions.
+    :param args: parsed command line options.
+    :return: dictionary of keyword arguments.
+    """
+    if args.lzw:
+        return {"codec": "lzw", "block_size": args.segment_size * 1024,
+                "max_bits": args.max_bits, "reset": args.reset}
+    return {"codec": "bwt", "block_size": args.block_size * 1024,
+            "fm_index": args.fm_index}
+
+
+def _uncompress_file(filename, args, jobs):
+    """Uncompress a file to the name without the suffix.
+    :param filename: name of the file.
+    :param args: parsed command line options.
+    :param jobs: number of processes for the blocks of the file.
+    :return: FileResult.
+    """
+    out_name, suffix = os.path.splitext(filename)
+    if suffix not in SUFFIXES:
+        return _failed(filename, 'Unknown suffix of "{}", expected .lzw or '
+                                 '.bwt'.format(filename))
+    compressed_size = os.stat(filename).st_size
+    previous = _output_state(out_name)
+    try:
+        skipped = container_uncompress(filename, out_name, jobs,
+                                       args.skip_corrupted)
+    except (OSError, ValueError) as error:
+        if _output_state(out_name) not in (None, previous):
+            os.remove(out_name)
+        return _failed(filename, "{}: {}".format(filename, error))
+    return FileResult(filename, "uncompress", os.stat(out_name).st_size,
+                      compressed_size, False, _skipped_message(skipped))
+
+
+def _output_state(filename):
+    """Get the size and modification time of a file, to see if a failed
+    uncompression wrote it.
+    :return: tuple of the size and the time, or None if there is no file.
+    """
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _test_result(filename, compressed, stream, args, jobs):
+    """Check the blocks of a container file.
+    :param filename: name of the file.
+    :param compressed: the file is a container.
+    :param stream: binary stream of the file.
+    :param args: parsed command line options.
+    :param jobs: number of processes checking the blocks.
+    :return: FileResult, which has failed if a block is damaged.
+    """
+    if not compressed:
+        return _failed(filename, '"{}" is not a container file'
+                       .format(filename))
+    errors = verify(stream, jobs)
+    message = "\n".join("{}: block {}: {}".format(filename, number, error)
+                        for number, error in errors)
+    if not errors and args.verbose:
+        message = "{}: OK".format(filename)
+    return FileResult(filename, "test", 0, 0, bool(errors), message)
+
+
+def _failed(filename, message):
+    """Create the result of a file which couldn't be processed."""
+    return FileResult(filename, None, 0, 0, True, message)
+
+
+def _skipped(filename):
+    """Create the result of a file which already has the suffix of the
+    technique, and is left as it is.
+    """
+    return FileResult(filename, "skip", 0, 0, False,
+                      '"{}" already has the {} suffix, unchanged'
+                      .format(filename, os.path.splitext(filename)[1]))
+
+
+def _skipped_message(skipped):
+    """Describe the blocks left out of the output, if any."""
+    if not skipped:
+        return ""
+    return "Left out damaged blocks: {}".format(", ".join(map(str, skipped)))
+
+
+def _input_files(names, recursive):
+    """Expand directories to the files in them and their subdirectories.
+    :param names: file and directory names of the command line.
+    :param recursive: expand the directories.
+    :return: generator of file names, directories as such if not recursive.
+    """
+    for name in names:
+        if recursive and os.path.isdir(name):
+            for root, dirs, files in os.walk(name):
+                dirs.sort()
+                for file in sorted(files):
+                    yield os.path.join(root, file)
+        else:
+            yield name
+
+
+def _file_size(filename):
+    """Get the size of a file, or 0 if it can't be read."""
+    try:
+        return os.stat(filename).st_size
+    except OSError:
+        return 0
+
+
+def _is_compressed(filename):
+    """Check if an input file is a container. The standard input can't be
+    examined before it is read, so it is expected to be one.
+    :param filename: name of the file, or STDIN.
+    :return: True for a container file and the standard input.
+    """
+    if filename == STDIN:
+        return True
+    with open(filename, "rb") as stream:
+        return detect(stream) is not None
+
+
+@contextmanager
+def _open_input(filename):
+    """Open an input file, or give the standard input, which is not closed.
+    :param filename: name of the file, or STDIN.
+    :return: context manager of a binary stream.
+    """
+    if filename == STDIN:
+        yield sys.stdin.buffer
+    else:
+        with open(filename, "rb") as stream:
+            yield stream
+
+
+def _ratio(original_size, compressed_size):
+    """Format the compression ratio, which is not defined for empty files.
+    :param original_size: size of the original data.
+    :param compressed_size: size of the compressed data.
+    :return: ratio and the compressed size as a percentage.
+    """
+    if not original_size or not compressed_size:
+        return "-"
+    return "{:.2f} ({:.1f}%)".format(original_size / compressed_size,
+                                     compressed_size / original_size * 100)
+
+
+def _report_single(result, args):
+    """Print the messages of a single file, and the statistics of a
+    compression if verbose argument is given.
+    :param result: FileResult.
+    :param args: parsed command line options.
+    """
+    if result.message:
+        _info(result.message, args)
+    if args.verbose and result.action == "compress":
+        _info("Original size: {:.1f} KB".format(result.original_size / 1024),
+              args)
+        _info("output size: {:.1f} KB".format(result.compressed_size / 1024),
+              args)
+        _info("Compression ratio: {}".format(
+            _ratio(result.original_size, result.compressed_size)), args)
+
+
+def _report_file(result, args):
+    """Print the messages of a file of a batch, and the sizes of the input
+    and the output if verbose argument is given.
+    :param result: FileResult.
+    :param args: parsed command line options.
+    """
+    if args.verbose and result.action in ("compress", "uncompress"):
+        sizes = (result.original_size, result.compressed_size)
+        if result.action == "uncompress":
+            sizes = sizes[::-1]
+        _info("{}: {} {:.1f} KB -> {:.1f} KB, ratio {}".format(
+            result.filename, result.action + "ed", sizes[0] / 1024,
+            sizes[1] / 1024,
+            _ratio(result.original_size, result.compressed_size)), args)
+    if result.message:
+        _info(result.message, args)
+
+
+def _report_summary(results, elapsed, args):
+    """Print the totals of a batch.
+    :param results: list of FileResults.
+    :param elapsed: time of the whole batch in seconds.
+    :param args: parsed command line options.
+    """
+    for action in ("compress", "uncompress"):
+        done = [result for result in results if result.action == action and
+                not result.failed]
+        if done:
+            original_size = sum(result.original_size for result in done)
+            compressed_size = sum(result.compressed_size for result in done)
+            _info("{} {} files: {:.1f} KB original, {:.1f} KB compressed, "
+                  "ratio {}".format(action.capitalize() + "ed", len(done),
+                                    original_size / 1024,
+                                    compressed_size / 1024,
+                                    _ratio(original_size, compressed_size)),
+                  args)
+    skipped = sum(result.action == "skip" for result in results)
+    if skipped:
+        _info("Skipped {} files".format(skipped), args)
+    tested = sum(result.action == "test" for result in results)
+    if tested:
+        _info("Tested {} files".format(tested), args)
+    failed = sum(result.failed for result in results)
+    if failed:
+        _info("Failed {} files".format(failed), args)
+    _info("Complete in {:.0f} ms, {:.1f} files per second".format(
+        elapsed * 1000, len(results) / max(elapsed, 1e-3)), args)
+
+
+def _info(message, args):
+    """Print a message, to the standard error if the standard output has the
+    data.
+    :param message: message text.
+    :param args: parsed command line options.
+    """
+    to_stdout = args.stdout or STDIN in (args.filenames or [STDIN])
+    print(message, file=sys.stderr if to_stdout else sys.stdout)
+
+
+def parse_args(argv=None):
+    """Create command line parameters and return the parsed input.
+    :param argv: list of arguments, sys.argv[1:] by default.
+    :return: argparse.Namespace of the options.
+    """
+    arg = argparse.ArgumentParser(description="Compress and uncompress files "
+                                              "with LZW or BWT technique.")
+    arg.add_argument("-v", "--verbose", help="be verbose", action="store_true")
+
+    algo_choice = arg.add_mutually_exclusive_group()
+    arg.add_argument("filenames",
+                     metavar="FILE",
+                     nargs="*",
+                     help="files to compress, uncompress or test, - or none "
+                          "for the standard input")
+
+    arg.add_argument("-r", "--recursive",
+                     help="process the files in directories and their "
+                          "subdirectories",
+                     action="store_true")
+
+    arg.add_argument("-c", "--stdout",
+                     help="write to the standard output and keep the "
+                          "original file",
+                     action="store_true")
+
+    algo_choice.add_argument("--lzw",
+                             help="use Lempel-Ziv-Welch compression technique",
+                             action="store_true")
+
+    algo_choice.add_argument("--bwt",
+                             help="use Burrows-Wheeler transform technique",
+                             action="store_true")
+
+    arg.add_argument("--block-size",
+                     metavar="KB",
+                     help="BWT block size in kilobytes, from {} to {} "
+                          "(default {})".format(MIN_BLOCK_SIZE // 1024,
+                                                MAX_BLOCK_SIZE // 1024,
+                                                BLOCK_SIZE // 1024),
+                     type=_block_size,
+                     default=BLOCK_SIZE // 1024)
+
+    arg.add_argument("--max-bits",
+                     metavar="N",
+                     help="maximum LZW code width in bits, from {} to {} "
+                          "(default {})".format(MIN_BITS, MAX_BITS, MAX_BITS),
+                     type=_max_bits,
+                     default=MAX_BITS)
+
+    arg.add_argument("--reset",
+                     help="clear the LZW dictionary when the compression "
+                          "ratio drops",
+                     action="store_true")
+
+    arg.add_argument("--segment-size",
+                     metavar="KB",
+                     help="size of the independently compressed LZW "
+                          "segments in kilobytes (default {})"
+                          .format(SEGMENT_SIZE // 1024),
+                     type=_segment_size,
+                     default=SEGMENT_SIZE // 1024)
+
+    arg.add_argument("--fm-index",
+                     help="store BWT blocks with an FM-index for the search "
+                          "command",
+                     action="store_true")
+
+    arg.add_argument("-j", "--jobs",
+                     metavar="N",
+                     help="number of processes for compression, "
+                          "uncompression and tests: several files are "
+                          "processed in parallel, and one file in parallel "
+                          "blocks, 0 uses all processors (default 1)",
+                     type=_jobs,
+                     default=1)
+
+    arg.add_argument("-t", "--test",
+                     help="check the blocks of a compressed file against "
+                          "their checksums",
+                     action="store_true")
+
+    arg.add_argument("--skip-corrupted",
+                     help="leave damaged blocks out of the uncompressed file "
+                          "instead of stopping",
+                     action="store_true")
+    return arg.parse_args(argv)
+
+
+def _jobs(value):
+    """Parse and validate the --jobs argument.
+    :param value: number of processes as a string.
+    :return: number of processes.
+    """
+    try:
+        jobs = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid job count: " + value)
+    if jobs < 0:
+        raise argparse.ArgumentTypeError("job count can't be negative")
+    return jobs or os.cpu_count() or 1
+
+
+def _segment_size(value):
+    """Parse and validate the --segment-size argument.
+    :param value: segment size in kilobytes as a string.
+    :return: segment size in kilobytes.
+    """
+    try:
+        size = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid segment size: " + value)
+    if size < 1:
+        raise argparse.ArgumentTypeError("segment size must be positive")
+    return size
+
+
+def _max_bits(value):
+    """Parse and validate the --max-bits argument.
+    :param value: code width as a string.
+    :return: code width in bits.
+    """
+    try:
+        bits = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid code width: " + value)
+    if not MIN_BITS <= bits <= MAX_BITS:
+        raise argparse.ArgumentTypeError(
+            "code width must be between {} and {} bits".format(MIN_BITS,
+                                                               MAX_BITS))
+    return bits
+
+
+def _block_size(value):
+    """Parse and validate the --block-size argument.
+    :param value: block size in kilobytes as a string.
+    :return: block size in kilobytes.
+    """
+    try:
+        size = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid block size: " + value)
+    if not MIN_BLOCK_SIZE <= size * 1024 <= MAX_BLOCK_SIZE:
+        raise argparse.ArgumentTypeError(
+            "block size must be between {} and {} KB".format(
+                MIN_BLOCK_SIZE // 1024, MAX_BLOCK_SIZE // 1024))
+    return size
+
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+#  -*- coding: utf-8 -*-
+
+"""Self-describing container of independently compressed blocks.
+
+A container file starts with a header: the magic string MPAK, the version of
+the format, the id of the codec and the parameters of the codec. The blocks
+follow in frames. A frame header has the original and compressed lengths of
+the block, the CRC32 of the compressed payload and the CRC32 of the original
+block. The payload is the frame of the codec: an LZW segment, the Huffman
+frame of a BWT block, or a BWT block with its FM-index. A frame header of
+zeros ends the blocks, and the block index of the blockindex module ends the
+file.
+
+The checksum of the payload finds a damaged block before it is decoded, and the
+checksum of the original block verifies the decoding. With the index, the
+blocks can be decoded and verified in parallel, and the blocks after a damaged
+frame header can still be found.
+"""
+
+import struct
+from collections import namedtuple
+from functools import partial
+from zlib import crc32
+
+from multipack.blockindex import IndexWriter, read_index
+from multipack.bwt import encode_block, decode_block
+from multipack.fmindex import encode_search_block, decode_search_block
+from multipack.huffman import decode_frame as decode_huffman_frame
+from multipack.lzw import compress_segment, uncompress_segment
+from multipack.stages import parallel_map, read_chunks, regroup
+
+MAGIC = b"MPAK"
+VERSION = 1
+HEADER = struct.Struct(">4sBBH")
+
+FRAME_HEADER = struct.Struct(">IIII")
+FRAMES_END = FRAME_HEADER.pack(0, 0, 0, 0)
+
+LzwParams = namedtuple("LzwParams", ["block_size", "max_bits", "reset"])
+BwtParams = namedtuple("BwtParams", ["block_size", "sample_rate"])
+
+Codec = namedtuple("Codec", ["id", "params", "layout"])
+CODECS = {
+    "lzw": Codec(1, LzwParams, struct.Struct(">IBB")),
+    "bwt": Codec(2, BwtParams, struct.Struct(">II")),
+}
+
+ContainerHeader = namedtuple("ContainerHeader", ["codec", "params", "size"])
+
+
+def file_header(codec, params):
+    """Create the header of a container file.
+    :param codec: "lzw" or "bwt".
+    :param params: LzwParams or BwtParams of the codec.
+    :return: header bytes.
+    """
+    if codec not in CODECS:
+        raise ValueError("Unknown codec: {}".format(codec))
+    info = CODECS[codec]
+    packed = info.layout.pack(*params)
+    return HEADER.pack(MAGIC, VERSION, info.id, len(packed)) + packed
+
+
+def read_file_header(stream):
+    """Read the header of a container file. Parameters after the known ones
+    are skipped, so later versions of a codec can add parameters.
+    :param stream: binary stream at the start of the file.
+    :return: ContainerHeader with the codec name, its parameters and the size
+    of the header.
+    :raises ValueError: if the stream is not a container of a known version.
+    """
+    header = stream.read(HEADER.size)
+    if len(header) < HEADER.size or not header.startswith(MAGIC):
+        raise ValueError("Not a multipack container.")
+    _, version, codec_id, params_length = HEADER.unpack(header)
+    if version != VERSION:
+        raise ValueError("Unsupported container version {}.".format(version))
+    for codec, info in CODECS.items():
+        if info.id == codec_id:
+            break
+    else:
+        raise ValueError("Unknown codec id {}.".format(codec_id))
+    packed = stream.read(params_length)
+    if len(packed) < info.layout.size:
+        raise ValueError("Truncated codec parameters.")
+    params = info.params._make(info.layout.unpack_from(packed))
+    return ContainerHeader(codec, params, HEADER.size + params_length)
+
+
+def is_container(stream):
+    """Check for the magic string at the start of a seekable stream. The
+    stream is left at the start.
+    :param stream: seekable binary stream.
+    :return: True for a container file.
+    """
+    stream.seek(0)
+    start = stream.read(len(MAGIC))
+    stream.seek(0)
+    return start == MAGIC
+
+
+def detect(stream):
+    """Find out the codec of a compressed file from its header.
+    :param stream: seekable binary stream.
+    :return: codec name, or None if the file is not a container.
+    :raises ValueError: if the container header is not valid.
+    """
+    if is_container(stream):
+        return read_file_header(stream).codec
+    return None
+
+
+def encode_frame(block, encode):
+    """Compress one block to a frame.
+    :param block: input bytes.
+    :param encode: function, which compresses one block of the codec.
+    :return: frame with its header.
+    """
+    payload = encode(block)
+    return FRAME_HEADER.pack(len(block), len(payload), crc32(payload),
+                             crc32(block)) + payload
+
+
+def decode_frame(frame, decode):
+    """Check the checksums of a frame and decode it.
+    :param frame: frame created with encode_frame.
+    :param decode: function, which uncompresses one block of the codec.
+    :return: original block.
+    :raises ValueError: if the frame is truncated or damaged.
+    """
+    payload = frame_payload(frame)
+    length, _, _, block_crc = FRAME_HEADER.unpack_from(frame)
+    block = decode(payload)
+    if len(block) != length or crc32(block) != block_crc:
+        raise ValueError("Decoded block doesn't match its checksum.")
+    return block
+
+
+def frame_payload(frame):
+    """Check the payload checksum of a frame and take out the payload.
+    :param frame: frame created with encode_frame.
+    :return: compressed payload.
+    :raises ValueError: if the frame is truncated or the checksum is wrong.
+    """
+    if len(frame) < FRAME_HEADER.size:
+        raise ValueError("Truncated block header.")
+    _, payload_length, payload_crc, _ = FRAME_HEADER.unpack_from(frame)
+    payload = frame[FRAME_HEADER.size:FRAME_HEADER.size + payload_length]
+    if len(payload) < payload_length:
+        raise ValueError("Truncated block.")
+    if crc32(payload) != payload_crc:
+        raise ValueError("Compressed block doesn't match its checksum.")
+    return payload
+
+
+def check_frame(frame, decode):
+    """Decode one frame and report if it is damaged.
+    :param frame: frame created with encode_frame.
+    :param decode: function, which uncompresses one block of the codec.
+    :return: error message, or None if the block is intact.
+    """
+    try:
+        decode_frame(frame, decode)
+    except ValueError as error:
+        return str(error)
+    return None
+
+
+def block_decoder(header):
+    """Create a function, which checks and decodes one frame of a file.
+    :param header: ContainerHeader of the file.
+    :return: picklable function of one frame.
+    """
+    return partial(decode_frame, decode=_codec_decoder(header))
+
+
+def _codec_decoder(header):
+    """Create a function, which uncompresses one payload of a file."""
+    if header.codec == "lzw":
+        return partial(uncompress_segment, max_bits=header.params.max_bits,
+                       reset=bool(header.params.reset))
+    if header.params.sample_rate:
+        return decode_search_block
+    return decode_bwt_frame
+
+
+def _block_encoder(codec, params):
+    """Create a function, which compresses one block to a frame."""
+    if codec == "lzw":
+        encode = partial(compress_segment, max_bits=params.max_bits,
+                         reset=bool(params.reset))
+    elif params.sample_rate:
+        encode = partial(encode_search_block, sample_rate=params.sample_rate)
+    else:
+        encode = encode_block
+    return partial(encode_frame, encode=encode)
+
+
+def decode_bwt_frame(payload):
+    """Decode the Huffman frame of one BWT block.
+    :param payload: Huffman frame created with bwt.encode_block.
+    :return: original block.
+    """
+    return decode_block(decode_huffman_frame(payload))
+
+
+def read_frames(stream):
+    """Read frames one after another, up to the end of the blocks.
+    :param stream: binary stream after the file header.
+    :return: generator of frames with their headers.
+    """
+    while True:
+        header = stream.read(FRAME_HEADER.size)
+        if not header or header == FRAMES_END:
+            break
+        if len(header) < FRAME_HEADER.size:
+            raise ValueError("Truncated block header.")
+        payload_length = FRAME_HEADER.unpack(header)[1]
+        payload = stream.read(payload_length)
+        if len(payload) < payload_length:
+            raise ValueError("Truncated block.")
+        yield header + payload
+
+
+def indexed_frames(stream, index):
+    """Read the frames at the offsets of the block index.
+    :param stream: seekable binary stream.
+    :param index: list of IndexEntry tuples.
+    :return: generator of frames with their headers.
+    """
+    for entry in index:
+        stream.seek(entry.offset)
+        yield stream.read(entry.length)
+
+
+def _frames(stream, header):
+    """Read the frames with the block index if the stream is seekable and has
+    one, and otherwise one after another.
+    :param stream: binary stream after the file header.
+    :param header: ContainerHeader of the file.
+    :return: iterable of frames with their headers.
+    """
+    if stream.seekable():
+        index = read_index(stream)
+        stream.seek(header.size)
+        if index is not None:
+            return indexed_frames(stream, index)
+    return read_frames(stream)
+
+
+class ContainerWriter:
+    """Writer of a container file, one frame at a time."""
+
+    def __init__(self, stream, codec, params):
+        """Write the file header.
+        :param stream: binary output stream.
+        :param codec: "lzw" or "bwt".
+        :param params: LzwParams or BwtParams of the codec.
+        """
+        header = file_header(codec, params)
+        stream.write(header)
+        self.encode = _block_encoder(codec, params)
+        self.index = IndexWriter(stream, len(header))
+        self.original_length = 0
+
+    def write_block(self, block):
+        """Compress one block and write its frame.
+        :param block: input bytes, at most the block size of the codec.
+        """
+        self.write_frame(self.encode(block))
+
+    def write_frame(self, frame):
+        """Write a frame created with the encode function of the writer.
+        :param frame: frame with its header.
+        """
+        length = FRAME_HEADER.unpack_from(frame)[0]
+        self.index.write_block(frame, length)
+        self.original_length += length
+
+    def finish(self):
+        """End the frames and write the block index. The stream is not
+        closed.
+        :return: length of the container file.
+        """
+        return self.index.write_index(FRAMES_END)
+
+
+def compress_stream(in_stream, out_stream, codec, params, jobs=1):
+    """Compress a stream to a container file.
+    :param in_stream: binary input stream.
+    :param out_stream: binary output stream.
+    :param codec: "lzw" or "bwt".
+    :param params: LzwParams or BwtParams of the codec.
+    :param jobs: number of processes compressing the blocks.
+    :return: tuple of the lengths of the input and the output.
+    """
+    writer = ContainerWriter(out_stream, codec, params)
+    blocks = regroup(read_chunks(in_stream, params.block_size),
+                     params.block_size)
+    if jobs > 1:
+        frames = parallel_map(writer.encode, blocks, jobs)
+    else:
+        frames = map(writer.encode, blocks)
+    for frame in frames:
+        writer.write_frame(frame)
+    return writer.original_length, writer.finish()
+
+
+def uncompressed_blocks(in_stream, jobs=1):
+    """Read the header of a container file and create a generator of its
+    decoded blocks. The frames are read only as the blocks are taken.
+    :param in_stream: binary stream at the start of the file.
+    :param jobs: number of processes decoding the blocks.
+    :return: generator of the original blocks.
+    :raises ValueError: if the stream is not a container, or later from the
+    generator, if a block is damaged.
+    """
+    decode = block_decoder(read_file_header(in_stream))
+    frames = read_frames(in_stream)
+    if jobs > 1:
+        return parallel_map(decode, frames, jobs)
+    return (decode(frame) for frame in frames)
+
+
+def uncompress_stream(in_stream, out_stream, skip_corrupted=False, jobs=1):
+    """Uncompress a container file. The frames are read one at a time, so the
+    stream doesn't need to be seekable. Damaged blocks can be left out of the
+    output. The blocks are then read with the block index, if the stream is
+    seekable and has one, so that a damaged frame header doesn't hide the
+    blocks after it.
+    :param in_stream: binary stream at the start of the file.
+    :param out_stream: binary output stream.
+    :param skip_corrupted: leave out damaged blocks instead of stopping.
+    :param jobs: number of processes decoding the blocks, when damaged blocks
+    are not skipped.
+    :return: list of the numbers of the left out blocks.
+    :raises ValueError: if a block is damaged and not skipped.
+    """
+    if not skip_corrupted:
+        for block in uncompressed_blocks(in_stream, jobs):
+            out_stream.write(block)
+        return []
+    header = read_file_header(in_stream)
+    decode = block_decoder(header)
+    skipped = []
+    for number, frame in enumerate(_frames(in_stream, header)):
+        try:
+            block = decode(frame)
+        except ValueError:
+            skipped.append(number)
+        else:
+            out_stream.write(block)
+    return skipped
+
+
+def verify(stream, jobs=1):
+    """Decode every block of a container file and check the checksums.
+    :param stream: binary stream of the file. The blocks of a seekable
+    stream are read with the block index.
+    :param jobs: number of processes checking the blocks.
+    :return: list of (block number, error message) tuples of the damaged
+    blocks.
+    """
+    header = read_file_header(stream)
+    frames = _frames(stream, header)
+    check = partial(check_frame, decode=_codec_decoder(header))
+    if jobs > 1:
+        errors = parallel_map(check, frames, jobs)
+    else:
+        errors = map(check, frames)
+    return [(number, error) for number, error in enumerate(errors) if error]
@@ -3,88 +3,36 @@
 
 """Data structures."""
 
+from array import array
 
-class LinkedList:
-    """Linked list implementation."""
 
-    def __init__(self):
-        self.first = None
-        self.current = None
-
-    def add_last(self, key, value):
-        """Add new node to the last position of this linked list."""
-        if self.first is None:
-            self.first = Node(key, value)
-        else:
-            temp_last = self.first
-            while temp_last.next is not None:
-                temp_last = temp_last.next
-            temp_last.next = Node(key, value)
-
-    def add_first(self, key=None, value=None):
-        """Add a new data node to the first position in the linked list."""
-        new_node = Node(key, value)
-        new_node.next = self.first
-        self.first = new_node
-
-    def __iter__(self):
-        if self.first is not None:
-            self.current = self.first
-        return self
-
-    def __next__(self):
-        if self.current is None:
-            raise StopIteration
-        else:
-            val = self.current
-            self.current = self.current.next
-            return val
-
-    def __str__(self):
-        string = ""
-        node = self.first
-        while node is not None:
-            string += str(node) + ", "
-            node = node.next
-        return string
-
-
-class Node:
-    """Node in linked list."""
-
-    def __init__(self, key=None, value=None):
-        self.key = key
-        self.data = value
-        self.next = None
-
-    def __eq__(self, other):
-        return self.data == other.data
-
-    def __le__(self, other):
-        return self.data <= other.data
-
-    def __lt__(self, other):
-        return self.data < other.data
-
-    def __ge__(self, other):
-        return self.data >= other.data
-
-    def __gt__(self, other):
-        return self.data > other.data
+_EMPTY = object()
 
-    def __str__(self):
-        return str(self.data)
+MIN_CAPACITY = 8
+HASH_MULTIPLIER = 0x9E3779B1
+HASH_SHIFT = 12
 
 
 class HashTable:
-    """Hash table with linked list collision handling.
+    """Hash table with open addressing and linear probing.
 
-    6151 is the default table size as it's not close to a power of two and it's
-    a prime number.
+    The keys and the values are in two parallel lists, whose length is a power
+    of two. A key is in the first free slot starting from its hash, so a lookup
+    goes through one run of slots and no objects are allocated for the
+    entries. The table doubles its size when it gets half full, which keeps the
+    runs short.
     """
 
-    def __init__(self, size=6151):
-        self.nodes = [None] * size
+    def __init__(self, size=MIN_CAPACITY):
+        """
+        :param size: number of keys which fit in the table before it grows.
+        """
+        capacity = MIN_CAPACITY
+        while capacity < 2 * size:
+            capacity <<= 1
+        self.keys = [_EMPTY] * capacity
+        self.values = [None] * capacity
+        self.mask = capacity - 1
         self.size = 0
 
     def __setitem__(self, key, value):
@@ -92,64 +40,88 @@ class HashTable:
         :param key: the key we want to target.
         :param value: value for the key.
         """
-        node_hash = self.hash(key)
-        if self.nodes[node_hash] is None:
-            self.nodes[node_hash] = LinkedList()
-            self.nodes[node_hash].add_first(key, value)
-        else:
-            node = self.nodes[node_hash].first
-            while node is not None:
-                if node.key == key:
-                    node.data = value
-                    return
-                node = node.next
-            self.nodes[node_hash].add_last(key, value)
-
+        keys = self.keys
+        slot = self.hash(key)
+        found = keys[slot]
+        while found is not _EMPTY:
+            if found == key:
+                self.values[slot] = value
+                return
+            slot = (slot + 1) & self.mask
+            found = keys[slot]
+        keys[slot] = key
+        self.values[slot] = value
         self.size += 1
+        if 2 * self.size > len(keys):
+            self._resize(2 * len(keys))
 
     def __getitem__(self, item):
         """Get value for specified key.
         :param item: key in the hash table.
         :return: value associated with the key.
         """
-        if item not in self:
+        value = self.get(item, _EMPTY)
+        if value is _EMPTY:
             raise KeyError('key "{}" not in hash table.'.format(item))
-        hashed = self.hash(item)
-        node = self.nodes[hashed].first
-        while node is not None:
-            if node.key == item:
-                return node.data
-            node = node.next
+        return value
+
+    def get(self, key, default=None):
+        """Get value for a key with one search of its slots.
+        :param key: key in the hash table.
+        :param default: value returned if the key is not in the table.
+        :return: value associated with the key, or default.
+        """
+        keys = self.keys
+        mask = self.mask
+        slot = (hash(key) * HASH_MULTIPLIER >> HASH_SHIFT) & mask
+        found = keys[slot]
+        while found is not _EMPTY:
+            if found == key:
+                return self.values[slot]
+            slot = (slot + 1) & mask
+            found = keys[slot]
+        return default
 
     def __contains__(self, item):
         """Check if table has key in it.
         :param item: object to search for.
         :return: boolean
         """
-        hashed = self.hash(item)
-        if self.nodes[hashed] is None:
-            return False
-        node = self.nodes[hashed].first
-        while node is not None:
-            if node.key == item:
-                return True
-            node = node.next
-        return False
+        return self.get(item, _EMPTY) is not _EMPTY
 
     def hash(self, key):
-        """Remainder based hashing function as in course material."""
-        hashed = hash(key)
-        return hashed % len(self.nodes)
+        """First slot of a key. The hash is multiplied with a large odd
+        number, and the slot is taken from the middle bits of the product, as
+        integer keys are their own hashes and the low bits of the LZW keys
+        are only the last byte of the string.
+        """
+        return (hash(key) * HASH_MULTIPLIER >> HASH_SHIFT) & self.mask
+
+    def _resize(self, capacity):
+        """Move the entries to a new table.
+        :param capacity: number of slots, a power of two.
+        """
+        keys = self.keys
+        values = self.values
+        self.keys = [_EMPTY] * capacity
+        self.values = [None] * capacity
+        self.mask = capacity - 1
+        self.size = 0
+        for key, value in zip(keys, values):
+            if key is not _EMPTY:
+                self[key] = value
+
+    def __iter__(self):
+        return (key for key in self.keys if key is not _EMPTY)
 
     def __len__(self):
         return self.size
 
     def __str__(self):
         text = ""
-        for i in range(len(self.nodes)):
-            if self.nodes[i] is None:
-                continue
-            text += str(self.nodes[i]) + "\n"
+        for key, value in zip(self.keys, self.values):
+            if key is not _EMPTY:
+                text += "{}: {}\n".format(key, value)
         return text
 
 
@@ -185,7 +157,110 @@ class DynamicArray:
     def double_capacity(self):
         """Double the size of the array."""
         temp = [None] * self.size * 2
-        for i in range(self.index):
-            temp[i] = self.array[i]
+        temp[:self.index] = self.array[:self.index]
         self.array = temp
         self.size *= 2
+
+
+class TypedArray:
+    """Dynamic array of numbers in compact storage.
+
+    The items are stored in a bytearray for typecode "B", and in an
+    array.array of the typecode otherwise, so an item takes its own size
+    instead of a pointer and an integer object. When the array grows, the
+    capacity is doubled and the items are copied with one slice assignment.
+    """
+
+    def __init__(self, typecode="B", length=0, initial=()):
+        """
+        :param typecode: array.array typecode of the items.
+        :param length: initial length, filled with zeros.
+        :param initial: iterable or bytes-like object of the first items.
+        """
+        self.typecode = typecode
+        self.size = max(16, length)
+        self.array = self._allocate(self.size)
+        self.index = length
+        if initial:
+            values = self._convert(initial)
+            self._reserve(len(values))
+            self.array[:len(values)] = values
+            self.index = max(self.index, len(values))
+
+    def _allocate(self, capacity):
+        """Allocate storage of zeros for the typecode."""
+        if self.typecode == "B":
+            return bytearray(capacity)
+        return array(self.typecode, bytes(capacity * array(
+            self.typecode).itemsize))
+
+    def _convert(self, values):
+        """Convert values to the storage type, without copying them if they
+        already are of it."""
+        if self.typecode == "B":
+            if isinstance(values, (bytes, bytearray)):
+                return values
+            return bytearray(values)
+        if isinstance(values, array) and values.typecode == self.typecode:
+            return values
+        return array(self.typecode, values)
+
+    def _reserve(self, capacity):
+        """Double the capacity until it is at least the given one."""
+        size = self.size
+        while size < capacity:
+            size *= 2
+        if size != self.size:
+            temp = self._allocate(size)
+            temp[:self.index] = self.array[:self.index]
+            self.array = temp
+            self.size = size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.array[slice(*index.indices(self.index))]
+        if index < 0:
+            index += self.index
+        if not 0 <= index < self.index:
+            raise IndexError("TypedArray index out of range")
+        return self.array[index]
+
+    def __setitem__(self, index, value):
+        if index < 0:
+            index += self.index
+            if index < 0:
+                raise IndexError("TypedArray index out of range")
+        self._reserve(index + 1)
+        self.array[index] = value
+        self.index = max(self.index, index + 1)
+
+    def __len__(self):
+        return self.index
+
+    def __iter__(self):
+        return iter(self.array[:self.index])
+
+    def append(self, value):
+        """Add new value to end of the array.
+        :param value: New value to be added.
+        """
+        self._reserve(self.index + 1)
+        self.array[self.index] = value
+        self.index += 1
+
+    def extend(self, values):
+        """Add values to the end of the array with one slice assignment.
+        :param values: iterable or bytes-like object of the values.
+        """
+        values = self._convert(values)
+        end = self.index + len(values)
+        self._reserve(end)
+        self.array[self.index:end] = values
+        self.index = end
+
+    def memoryview(self):
+        """Export the items without copying them. The view is of the current
+        storage, which is replaced when the array grows.
+        :return: memoryview of the items.
+        """
+        return memoryview(self.array)[:self.index]
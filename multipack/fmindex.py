@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+#  -*- coding: utf-8 -*-
+
+"""FM-index for searching BWT blocks without restoring them.
+
+The last column of the sorted rotations and its byte counts are enough to count
+the rotations starting with a pattern, one pattern byte at a time from the end
+(backward search). A block with an FM-index is stored so that a search decodes
+only the parts of the last column it reads:
+
+* segments: the last column is split to segments of SEGMENT_ROWS rows. Every
+  segment is move-to-front and run-length encoded from a clean state and
+  Huffman coded with one code of the whole block, so any segment can be
+  decoded alone. A segment is decoded the first time a row in it is read.
+* occurrence checkpoints: the count of every byte of the block in every
+  segment. Summed up, they give the count of a byte before each segment, so
+  counting the bytes before a row decodes only the segment of the row, and no
+  segment at all if the byte is not in it.
+* sampled suffix array: the row of every sample_rate:th rotation, so the
+  position of a row is found by walking the LF-mapping to a sampled row. The
+  rows are packed in as many bits as the largest row needs.
+
+A block which repeats a shorter string k times has k equal copies of every
+rotation. The copies are next to each other, so the sorted rows are groups of
+k, and the offset of a row in its group tells which repeat it is. The
+LF-mapping keeps the offset, so only the first repeat is sampled.
+"""
+
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+
+from multipack.bitio import BitWriter, BitReader
+from multipack.bwt import BLOCK_HEADER, bwt_decode, mtf_encode, mtf_decode, \
+    rle_encode, rle_decode
+from multipack.huffman import encode_parts, part_decoder, LENGTHS_SIZE
+from multipack.sorting import rotation_sort
+from multipack.stages import pipeline
+
+SAMPLE_RATE = 64
+SEGMENT_ROWS = 16 * 1024
+
+SEARCH_HEADER = struct.Struct(">IIII")
+SEGMENT_ENTRY = struct.Struct(">II")
+SAMPLES_HEADER = struct.Struct(">II")
+ALPHABET_SIZE = 32
+
+
+def encode_search_block(block, sample_rate=SAMPLE_RATE,
+                        segment_rows=SEGMENT_ROWS):
+    """Encode one block with BWT and store it with its FM-index.
+    The block starts with a header of the block length, the primary index,
+    the number of rows in a segment and the length of the samples. The
+    Huffman code lengths, the bitmap of the bytes in the block, the symbol
+    count and encoded length of every segment, the byte counts of the
+    segments and the samples follow, and the encoded segments end the block.
+    :param block: input bytes.
+    :param sample_rate: distance of the sampled positions in the block.
+    :param segment_rows: number of rows in one segment, at most 65535.
+    :return: encoded block.
+    """
+    order = rotation_sort(block)
+    last_column = bytes([block[start - 1] for start in order])
+    samples = build_samples(block, order, last_column, sample_rate)
+    segments = [last_column[start:start + segment_rows]
+                for start in range(0, len(last_column), segment_rows)]
+    codes = [b"".join(pipeline([segment], mtf_encode, rle_encode))
+             for segment in segments]
+    lengths, parts = encode_parts(codes)
+    alphabet = sorted(set(last_column))
+    bitmap = bytearray(ALPHABET_SIZE)
+    for byte in alphabet:
+        bitmap[byte >> 3] |= 0x80 >> (byte & 7)
+    entries = b"".join(SEGMENT_ENTRY.pack(len(code), len(part))
+                       for code, part in zip(codes, parts))
+    counts = array("H", [segment.count(byte) for segment in segments
+                         for byte in alphabet])
+    if sys.byteorder == "little":
+        counts.byteswap()
+    header = SEARCH_HEADER.pack(len(block), order.index(0), segment_rows,
+                                len(samples))
+    return b"".join([header, lengths, bytes(bitmap), entries,
+                     counts.tobytes(), samples] + parts)
+
+
+def decode_search_block(payload):
+    """Decode a whole block encoded with encode_search_block.
+    :param payload: encoded block.
+    :return: original block.
+    :raises ValueError: if the block is truncated or corrupted.
+    """
+    index = FmIndex(payload)
+    return b"".join(bwt_decode([BLOCK_HEADER.pack(index.length,
+                                                  index.primary),
+                                index.last_column()]))
+
+
+def build_samples(block, order, last_column, sample_rate=SAMPLE_RATE):
+    """Create the search samples for one block.
+    :param block: original block.
+    :param order: sorted rotation indices of the block.
+    :param last_column: bwt-rearranged block.
+    :param sample_rate: distance of the sampled positions in the block.
+    :return: samples as bytes.
+    """
+    length = len(last_column)
+    period = (block + block).find(block, 1) if length else 1
+    repeats = length // period
+    rows = array("I", bytes(4 * ((period + sample_rate - 1) // sample_rate)))
+    for row, start in enumerate(order):
+        if start < period and start % sample_rate == 0:
+            rows[start // sample_rate] = row - row % repeats
+    writer = BitWriter()
+    writer.write_many(rows, _row_width(length))
+    return SAMPLES_HEADER.pack(sample_rate, repeats) + writer.flush()
+
+
+def _row_width(length):
+    """Get the number of bits in the row numbers of a block."""
+    return max(1, (length - 1).bit_length())
+
+
+class FmIndex:
+    """Search index of one BWT block."""
+
+    def __init__(self, payload):
+        """Read the tables of a block encoded with encode_search_block. The
+        segments of the last column are decoded only when they are read.
+        :param payload: encoded block.
+        :raises ValueError: if the block is truncated or corrupted.
+        """
+        tables_start = SEARCH_HEADER.size + LENGTHS_SIZE + ALPHABET_SIZE
+        if len(payload) < tables_start:
+            raise ValueError("Truncated search block.")
+        (self.length, self.primary, self.segment_rows,
+         samples_length) = SEARCH_HEADER.unpack_from(payload)
+        if (not self.length or not 0 < self.segment_rows <= 0xffff or
+                self.primary >= self.length):
+            raise ValueError("Corrupted search block.")
+        self.decode_part = part_decoder(
+            payload[SEARCH_HEADER.size:SEARCH_HEADER.size + LENGTHS_SIZE])
+        bitmap = payload[tables_start - ALPHABET_SIZE:tables_start]
+        self.alphabet = {}
+        for byte in range(256):
+            if bitmap[byte >> 3] & 0x80 >> (byte & 7):
+                self.alphabet[byte] = len(self.alphabet)
+
+        segment_count = -(-self.length // self.segment_rows)
+        counts_start = tables_start + SEGMENT_ENTRY.size * segment_count
+        samples_start = counts_start + 2 * segment_count * len(self.alphabet)
+        position = samples_start + samples_length
+        if len(payload) < position:
+            raise ValueError("Truncated search block.")
+        self.segments = []
+        for symbols, size in SEGMENT_ENTRY.iter_unpack(
+                payload[tables_start:counts_start]):
+            self.segments.append((symbols, position, position + size))
+            position += size
+        if len(payload) < position:
+            raise ValueError("Truncated search block.")
+        self.payload = payload
+        self.decoded = {}
+
+        self.counts = array("H", payload[counts_start:samples_start])
+        if sys.byteorder == "little":
+            self.counts.byteswap()
+        self.checkpoints = {}
+        totals = [0] * 256
+        for byte, column in self.alphabet.items():
+            totals[byte] = sum(self.counts[column::len(self.alphabet)])
+        self.byte_start = [0] + list(accumulate(totals))
+        if self.byte_start[-1] != self.length:
+            raise ValueError("Corrupted search block.")
+        self._read_samples(payload[samples_start:samples_start +
+                                   samples_length])
+
+    def _read_samples(self, samples):
+        """Read the samples created with build_samples."""
+        if len(samples) < SAMPLES_HEADER.size:
+            raise ValueError("Block has no search samples.")
+        self.sample_rate, self.repeats = SAMPLES_HEADER.unpack_from(samples)
+        if (not self.sample_rate or not self.repeats or
+                self.length % self.repeats):
+            raise ValueError("Corrupted search samples.")
+        self.period = self.length // self.repeats
+        count = (self.period + self.sample_rate - 1) // self.sample_rate
+        reader = BitReader([samples[SAMPLES_HEADER.size:]])
+        rows = reader.read_many(count, _row_width(self.length))
+        if len(rows) < count:
+            raise ValueError("Truncated search samples.")
+        self.sampled = {row: index * self.sample_rate
+                        for index, row in enumerate(rows)}
+
+    def segment(self, number):
+        """Get one segment of the last column. It is decoded the first time
+        it is needed.
+        :param number: segment number.
+        :return: rows of the segment as bytes.
+        :raises ValueError: if the segment is corrupted.
+        """
+        segment = self.decoded.get(number)
+        if segment is None:
+            symbols, start, end = self.segments[number]
+            codes = self.decode_part(self.payload[start:end], symbols)
+            segment = b"".join(pipeline([codes], rle_decode, mtf_decode))
+            if len(segment) != min(self.segment_rows,
+                                   self.length - number * self.segment_rows):
+                raise ValueError("Corrupted search block.")
+            self.decoded[number] = segment
+        return segment
+
+    def last_column(self):
+        """Decode the whole last column.
+        :return: bwt-rearranged block.
+        """
+        return b"".join(map(self.segment, range(len(self.segments))))
+
+    def last_byte(self, row):
+        """Get one byte of the last column.
+        :param row: row index.
+        :return: byte value.
+        """
+        return self.segment(row // self.segment_rows)[row % self.segment_rows]
+
+    def occurrences(self, byte, row):
+        """Count the occurrences of a byte in the last column before a row.
+        :param byte: byte value.
+        :param row: row index, from 0 to the block length.
+        :return: count of the byte in last_column[:row].
+        """
+        checkpoints = self.byte_checkpoints(byte)
+        number, offset = divmod(row, self.segment_rows)
+        if not offset or checkpoints[number] == checkpoints[number + 1]:
+            return checkpoints[number]
+        if offset < self.segment_rows // 2:
+            return checkpoints[number] + self.segment(number).count(byte, 0,
+                                                                    offset)
+        return checkpoints[number + 1] - self.segment(number).count(byte,
+                                                                    offset)
+
+    def byte_checkpoints(self, byte):
+        """Get the counts of a byte before every segment of the last column.
+        They are summed up from the stored counts the first time the byte is
+        needed.
+        :param byte: byte value.
+        :return: list of counts, the last one is the count in the whole
+        column.
+        """
+        checkpoints = self.checkpoints.get(byte)
+        if checkpoints is None:
+            checkpoints = [0] * (len(self.segments) + 1)
+            if byte in self.alphabet:
+                counts = self.counts[self.alphabet[byte]::len(self.alphabet)]
+                checkpoints[1:] = accumulate(counts)
+            self.checkpoints[byte] = checkpoints
+        return checkpoints
+
+    def lf(self, row):
+        """LF-mapping: the row of the rotation starting one byte earlier.
+        :param row: row index.
+        :return: row index.
+        """
+        byte = self.last_byte(row)
+        return self.byte_start[byte] + self.occurrences(byte, row)
+
+    def psi(self, row):
+        """Inverse of the LF-mapping: the row of the rotation starting one byte
+        later.
+        :param row: row index.
+        :return: row index.
+        """
+        byte = self.first_byte(row)
+        nth = row - self.byte_start[byte]
+        checkpoints = self.byte_checkpoints(byte)
+        number = bisect_right(checkpoints, nth) - 1
+        segment = self.segment(number)
+        position = 0
+        for _ in range(nth - checkpoints[number] + 1):
+            position = segment.index(byte, position) + 1
+        return number * self.segment_rows + position - 1
+
+    def first_byte(self, row):
+        """Get the first byte of a rotation.
+        :param row: row index.
+        :return: byte value.
+        """
+        byte = 0
+        while self.byte_start[byte + 1] <= row:
+            byte += 1
+        return byte
+
+    def match_rows(self, pattern):
+        """Backward search for the rows of the rotations starting with the
+        pattern.
+        :param pattern: non-empty byte string.
+        :return: tuple of the first and past-the-end rows.
+        """
+        low, high = 0, self.length
+        for byte in reversed(pattern):
+            low = self.byte_start[byte] + self.occurrences(byte, low)
+            high = self.byte_start[byte] + self.occurrences(byte, high)
+            if low >= high:
+                return 0, 0
+        return low, high
+
+    def count(self, pattern):
+        """Count the occurrences of a pattern in the block.
+        Rotations which wrap around the end of the block are not counted. They
+        start at the last len(pattern) - 1 positions, which are found by
+        walking the LF-mapping from the primary row.
+        :param pattern: non-empty byte string.
+        :return: number of occurrences.
+        """
+        if len(pattern) > self.length:
+            return 0
+        low, high = self.match_rows(pattern)
+        matches = high - low
+        row = self.primary - self.primary % self.repeats
+        for position in range(self.length - 1,
+                              self.length - min(len(pattern), self.length),
+                              -1):
+            row = self.lf(row)
+            if low <= row + position // self.period < high:
+                matches -= 1
+        return matches
+
+    def locate(self, pattern):
+        """Find the positions of a pattern in the block.
+        :param pattern: non-empty byte string.
+        :return: sorted list of positions.
+        """
+        low, high = self.match_rows(pattern)
+        positions = []
+        for row in range(low, high):
+            position = self.position(row)
+            if position + len(pattern) <= self.length:
+                positions.append(position)
+        positions.sort()
+        return positions
+
+    def position(self, row):
+        """Find the position of the rotation of a row in the block.
+        :param row: row index.
+        :return: start position of the rotation.
+        """
+        repeat = row % self.repeats
+        row -= repeat
+        steps = 0
+        while row not in self.sampled:
+            row = self.lf(row)
+            steps += 1
+        return ((self.sampled[row] + steps) % self.period +
+                repeat * self.period)
+
+    def head(self, count):
+        """Extract the first bytes of the block.
+        :param count: number of bytes.
+        :return: up to count first bytes.
+        """
+        output = bytearray()
+        row = self.primary
+        for _ in range(min(count, self.length)):
+            output.append(self.first_byte(row))
+            row = self.psi(row)
+        return bytes(output)
+
+    def tail(self, count):
+        """Extract the last bytes of the block.
+        :param count: number of bytes.
+        :return: up to count last bytes.
+        """
+        output = bytearray()
+        row = self.primary
+        for _ in range(min(count, self.length)):
+            output.append(self.last_byte(row))
+            row = self.lf(row)
+        output.reverse()
+        return bytes(output)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+#  -*- coding: utf-8 -*-
+
+"""Canonical Huffman coding with table-driven decoding."""
+
+import heapq
+import struct
+from functools import partial
+
+from multipack.stages import read_exact
+
+MAX_CODE_LENGTH = 15
+
+FRAME_HEADER = struct.Struct(">II")
+END_MARKER = FRAME_HEADER.pack(0, 0)
+LENGTHS_SIZE = 128
+
+
+def encode_frame(frame):
+    """Encode bytes as one frame with its own code.
+    A frame has a header with the decoded and encoded lengths, the code
+    lengths of all 256 symbols packed in four bits each, and the codes.
+    :param frame: byte string for the encoding.
+    :return: encoded frame.
+    """
+    lengths = code_lengths(_byte_counts(frame))
+    payload = _encode_frame(frame, lengths)
+    return (FRAME_HEADER.pack(len(frame), len(payload)) +
+            _pack_lengths(lengths) + payload)
+
+
+def huffman_decode(chunks):
+    """Decode Huffman coded frames. Frames are never empty, so the header of an
+    empty frame, END_MARKER, ends the frames. Data after it is not read.
+    :param chunks: iterable of byte chunks of encoded frames.
+    :return: generator of decoded frames.
+    """
+    source = iter(chunks)
+    buffer = bytearray()
+    while True:
+        header = read_exact(source, FRAME_HEADER.size, buffer)
+        if not header or header == END_MARKER:
+            break
+        if len(header) < FRAME_HEADER.size:
+            raise ValueError("Truncated Huffman frame header.")
+        length, payload_length = FRAME_HEADER.unpack(header)
+        lengths = _unpack_lengths(read_exact(source, LENGTHS_SIZE, buffer))
+        payload = read_exact(source, payload_length, buffer)
+        if len(payload) < payload_length:
+            raise ValueError("Truncated Huffman frame.")
+        yield _decode_frame(payload, lengths, length)
+
+
+def decode_frame(frame):
+    """Decode one whole frame created with encode_frame.
+    :param frame: encoded frame with its header.
+    :return: decoded bytes.
+    """
+    if len(frame) < FRAME_HEADER.size + LENGTHS_SIZE:
+        raise ValueError("Truncated Huffman frame header.")
+    length, payload_length = FRAME_HEADER.unpack_from(frame)
+    start = FRAME_HEADER.size + LENGTHS_SIZE
+    payload = frame[start:start + payload_length]
+    if len(payload) < payload_length:
+        raise ValueError("Truncated Huffman frame.")
+    return _decode_frame(payload, _unpack_lengths(frame[FRAME_HEADER.size:
+                                                        start]), length)
+
+
+def encode_parts(parts):
+    """Encode byte strings with one code, which is counted from all of them.
+    Every part starts at a byte boundary, so it can be decoded alone.
+    :param parts: list of byte strings.
+    :return: tuple of the code lengths packed in LENGTHS_SIZE bytes, and the
+    list of the encoded parts.
+    """
+    frequencies = [0] * 256
+    for part in parts:
+        for byte, count in enumerate(_byte_counts(part)):
+            frequencies[byte] += count
+    lengths = code_lengths(frequencies)
+    return (_pack_lengths(lengths),
+            [_encode_frame(part, lengths) for part in parts])
+
+
+def part_decoder(packed_lengths):
+    """Create a function, which decodes one part encoded with encode_parts.
+    :param packed_lengths: packed code lengths from encode_parts.
+    :return: function of the encoded part and its number of symbols, which
+    returns the decoded bytes.
+    :raises ValueError: if the code lengths are not valid.
+    """
+    table, max_length = _decode_table(_unpack_lengths(packed_lengths))
+    return partial(_decode_codes, table=table, max_length=max_length)
+
+
+def code_lengths(frequencies):
+    """Count code lengths for the symbols with Huffman's algorithm.
+    If a code would be longer than MAX_CODE_LENGTH, the frequencies are
+    halved until the codes are short enough.
+    :param frequencies: list of symbol frequencies.
+    :return: list of code lengths, zero for symbols which don't appear.
+    """
+    while True:
+        lengths = [0] * len(frequencies)
+        heap = [(count, [symbol]) for symbol, count in enumerate(frequencies)
+                if count]
+        if len(heap) == 1:
+            lengths[heap[0][1][0]] = 1
+        heapq.heapify(heap)
+        while len(heap) > 1:
+            count_1, symbols_1 = heapq.heappop(heap)
+            count_2, symbols_2 = heapq.heappop(heap)
+            for symbol in symbols_1 + symbols_2:
+                lengths[symbol] += 1
+            heapq.heappush(heap, (count_1 + count_2, symbols_1 + symbols_2))
+        if max(lengths, default=0) <= MAX_CODE_LENGTH:
+            return lengths
+        frequencies = [(count + 1) // 2 for count in frequencies]
+
+
+def canonical_codes(lengths):
+    """Assign canonical codes: shorter codes first, then by symbol value.
+    :param lengths: list of code lengths.
+    :return: list of codes as integers.
+    """
+    codes = [0] * len(lengths)
+    code = 0
+    prev_length = 0
+    for length, symbol in sorted((length, symbol)
+                                 for symbol, length in enumerate(lengths)
+                                 if length):
+        code <<= length - prev_length
+        codes[symbol] = code
+        code += 1
+        prev_length = length
+    return codes
+
+
+def _encode_frame(frame, lengths):
+    """Encode one frame with the code lengths.
+    :param frame: byte string for the encoding.
+    :param lengths: list of code lengths.
+    :return: codes as bytes, the last byte padded with zero bits.
+    """
+    codes = canonical_codes(lengths)
+    bit_strings = ["{:0{}b}".format(code, length) if length else ""
+                   for code, length in zip(codes, lengths)]
+    bits = "".join(map(bit_strings.__getitem__, frame))
+    if not bits:
+        return b""
+    bits += "0" * (-len(bits) % 8)
+    return int(bits, 2).to_bytes(len(bits) // 8, byteorder="big")
+
+
+def _decode_table(lengths):
+    """Create the lookup table for decoding.
+    The table is indexed with the next max_length bits of the input. Every
+    entry has the symbol and the length of the code starting with those bits.
+    :param lengths: list of code lengths.
+    :return: tuple of the table and max_length.
+    :raises ValueError: if no symbol has a code, or the lengths are too short
+    to give every symbol its own code.
+    """
+    max_length = max(lengths)
+    if not max_length:
+        raise ValueError("Huffman code lengths are all zero.")
+    if sum(1 << (max_length - length) for length in lengths
+           if length) > 1 << max_length:
+        raise ValueError("Invalid Huffman code lengths.")
+    table = [0] * (1 << max_length)
+    for symbol, (code, length) in enumerate(zip(canonical_codes(lengths),
+                                                lengths)):
+        if length:
+            span = 1 << (max_length - length)
+            start = code << (max_length - length)
+            table[start:start + span] = [symbol << 4 | length] * span
+    return table, max_length
+
+
+def _decode_frame(payload, lengths, length):
+    """Decode one frame with table lookups.
+    :param payload: encoded codes.
+    :param lengths: list of code lengths.
+    :param length: number of symbols in the frame.
+    :return: decoded bytes.
+    """
+    if not length:
+        return b""
+    table, max_length = _decode_table(lengths)
+    return _decode_codes(payload, length, table, max_length)
+
+
+def _decode_codes(payload, length, table, max_length):
+    """Decode codes with the lookup table of _decode_table.
+    :param payload: encoded codes.
+    :param length: number of symbols.
+    :param table: lookup table.
+    :param max_length: length of the longest code.
+    :return: decoded bytes.
+    """
+    output = bytearray(length)
+    mask = (1 << max_length) - 1
+    payload = payload + bytes(4)
+    bits = 0
+    bit_count = 0
+    position = 0
+    for index in range(length):
+        if bit_count < max_length:
+            bits = (bits << 16 | payload[position] << 8 |
+                    payload[position + 1]) & 0xffffffff
+            position += 2
+            bit_count += 16
+        entry = table[(bits >> (bit_count - max_length)) & mask]
+        output[index] = entry >> 4
+        bit_count -= entry & 0xf
+    return bytes(output)
+
+
+def _byte_counts(data):
+    """Count every byte value in data."""
+    return [data.count(byte) for byte in range(256)]
+
+
+def _pack_lengths(lengths):
+    """Pack code lengths of 256 symbols to 128 bytes."""
+    return bytes(lengths[i] << 4 | lengths[i + 1]
+                 for i in range(0, len(lengths), 2))
+
+
+def _unpack_lengths(packed):
+    """Unpack code lengths packed with _pack_lengths."""
+    if len(packed) < LENGTHS_SIZE:
+        raise ValueError("Truncated Huffman code lengths.")
+    lengths = []
+    for byte in packed:
+        lengths.append(byte >> 4)
+        lengths.append(byte & 0xf)
+    return lengths
@@ -1,145 +1,729 @@
 #!/usr/bin/env python3
 #  -*- coding: utf-8 -*-
 
-"""Lempel–Ziv–Welch compression algorithm example, with 4096 dictionary size."""
+"""Lempel–Ziv–Welch compression with variable-width codes.
 
-from multipack.datastructures import HashTable, DynamicArray
+The codes start with 9 bits. The width grows by one bit every time the
+dictionary grows past the largest code of the current width, up to max_bits,
+like in the unix program "compress". After that the dictionary is full.
+
+In reset mode, which is also borrowed from "compress", code 256 is the CLEAR
+code and new entries start from 257. When the dictionary is full, the
+compressor checks the compression ratio every CHECK_GAP input bytes. If the
+ratio of the latest bytes has dropped below RESET_THRESHOLD of the best one
+so far, the input has changed from what the dictionary was built for. The
+compressor then writes CLEAR and starts over with an empty dictionary and 9-bit
+codes, and the uncompressor does the same when it reads CLEAR. The best ratio
+is kept over CLEAR, and the ratio has to stay low for RESET_CHECKS checks in
+a row. Random bytes, in which more than RANDOM_PAIRS of the byte pairs are
+different, don't clear the dictionary, as a new one could not compress them
+either, and the old one is still good for the data after them.
+
+A segmented file splits the input to segments, which are compressed with their
+own dictionaries, so they can be compressed and uncompressed in parallel. The
+file header is followed by one frame for every segment and SEGMENTS_END. A
+frame has the original and compressed lengths of the segment and its codes.
+"""
+
+import io
+import struct
+from itertools import chain
+
+from multipack.bitio import BitWriter, BitReader
+from multipack.datastructures import HashTable, TypedArray
+from multipack.stages import CHUNK_SIZE, read_chunks, read_exact
+
+EMPTY_PREFIX = -1
+MIN_BITS = 9
+MAX_BITS = 16
+
+CODE_BATCH = 16384
+
+CLEAR = 256
+FIRST_CODE = 257
+CHECK_GAP = 16 * 1024
+RESET_THRESHOLD = 0.9
+RESET_CHECKS = 2
+RANDOM_PAIRS = 0.5
+RESET_FLAG = 0x80
+SEGMENTED_FLAG = 0x40
+
+HEADER = struct.Struct(">3sB")
+MAGIC = b"LZW"
+
+SEGMENT_SIZE = 1024 * 1024
+SEGMENT_HEADER = struct.Struct(">II")
+SEGMENTS_END = SEGMENT_HEADER.pack(0, 0)
 
 
 class Lzw:
     """Lempel-Ziv-Welch compression implementation."""
 
-    def __init__(self, stream, dict_size=4096):
+    def __init__(self, stream, max_bits=MAX_BITS, reset=False):
+        """
+        :param stream: binary input stream.
+        :param max_bits: maximum code width for compression, from MIN_BITS to
+        MAX_BITS. Uncompression reads it from the header.
+        :param reset: compress in reset mode. Uncompression reads the mode
+        from the header.
+        """
+        if not MIN_BITS <= max_bits <= MAX_BITS:
+            raise ValueError("max_bits must be between {} and {}"
+                             .format(MIN_BITS, MAX_BITS))
         self.stream = stream
         self.dictionary = None
         self.index = 0
-        self.str = b""
-        self.max = dict_size
+        self.max_bits = max_bits
+        self.max = 1 << max_bits
+        self.reset = reset
+        self.first_code = FIRST_CODE if reset else 256
+        self.code = None
+        self.code_position = 0
+        self.writer = BitWriter()
+        self.best_ratio = 0
+        self.checked_bytes = 0
+        self.checked_codes = 0
+        self.low_checks = 0
+        self.last_ratio = 0
         self.init_dict()
 
-    def _dict_add(self, dict_string):
-        """Add new string to dictionary, and increment the index. Key is a
-        string and value is integer index.
-        :param dict_string: new string for the dictionary.
+    def _dict_add(self, prefix, byte):
+        """Add new string to dictionary, and increment the index. The string
+        is the string of the prefix code followed by one byte, and the key is
+        prefix << 8 | byte, so the strings are never stored. The value is the
+        integer index.
+        :param prefix: code of the string without its last byte.
+        :param byte: last byte of the string.
         """
-        self.dictionary[dict_string] = self.index
+        self.dictionary[prefix << 8 | byte] = self.index
         self.index += 1
 
     def init_dict(self):
-        """Initialize the dictionary with 256 characters."""
-        self.dictionary = HashTable()
+        """Initialize the dictionary with 256 characters. Their prefix is
+        EMPTY_PREFIX, so their codes are the byte values. The table has room
+        for the full dictionary, so it doesn't grow during the compression.
+        In reset mode the code after them is CLEAR."""
+        self.dictionary = HashTable(self.max)
+        self.index = 0
         for i in range(256):
-            self._dict_add(bytes([i]))
+            self._dict_add(EMPTY_PREFIX, i)
+        self.index = self.first_code
 
     def compress(self):
-        """Compress the input stream into 12-bit indexes.
-        :return: yields three bytes for every two 12-bit integers.
+        """Compress the input stream into variable-width codes.
+        :return: generator of byte chunks, starting with the header.
         """
-        indices = self.lzw()
-        for first_int in indices:
-            second_int = next(indices, None)
-            for byte in _int12_to_int8(first_int, second_int):
-                yield byte
+        yield file_header(self.max_bits, self.reset)
+        yield from self._pack_codes()
+
+    def _pack_codes(self):
+        """Compress the input stream and pack the codes without a header.
+        :return: generator of byte chunks.
+        """
+        buffer = bytearray(CHUNK_SIZE)
+        view = memoryview(buffer)
+        count = self.stream.readinto(buffer)
+        while count:
+            output = self._pack(self._encode(view[:count]))
+            if output:
+                yield output
+            count = self.stream.readinto(buffer)
+        output = self._pack(self._finish()) + self.writer.flush()
+        if output:
+            yield output
 
     def lzw(self):
-        """Compress the string using the dictionary.
+        """Compress the input stream using the dictionary. The input is read in
+        blocks of CHUNK_SIZE bytes.
         :return: a generator of dictionary keys.
         """
-        char = self.stream.read(1)
-        while len(char) > 0:
-            if self.str + char in self.dictionary:
-                self.str = self.str + char
+        buffer = bytearray(CHUNK_SIZE)
+        view = memoryview(buffer)
+        count = self.stream.readinto(buffer)
+        while count:
+            yield from self._encode(view[:count])
+            count = self.stream.readinto(buffer)
+        yield from self._finish()
+
+    def _encode(self, data):
+        """Compress bytes which continue the input. The current string is kept
+        as its code between the calls, and every input byte takes one
+        dictionary lookup. In reset mode the ratio is checked after the
+        bytes, and CLEAR ends the current string.
+        :param data: bytes-like object, which is not kept.
+        :return: list of the codes of the strings which ended.
+        """
+        if self.reset and len(data) > CHECK_GAP:
+            codes = []
+            for start in range(0, len(data), CHECK_GAP):
+                codes += self._encode(data[start:start + CHECK_GAP])
+            return codes
+        codes = []
+        append = codes.append
+        dictionary_get = self.dictionary.get
+        code = self.code
+        start = 0
+        if code is None:
+            if not len(data):
+                return codes
+            code = data[0]
+            start = 1
+        for byte in data[start:]:
+            next_code = dictionary_get(code << 8 | byte)
+            if next_code is not None:
+                code = next_code
             else:
-                yield self.dictionary[self.str]
-                if len(self.dictionary) < self.max:
-                    self._dict_add(self.str + char)
-                self.str = char
-            char = self.stream.read(1)
-        yield self.dictionary[self.str]
+                append(code)
+                if self.index < self.max:
+                    self._dict_add(code, byte)
+                code = byte
+        self.code = code
+        if self.reset and self.index == self.max:
+            self._check_ratio(data, codes)
+        return codes
+
+    def _check_ratio(self, data, codes):
+        """Count the compression ratio when the dictionary is full, and clear
+        the dictionary if the ratio has dropped and the bytes are not
+        random.
+        :param data: bytes-like object of the bytes which were compressed.
+        :param codes: list of the codes of the bytes, which gets the current
+        code and CLEAR if the dictionary is cleared.
+        """
+        self.checked_bytes += len(data)
+        self.checked_codes += len(codes)
+        if self.checked_bytes < CHECK_GAP or not self.checked_codes:
+            return
+        ratio = self.checked_bytes / self.checked_codes
+        if (ratio < self.best_ratio * RESET_THRESHOLD and
+                pair_variety(data) <= RANDOM_PAIRS):
+            self.low_checks += 1
+        else:
+            self.low_checks = 0
+            self.best_ratio = max(self.best_ratio,
+                                  min(ratio, self.last_ratio))
+        self.last_ratio = ratio
+        if self.low_checks == RESET_CHECKS:
+            codes.append(self.code)
+            codes.append(CLEAR)
+            self.init_dict()
+            self.code = None
+            self.low_checks = 0
+        self.checked_bytes = 0
+        self.checked_codes = 0
+
+    def _finish(self):
+        """End the input.
+        :return: list of the code of the last string, if there is one.
+        """
+        codes = [] if self.code is None else [self.code]
+        self.code = None
+        return codes
+
+    def _pack(self, codes):
+        """Pack codes to the bit writer with the widths of their positions.
+        :param codes: list of codes.
+        :return: the complete bytes written so far.
+        """
+        for part in _split_at_clear(codes, self.reset):
+            for width, start, end in _width_runs(self.code_position,
+                                                 len(part), self.max_bits,
+                                                 self.first_code):
+                self.writer.write_many(part[start:end], width)
+            self.code_position += len(part)
+            if self.reset and part[-1] == CLEAR:
+                self.code_position = 0
+        return self.writer.take()
 
     def _init_uncompress_dict(self):
-        """Initialize dictionary for uncompression"""
-        self.dictionary = DynamicArray()
-        for i in range(256):
-            self.dictionary.append(bytes([i]))
+        """Initialize dictionary for uncompression. Every entry is stored as
+        the code of its prefix, its last byte and its length in three typed
+        arrays, which are allocated for the full dictionary, so they never
+        grow and their memoryviews stay valid. In reset mode entry 256 is
+        never used, as it is the CLEAR code."""
+        self.prefixes = TypedArray("H", self.max)
+        self.last_bytes = TypedArray("B", self.max, range(256))
+        self.lengths = TypedArray("I", self.max, [1] * 256)
+        self.tables = (self.prefixes.memoryview(),
+                       self.last_bytes.memoryview(),
+                       self.lengths.memoryview())
+        self.index = self.first_code
+        self.prev_index = None
+        self.prev_first = 0
+        self.code_position = 0
+
+    def _uncompress_add(self, prefix, byte):
+        """Add a new entry to the uncompression dictionary.
+        :param prefix: code of the entry without its last byte.
+        :param byte: last byte of the entry.
+        """
+        prefixes, last_bytes, lengths = self.tables
+        prefixes[self.index] = prefix
+        last_bytes[self.index] = byte
+        lengths[self.index] = lengths[prefix] + 1
+        self.index += 1
 
     def uncompress(self):
-        """Uncompress with lzw.
-        :return: Generator for the uncompressed bytes.
+        """Uncompress an LZW file, which may be segmented.
+        :return: Generator for the uncompressed byte chunks of about
+        CHUNK_SIZE bytes, or one chunk for every segment.
+        """
+        source = read_chunks(self.stream)
+        buffer = bytearray()
+        header = read_exact(source, HEADER.size, buffer)
+        if not header:
+            return
+        self.max_bits, self.reset, segmented = read_header(header)
+        self.max = 1 << self.max_bits
+        self.first_code = FIRST_CODE if self.reset else 256
+        if not segmented:
+            yield from self._expand(BitReader(chain([bytes(buffer)],
+                                                    source)))
+            return
+        while True:
+            frame_header = read_exact(source, SEGMENT_HEADER.size, buffer)
+            if not frame_header or frame_header == SEGMENTS_END:
+                break
+            if len(frame_header) < SEGMENT_HEADER.size:
+                raise ValueError("Truncated LZW segment header.")
+            length, payload_length = SEGMENT_HEADER.unpack(frame_header)
+            payload = read_exact(source, payload_length, buffer)
+            if len(payload) < payload_length:
+                raise ValueError("Truncated LZW segment.")
+            yield self._uncompress_segment(payload, length)
+
+    def _uncompress_segment(self, payload, length):
+        """Uncompress the codes of one segment with a new dictionary.
+        :param payload: packed codes of the segment.
+        :param length: original length of the segment.
+        :return: uncompressed segment.
+        """
+        segment = b"".join(self._expand(BitReader([payload])))
+        if len(segment) != length:
+            raise ValueError("LZW segment has wrong length.")
+        return segment
+
+    def _expand(self, reader):
+        """Read and expand all the codes of a stream.
+        :param reader: BitReader of the packed codes.
+        :return: Generator for the uncompressed byte chunks of about
+        CHUNK_SIZE bytes.
         """
         self._init_uncompress_dict()
-        deserializer = self._deserializer()
-        prev_index = next(deserializer)
-        entry = b""
-        yield self.dictionary[prev_index]
-
-        for index in deserializer:
-            if index >= len(self.dictionary):
-                entry += bytes([entry[0]])
+        output = bytearray(CHUNK_SIZE)
+        position = 0
+        more = True
+        while more:
+            codes, more = self._read_codes(reader)
+            start = 0
+            while True:
+                start, position = self._expand_codes(codes, start, output,
+                                                     position)
+                if start == len(codes):
+                    break
+                yield bytes(output[:position])
+                position = 0
+        if position:
+            yield bytes(output[:position])
+
+    def _expand_codes(self, codes, start, output, position):
+        """Expand codes to the output buffer, until the next one doesn't fit.
+        Every code is expanded backwards from its last byte straight to the
+        buffer, by following the prefix codes. After CLEAR the dictionary is
+        emptied and the next code is a byte, like the first one.
+        :param codes: list of codes.
+        :param start: index of the first code to expand.
+        :param output: bytearray, which grows if one code doesn't fit in it.
+        :param position: number of bytes already in the output.
+        :return: tuple of the index of the first code which was not expanded
+        and the number of bytes in the output.
+        """
+        prefixes, last_bytes, lengths = self.tables
+        clear = CLEAR if self.reset else -1
+        prev_index = self.prev_index
+        prev_first = self.prev_first
+        for i in range(start, len(codes)):
+            index = codes[i]
+            if index == clear:
+                self.index = self.first_code
+                prev_index = None
+                continue
+            if prev_index is None:
+                if index > 255:
+                    raise ValueError("Corrupted LZW data.")
+                if position == len(output):
+                    start = i
+                    break
+                output[position] = index
+                position += 1
+                prev_index = prev_first = index
+                continue
+            if index < self.index:
+                length = lengths[index]
+            elif index == self.index < self.max:
+                length = lengths[prev_index] + 1
             else:
-                entry = self.dictionary[index]
-            yield entry
-            char = bytes([entry[0]])
-            new = self.dictionary[prev_index] + char
-            if len(self.dictionary) < self.max:
-                self.dictionary.append(new)
+                raise ValueError("Corrupted LZW data.")
+            if position + length > len(output):
+                if position:
+                    start = i
+                    break
+                output.extend(bytes(length - len(output)))
+            added = index == self.index
+            if added:
+                self._uncompress_add(prev_index, prev_first)
+            end = position + length
+            code = index
+            for j in range(end - 1, position - 1, -1):
+                output[j] = last_bytes[code]
+                code = prefixes[code]
+            prev_first = output[position]
+            if not added and self.index < self.max:
+                self._uncompress_add(prev_index, prev_first)
+            position = end
             prev_index = index
+        else:
+            start = len(codes)
+        self.prev_index = prev_index
+        self.prev_first = prev_first
+        return start, position
 
-    def _deserializer(self):
-        """Read the binary stream until there is no more characters.
-        :return: Indices for the dictionary.
+    def _read_codes(self, reader):
+        """Read the next batch of codes of the same width, as the width
+        depends only on the position of the code. In reset mode the position
+        starts over after CLEAR, so the codes read after it are given back to
+        the reader.
+        :param reader: BitReader of the packed codes.
+        :return: tuple of the list of codes and a boolean, which is false if
+        the bits ran out.
         """
-        while True:
-            byte_1 = self.stream.read(1)
-            byte_2 = self.stream.read(1)
-            byte_3 = self.stream.read(1)
-            if not byte_1 or not byte_2:
-                break
+        width, _, count = next(_width_runs(self.code_position, CODE_BATCH,
+                                           self.max_bits, self.first_code))
+        codes = reader.read_many(count, width)
+        if self.reset and CLEAR in codes:
+            end = codes.index(CLEAR) + 1
+            reader.unread(codes[end:], width)
+            del codes[end:]
+            self.code_position = 0
+            return codes, True
+        self.code_position += len(codes)
+        return codes, len(codes) == count
+
+
+def file_header(max_bits, reset=False, segmented=False):
+    """Create the header of an LZW file.
+    :param max_bits: maximum code width.
+    :param reset: the codes are from reset mode.
+    :param segmented: the file is segmented.
+    :return: header bytes.
+    """
+    flags = RESET_FLAG if reset else 0
+    if segmented:
+        flags |= SEGMENTED_FLAG
+    return HEADER.pack(MAGIC, max_bits | flags)
+
+
+def read_header(header):
+    """Parse the header of an LZW file.
+    :param header: first HEADER.size bytes of the file.
+    :return: tuple of max_bits, reset and segmented.
+    :raises ValueError: if the header is not valid.
+    """
+    if len(header) < HEADER.size:
+        raise ValueError("Truncated LZW header.")
+    magic, flags = HEADER.unpack(header)
+    max_bits = flags & ~(RESET_FLAG | SEGMENTED_FLAG)
+    if magic != MAGIC or not MIN_BITS <= max_bits <= MAX_BITS:
+        raise ValueError("Not an LZW file.")
+    return max_bits, bool(flags & RESET_FLAG), bool(flags & SEGMENTED_FLAG)
 
-            int_8_1 = int.from_bytes(byte_1, byteorder="little")
-            int_8_2 = int.from_bytes(byte_2, byteorder="little")
-            int_8_3 = int.from_bytes(byte_3, byteorder="little")
-            if not byte_3:
-                int_1 = _int8_to_int12(int_8_1, int_8_2)
-                yield int_1
-                continue
 
-            int_1, int_2 = _int8_to_int12(int_8_1, int_8_2, int_8_3)
-            yield int_1
-            yield int_2
+def compress_segment(segment, max_bits=MAX_BITS, reset=False):
+    """Compress one segment of a segmented file with a new dictionary.
+    :param segment: input bytes.
+    :param max_bits: maximum code width.
+    :param reset: compress in reset mode.
+    :return: frame of the segment.
+    """
+    with io.BytesIO(segment) as stream:
+        payload = b"".join(Lzw(stream, max_bits, reset)._pack_codes())
+    return SEGMENT_HEADER.pack(len(segment), len(payload)) + payload
+
+
+def uncompress_segment(frame, max_bits=MAX_BITS, reset=False):
+    """Uncompress one frame of a segmented file.
+    :param frame: frame created with compress_segment.
+    :param max_bits: maximum code width from the file header.
+    :param reset: reset mode from the file header.
+    :return: original segment.
+    """
+    if len(frame) < SEGMENT_HEADER.size:
+        raise ValueError("Truncated LZW segment header.")
+    length, payload_length = SEGMENT_HEADER.unpack_from(frame)
+    payload = frame[SEGMENT_HEADER.size:SEGMENT_HEADER.size + payload_length]
+    if len(payload) < payload_length:
+        raise ValueError("Truncated LZW segment.")
+    return Lzw(None, max_bits, reset)._uncompress_segment(payload, length)
+
+
+def compressobj(max_bits=MAX_BITS, reset=False):
+    """Create an incremental compressor, like zlib.compressobj().
+    :param max_bits: maximum code width.
+    :param reset: compress in reset mode.
+    :return: LzwCompressor.
+    """
+    return LzwCompressor(max_bits, reset)
+
+
+def decompressobj():
+    """Create an incremental uncompressor, like zlib.decompressobj().
+    :return: LzwDecompressor.
+    """
+    return LzwDecompressor()
+
+
+class LzwCompressor:
+    """Compress data given in pieces to a plain LZW stream. The dictionary,
+    the current string and the bits of an unfinished byte are kept between the
+    calls, so the output is the same as from Lzw.compress. Only in reset mode
+    the ratio is checked at the end of the calls, so CLEAR may be at other
+    places."""
+
+    def __init__(self, max_bits=MAX_BITS, reset=False):
+        """
+        :param max_bits: maximum code width, from MIN_BITS to MAX_BITS.
+        :param reset: compress in reset mode.
+        """
+        self.lzw = Lzw(None, max_bits, reset)
+        self.header = file_header(max_bits, reset)
+        self.finished = False
+
+    def compress(self, data):
+        """Compress the next piece of the input.
+        :param data: bytes-like object.
+        :return: compressed bytes, which may be empty.
+        """
+        if self.finished:
+            raise ValueError("Compressor is already flushed.")
+        output = bytearray(self.header)
+        self.header = b""
+        with memoryview(data) as view, view.cast("B") as data_bytes:
+            for start in range(0, len(data_bytes), CHUNK_SIZE):
+                codes = self.lzw._encode(data_bytes[start:start + CHUNK_SIZE])
+                output += self.lzw._pack(codes)
+        return bytes(output)
+
+    def flush(self):
+        """End the input. The compressor can't be used after this.
+        :return: the rest of the compressed bytes.
+        """
+        if self.finished:
+            raise ValueError("Compressor is already flushed.")
+        self.finished = True
+        output = (self.header + self.lzw._pack(self.lzw._finish()) +
+                  self.lzw.writer.flush())
+        self.header = b""
+        return output
+
+
+class LzwDecompressor:
+    """Uncompress an LZW stream, plain or segmented, given in pieces.
+
+    Like zlib, decompress() takes max_length to limit the output. Input which
+    is not uncompressed because of it is kept in the object, and the next call
+    continues from it, also with empty data. A plain stream has no end marker,
+    so its end is known only when flush() is called. The data after the end of
+    a segmented stream, the segment index, is in unused_data.
+    """
+
+    def __init__(self):
+        self.lzw = None
+        self.segmented = False
+        self.reader = None
+        self.input = bytearray()
+        self.segment = None
+        self.codes = []
+        self.start = 0
+        self.buffer = bytearray(CHUNK_SIZE)
+        self.output = bytearray()
+        self.blocked = False
+        self.eof = False
+        self.unused_data = b""
+
+    @property
+    def needs_input(self):
+        """True if more output can't be uncompressed without more input."""
+        return not self.eof and not self.output and self.blocked
+
+    def decompress(self, data, max_length=0):
+        """Uncompress the next piece of the stream.
+        :param data: bytes-like object.
+        :param max_length: maximum length of the output, 0 for no limit.
+        :return: uncompressed bytes, which may be empty.
+        """
+        if self.eof:
+            self.unused_data += bytes(data)
+        else:
+            self.input += data
+            self.blocked = False
+            while not max_length or len(self.output) < max_length:
+                if not self._step():
+                    self.blocked = True
+                    break
+        return self._take(max_length)
+
+    def flush(self):
+        """End the input, and uncompress all of it.
+        :return: the rest of the uncompressed bytes.
+        :raises ValueError: if the stream is truncated.
+        """
+        while self._step():
+            pass
+        if not self.eof:
+            if self.input or self.segmented:
+                raise ValueError("Truncated LZW data.")
+            self.eof = True
+        return self._take(0)
+
+    def _take(self, max_length):
+        """Remove and return up to max_length bytes of the output, or all of
+        it if max_length is 0."""
+        if not max_length:
+            max_length = len(self.output)
+        output = bytes(self.output[:max_length])
+        del self.output[:max_length]
+        return output
+
+    def _step(self):
+        """Do the next step of the uncompression: expand a batch of codes,
+        read a batch of codes or read a header.
+        :return: False if nothing could be done with the input so far.
+        """
+        if self.start < len(self.codes):
+            self.start, position = self.lzw._expand_codes(
+                self.codes, self.start, self.buffer, 0)
+            self.output += self.buffer[:position]
+            if self.segment is not None:
+                self.segment[1] += position
+            return True
+        if self.lzw is None:
+            return self._read_file_header()
+        if self.segmented and self.segment is None:
+            return self._read_segment_header()
+        if self.segmented:
+            count = min(self.segment[2], len(self.input))
+            self.reader.feed(self.input[:count])
+            del self.input[:count]
+            self.segment[2] -= count
+        else:
+            self.reader.feed(self.input)
+            self.input.clear()
+        self.codes, _ = self.lzw._read_codes(self.reader)
+        self.start = 0
+        if self.codes:
+            return True
+        if self.segmented and not self.segment[2]:
+            length, produced, _ = self.segment
+            if produced != length:
+                raise ValueError("LZW segment has wrong length.")
+            self.segment = None
+            return True
+        return False
+
+    def _read_file_header(self):
+        """Read the file header, if there are enough bytes.
+        :return: True if the header was read.
+        """
+        if len(self.input) < HEADER.size:
+            return False
+        max_bits, reset, self.segmented = read_header(
+            bytes(self.input[:HEADER.size]))
+        del self.input[:HEADER.size]
+        self.lzw = Lzw(None, max_bits, reset)
+        self.lzw._init_uncompress_dict()
+        self.reader = BitReader(())
+        return True
+
+    def _read_segment_header(self):
+        """Read the header of the next segment, if there are enough bytes,
+        and start a new dictionary for it.
+        :return: True if the header was read.
+        """
+        if len(self.input) < SEGMENT_HEADER.size:
+            return False
+        header = bytes(self.input[:SEGMENT_HEADER.size])
+        del self.input[:SEGMENT_HEADER.size]
+        if header == SEGMENTS_END:
+            self.eof = True
+            self.unused_data = bytes(self.input)
+            self.input.clear()
+            return False
+        length, payload_length = SEGMENT_HEADER.unpack(header)
+        self.segment = [length, 0, payload_length]
+        self.lzw._init_uncompress_dict()
+        self.reader = BitReader(())
+        return True
+
+
+def _split_at_clear(codes, reset):
+    """Split codes after every CLEAR code, as the widths start over there.
+    :param codes: list of codes.
+    :param reset: the codes are from reset mode.
+    :return: generator of lists of codes.
+    """
+    start = 0
+    if reset:
+        try:
+            while True:
+                end = codes.index(CLEAR, start) + 1
+                yield codes[start:end]
+                start = end
+        except ValueError:
+            pass
+    if start < len(codes):
+        yield codes[start:]
+
+
+def _width_runs(position, count, max_bits, first_code=256):
+    """Split codes to runs of the same width. The k:th code is written when
+    the compression dictionary has first_code + k entries, until it is full.
+    The uncompression dictionary is one entry behind, but the code may refer to
+    the entry which is being added, so the widths are the same.
+    :param position: number of codes before the first one, since the start or
+    the last CLEAR.
+    :param count: number of codes.
+    :param max_bits: maximum code width.
+    :param first_code: first code for new entries.
+    :return: generator of (width, start, end) tuples, where start and end are
+    relative to the first code.
+    """
+    start = 0
+    while start < count:
+        width = _code_width(min(first_code + position + start,
+                                1 << max_bits))
+        end = count
+        if width < max_bits:
+            end = min(count, (1 << width) - first_code + 1 - position)
+        yield width, start, end
+        start = end
+
+
+def pair_variety(data):
+    """Count the share of distinct byte pairs among all pairs of adjacent
+    bytes. It is close to 1 for random bytes, which LZW can't compress.
+    :param data: bytes-like object.
+    :return: number between 0 and 1.
+    """
+    data = bytes(data)
+    if len(data) < 2:
+        return 0.0
+    return len(set(zip(data, data[1:]))) / (len(data) - 1)
 
 
-def _int12_to_int8(first, second=None):
-    """Convert two 12-bit integers to three 8-bit integers for serialization.
-    :param first: First 12-bit integer for conversion.
-    :param second: Second 12-bit integer for conversion.
-    :return: tuple of three 8-bit integers.
+def _code_width(dict_size):
+    """Count the width of the next code.
+    :param dict_size: number of entries in the compression dictionary when
+    the code is written.
+    :return: number of bits.
     """
-    if first > 4095 or (second is not None and second > 4095):
-        raise Exception("More than 12 bits")
-    byte_1 = first >> 4
-    byte_2_start = first << 4
-    byte_2 = 0xff & byte_2_start
-    if second is None:
-        return byte_1, byte_2
-    byte_2 |= second >> 8
-    byte_3 = 0xff & second
-
-    return byte_1, byte_2, byte_3
-
-
-def _int8_to_int12(first, second, third=None):
-    """Convert three or two bytes to 12-bit integers."""
-    if first > 256 or second > 256:
-        raise Exception("More than 8 bits")
-    elif third is not None and third > 256:
-        raise Exception("Third more than 8 bits")
-
-    byte_1_end = second >> 4
-    byte_1 = first << 4 | byte_1_end
-    if third is None:
-        return byte_1
-    byte_2_start = 0xf & second
-    byte_2 = byte_2_start << 8 | third
-
-    return byte_1, byte_2
+    return max(MIN_BITS, (dict_size - 1).bit_length())
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+#  -*- coding: utf-8 -*-
+
+"""File objects of compressed files, like the ones of gzip.open().
+
+A file is read one decoded block at a time, so the memory use depends on the
+block size and not on the length of the file. readinto() copies the decoded
+block straight to the buffer of the caller. Writing collects the data to
+blocks of the block size of the codec, and every full block is compressed to a
+container frame right away.
+"""
+
+import io
+
+from multipack.api import codec_params, decompressed_chunks
+from multipack.container import ContainerWriter
+
+READ_MODES = ("r", "rb")
+WRITE_MODES = ("w", "wb", "x", "xb")
+
+
+class MultipackFile(io.BufferedIOBase):
+    """Binary file object of the original data of a compressed file. It is
+    not seekable, but tell() gives the position in the original data.
+    """
+
+    def __init__(self, filename, mode="rb", codec="bwt", jobs=1, **options):
+        """Open a compressed file for reading or writing.
+        :param filename: name of the file, or a binary file object, which is
+        not closed with the MultipackFile.
+        :param mode: "rb" for reading, "wb" for writing or "xb" for creating a
+        new file.
+        :param codec: "lzw" or "bwt" for writing. The format of a file which
+        is read is recognized from its contents.
+        :param jobs: number of processes decoding the blocks when reading.
+        :param options: codec options of the api module for writing.
+        :raises ValueError: if the mode or a codec option is not valid, or the
+        file which is read is not compressed.
+        """
+        super().__init__()
+        self._stream = None
+        self._close_stream = False
+        self._chunks = None
+        self._writer = None
+        if mode in READ_MODES:
+            self.mode = "rb"
+        elif mode in WRITE_MODES:
+            self.mode = "wb"
+            params = codec_params(codec, **options)
+        else:
+            raise ValueError("Invalid mode: {!r}".format(mode))
+        if isinstance(filename, (str, bytes)) or hasattr(filename,
+                                                         "__fspath__"):
+            self._stream = io.open(filename, mode[0] + "b")
+            self._close_stream = True
+        elif hasattr(filename, "read") or hasattr(filename, "write"):
+            self._stream = filename
+        else:
+            raise TypeError("filename must be a name or a file object.")
+        self._position = 0
+        try:
+            if self.mode == "rb":
+                self._chunks = decompressed_chunks(self._stream, jobs)
+                self._block = b""
+                self._offset = 0
+            else:
+                self._writer = ContainerWriter(self._stream, codec, params)
+                self._block_size = params.block_size
+                self._pending = bytearray()
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        """Write the rest of the data and the block index when writing, and
+        close the file if it was opened by name.
+        """
+        if self.closed:
+            return
+        try:
+            if self._writer is not None:
+                self._write_pending()
+                self._writer.finish()
+                self._writer = None
+            elif self._chunks is not None:
+                self._chunks.close()
+                self._chunks = None
+        finally:
+            try:
+                if self._close_stream:
+                    self._stream.close()
+            finally:
+                super().close()
+
+    def readable(self):
+        self._check_open()
+        return self.mode == "rb"
+
+    def writable(self):
+        self._check_open()
+        return self.mode == "wb"
+
+    def seekable(self):
+        self._check_open()
+        return False
+
+    def tell(self):
+        """Position in the original data."""
+        self._check_open()
+        return self._position
+
+    def read(self, size=-1):
+        """Read up to size bytes, or up to the end if size is negative.
+        :param size: maximum number of bytes.
+        :return: read bytes, shorter only at the end of the data.
+        """
+        return self._read(size, False)
+
+    def read1(self, size=-1):
+        """Read up to size bytes from the current block only.
+        :param size: maximum number of bytes, the rest of the block if
+        negative.
+        :return: read bytes, empty at the end of the data.
+        """
+        return self._read(size, True)
+
+    def readinto(self, buffer):
+        """Fill a buffer with the original data. The bytes are copied from
+        the decoded blocks straight to the buffer.
+        :param buffer: writable bytes-like object.
+        :return: number of bytes read, less than the length of the buffer only
+        at the end of the data.
+        """
+        return self._readinto(buffer, False)
+
+    def readinto1(self, buffer):
+        """Fill a buffer from the current block only.
+        :param buffer: writable bytes-like object.
+        :return: number of bytes read, 0 at the end of the data.
+        """
+        return self._readinto(buffer, True)
+
+    def peek(self, size=0):
+        """Return the rest of the current block without moving the position.
+        :param size: ignored, the whole rest of the block is returned.
+        :return: bytes, empty at the end of the data.
+        """
+        self._check_read()
+        if not self._fill():
+            return b""
+        return self._block[self._offset:]
+
+    def readline(self, size=-1):
+        """Read up to and including the next newline.
+        :param size: maximum number of bytes, no limit if negative.
+        :return: read line, empty at the end of the data.
+        """
+        self._check_read()
+        if size is None:
+            size = -1
+        parts = []
+        remaining = size
+        while remaining and self._fill():
+            end = self._block.find(b"\n", self._offset) + 1
+            if not end:
+                end = len(self._block)
+            if remaining > 0:
+                end = min(end, self._offset + remaining)
+                remaining -= end - self._offset
+            parts.append(self._consume(end))
+            if parts[-1].endswith(b"\n"):
+                break
+        return b"".join(parts)
+
+    def write(self, data):
+        """Compress bytes. The data is written to the file a block at a time.
+        :param data: bytes-like object.
+        :return: number of bytes written.
+        """
+        self._check_write()
+        with memoryview(data) as view, view.cast("B") as source:
+            length = len(source)
+            start = 0
+            while start < length:
+                end = min(length,
+                          start + self._block_size - len(self._pending))
+                self._pending += source[start:end]
+                start = end
+                if len(self._pending) == self._block_size:
+                    self._write_pending()
+        self._position += length
+        return length
+
+    def flush(self):
+        """Write the collected data as a block, which may be shorter than the
+        block size, and flush the file. Frequent flushes make the
+        compression worse.
+        """
+        self._check_open()
+        if self._writer is not None:
+            self._write_pending()
+            self._stream.flush()
+
+    def _read(self, size, first_only):
+        """Read bytes from one or more blocks."""
+        self._check_read()
+        if size is None:
+            size = -1
+        parts = []
+        remaining = size
+        while remaining and self._fill():
+            end = len(self._block)
+            if remaining > 0:
+                end = min(end, self._offset + remaining)
+                remaining -= end - self._offset
+            parts.append(self._consume(end))
+            if first_only:
+                break
+        return b"".join(parts)
+
+    def _readinto(self, buffer, first_only):
+        """Copy bytes from one or more blocks to a buffer."""
+        self._check_read()
+        count = 0
+        with memoryview(buffer) as view, view.cast("B") as target:
+            while count < len(target) and self._fill():
+                end = min(len(self._block),
+                          self._offset + len(target) - count)
+                with memoryview(self._block) as block:
+                    target[count:count + end - self._offset] = \
+                        block[self._offset:end]
+                count += end - self._offset
+                self._advance(end)
+                if first_only:
+                    break
+        return count
+
+    def _fill(self):
+        """Decode the next block when the current one is used up.
+        :return: False at the end of the data.
+        """
+        while self._offset >= len(self._block):
+            block = next(self._chunks, None)
+            if block is None:
+                return False
+            self._block = block
+            self._offset = 0
+        return True
+
+    def _consume(self, end):
+        """Move the position in the current block.
+        :param end: new offset in the block.
+        :return: bytes from the old offset to the new one.
+        """
+        data = self._block[self._offset:end]
+        self._advance(end)
+        return data
+
+    def _advance(self, end):
+        """Move the position in the current block without taking the bytes.
+        :param end: new offset in the block.
+        """
+        self._position += end - self._offset
+        self._offset = end
+
+    def _write_pending(self):
+        """Compress the collected data as one block."""
+        if self._pending:
+            self._writer.write_block(bytes(self._pending))
+            del self._pending[:]
+
+    def _check_open(self):
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+
+    def _check_read(self):
+        self._check_open()
+        if self.mode != "rb":
+            raise io.UnsupportedOperation("File not open for reading.")
+
+    def _check_write(self):
+        self._check_open()
+        if self.mode != "wb":
+            raise io.UnsupportedOperation("File not open for writing.")
+
+
+def open(filename, mode="rb", codec="bwt", jobs=1, encoding=None,
+         errors=None, newline=None, **options):
+    """Open a compressed file in binary or text mode, like gzip.open().
+    :param filename: name of the file, or a binary file object.
+    :param mode: "r", "w" or "x", with "b" for binary mode, the default, or
+    "t" for text mode.
+    :param codec: "lzw" or "bwt" for writing.
+    :param jobs: number of processes decoding the blocks when reading.
+    :param encoding: text encoding in text mode.
+    :param errors: handling of encoding errors in text mode.
+    :param newline: handling of line endings in text mode.
+    :param options: codec options of the api module for writing.
+    :return: MultipackFile, or io.TextIOWrapper of it in text mode.
+    :raises ValueError: if the mode or an option is not valid, or the file
+    which is read is not compressed.
+    """
+    if "t" in mode:
+        if "b" in mode:
+            raise ValueError("Invalid mode: {!r}".format(mode))
+    elif encoding is not None or errors is not None or newline is not None:
+        raise ValueError("Text options are only for text mode.")
+    binary = MultipackFile(filename, mode.replace("t", ""), codec, jobs,
+                           **options)
+    if "t" in mode:
+        return io.TextIOWrapper(binary, encoding, errors, newline)
+    return binary
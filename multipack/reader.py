@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+#  -*- coding: utf-8 -*-
+
+"""Random access reads on compressed files.
+
+The block index at the end of a compressed file is used as a seek table: a read
+decodes only the blocks which cover the requested range. The file must be a
+container, and the checksums of every decoded block are checked. Decoded
+blocks are kept in a small LRU cache, so reads near each other decode every
+block once.
+"""
+
+import io
+from bisect import bisect_right
+from collections import OrderedDict
+
+from multipack.blockindex import read_index, output_offsets
+from multipack.container import read_file_header, block_decoder, \
+    uncompress_stream
+
+CACHE_BLOCKS = 8
+
+
+class SeekableReader(io.RawIOBase):
+    """Read-only, seekable file object of the original data of a compressed
+    stream.
+
+    A file without a block index is decoded as one block on the first read.
+    """
+
+    def __init__(self, stream, cache_blocks=CACHE_BLOCKS, close_stream=False):
+        """Read the header and the block index of a compressed stream.
+        :param stream: seekable binary stream of the compressed file.
+        :param cache_blocks: number of decoded blocks kept in memory.
+        :param close_stream: close the stream when the reader is closed.
+        """
+        super().__init__()
+        if cache_blocks < 1:
+            raise ValueError("Cache must have room for one block.")
+        self.stream = stream
+        self.close_stream = close_stream
+        self.cache_blocks = cache_blocks
+        self.cache = OrderedDict()
+        self.position = 0
+        stream.seek(0)
+        self.decode = block_decoder(read_file_header(stream))
+        self.index = read_index(stream)
+        if self.index is not None:
+            self.offsets = output_offsets(self.index)
+        else:
+            self.offsets = None
+
+    @property
+    def size(self):
+        """Length of the original data."""
+        if self.offsets is None:
+            return len(self._block(0))
+        return self.offsets[-1]
+
+    def close(self):
+        if not self.closed:
+            self.cache.clear()
+            if self.close_stream:
+                self.stream.close()
+        super().close()
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """Move to a position in the original data.
+        :param offset: offset relative to whence.
+        :param whence: io.SEEK_SET, io.SEEK_CUR or io.SEEK_END.
+        :return: new position.
+        """
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self.position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError("Invalid whence: {}".format(whence))
+        if position < 0:
+            raise ValueError("Negative seek position {}".format(position))
+        self.position = position
+        return position
+
+    def readinto(self, buffer):
+        """Read up to len(buffer) bytes from the current position. The read
+        stops at the end of a block, like a read from a pipe; read() and
+        readall() continue to the next block.
+        :param buffer: writable bytes-like object.
+        :return: number of bytes read, 0 at the end of the data.
+        """
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        if self.offsets is None:
+            start = 0
+            block = self._block(0)
+        else:
+            number = bisect_right(self.offsets, self.position) - 1
+            if number >= len(self.index):
+                return 0
+            start = self.offsets[number]
+            block = self._block(number)
+        data = block[self.position - start:
+                     self.position - start + len(buffer)]
+        with memoryview(buffer) as view:
+            view[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+    def read_range(self, offset, length):
+        """Read bytes from an offset without moving the position.
+        :param offset: offset in the original data.
+        :param length: maximum number of bytes.
+        :return: read bytes, shorter at the end of the data.
+        """
+        position = self.position
+        self.seek(offset)
+        output = bytearray(length)
+        count = 0
+        try:
+            with memoryview(output) as view:
+                while count < length:
+                    read = self.readinto(view[count:])
+                    if not read:
+                        break
+                    count += read
+        finally:
+            self.position = position
+        del output[count:]
+        return bytes(output)
+
+    def _block(self, number):
+        """Get a decoded block from the cache or decode it.
+        :param number: index of the block.
+        :return: decoded block.
+        """
+        if number in self.cache:
+            self.cache.move_to_end(number)
+            return self.cache[number]
+        if self.offsets is None:
+            block = self._decode_all()
+        else:
+            entry = self.index[number]
+            self.stream.seek(entry.offset)
+            frame = self.stream.read(entry.length)
+            block = self.decode(frame)
+            if len(block) != entry.original_length:
+                raise ValueError("Block at offset {} has wrong length."
+                                 .format(entry.offset))
+        self.cache[number] = block
+        if len(self.cache) > self.cache_blocks:
+            self.cache.popitem(last=False)
+        return block
+
+    def _decode_all(self):
+        """Decode the whole stream as one block."""
+        self.stream.seek(0)
+        with io.BytesIO() as output:
+            uncompress_stream(self.stream, output)
+            return output.getvalue()
+
+
+def open_seekable(filename, cache_blocks=CACHE_BLOCKS):
+    """Open a compressed file for random access reads.
+    :param filename: name of the compressed file.
+    :param cache_blocks: number of decoded blocks kept in memory.
+    :return: SeekableReader, which closes the file when it is closed.
+    :raises ValueError: if the file is not a container.
+    """
+    stream = open(filename, "rb")
+    try:
+        return SeekableReader(stream, cache_blocks, close_stream=True)
+    except BaseException:
+        stream.close()
+        raise
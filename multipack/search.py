@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+#  -*- coding: utf-8 -*-
+
+"""Search BWT compressed files without restoring them.
+
+Every block of the file must have the FM-index, which is written with the
+--fm-index option of compression. Each block is searched with its FM-index,
+which decodes only the segments of the last column that the search reads.
+Matches which cross the boundary of two blocks are found from the last bytes of
+one block and the first bytes of the next one, so a pattern can't be longer
+than a block.
+"""
+
+import argparse
+
+from multipack.container import read_file_header, read_frames, \
+    frame_payload
+from multipack.fmindex import FmIndex
+
+
+def count(stream, pattern):
+    """Count the occurrences of a pattern in a BWT compressed stream.
+    :param stream: binary stream of a file compressed with the FM-index.
+    :param pattern: non-empty byte string.
+    :return: number of occurrences.
+    """
+    return sum(matches for matches, _ in _search(stream, pattern, False))
+
+
+def locate(stream, pattern):
+    """Find the positions of a pattern in a BWT compressed stream.
+    :param stream: binary stream of a file compressed with the FM-index.
+    :param pattern: non-empty byte string.
+    :return: sorted list of the offsets of the matches in the original file.
+    """
+    return [position for _, positions in _search(stream, pattern, True)
+            for position in positions]
+
+
+def _search(stream, pattern, find_positions):
+    """Search all the blocks and the boundaries between them.
+    :param stream: binary stream of a file compressed with the FM-index.
+    :param pattern: non-empty byte string.
+    :param find_positions: locate the matches instead of only counting them.
+    :return: generator of (count, positions) tuples, where positions is a
+    sorted list of offsets, or None if find_positions is false.
+    """
+    if not pattern:
+        raise ValueError("Empty search pattern.")
+    overlap = len(pattern) - 1
+    offset = 0
+    previous_tail = b""
+    for payload in _indexed_blocks(stream):
+        index = FmIndex(payload)
+        if overlap and previous_tail:
+            window = previous_tail + index.head(overlap)
+            start = offset - len(previous_tail)
+            crossing = [start + position
+                        for position in _find_all(window, pattern)
+                        if position < len(previous_tail) and
+                        position + len(pattern) > len(previous_tail)]
+            yield len(crossing), crossing
+        if find_positions:
+            positions = [offset + position
+                         for position in index.locate(pattern)]
+            yield len(positions), positions
+        else:
+            yield index.count(pattern), None
+        if overlap:
+            previous_tail = index.tail(overlap)
+        offset += index.length
+
+
+def _indexed_blocks(stream):
+    """Read the blocks of a BWT file compressed with the FM-index.
+    :param stream: binary stream of a BWT file.
+    :return: iterable of the payloads of the frames.
+    :raises ValueError: if the file is not BWT compressed with the FM-index.
+    """
+    header = read_file_header(stream)
+    if header.codec != "bwt":
+        raise ValueError("Not a BWT compressed file.")
+    if not header.params.sample_rate:
+        raise ValueError("File was compressed without --fm-index.")
+    return map(frame_payload, read_frames(stream))
+
+
+def _find_all(string, pattern):
+    """Find all, also overlapping, positions of a pattern in a string.
+    :param string: byte string to search.
+    :param pattern: non-empty byte string.
+    :return: generator of positions.
+    """
+    position = string.find(pattern)
+    while position != -1:
+        yield position
+        position = string.find(pattern, position + 1)
+
+
+def main(argv=None):
+    """Command line search: multipack search PATTERN FILE.bwt
+    :param argv: list of arguments after the search command.
+    """
+    arg = argparse.ArgumentParser(prog="multipack search",
+                                  description="Search a BWT compressed file "
+                                              "without uncompressing it.")
+    arg.add_argument("pattern", metavar="PATTERN", help="string to search")
+    arg.add_argument("filename", metavar="FILE",
+                     help="file compressed with --bwt --fm-index")
+    arg.add_argument("-c", "--count",
+                     help="print only the number of matches",
+                     action="store_true")
+    args = arg.parse_args(argv)
+    pattern = args.pattern.encode()
+    try:
+        with open(args.filename, "rb") as stream:
+            if args.count:
+                print(count(stream, pattern))
+            else:
+                for position in locate(stream, pattern):
+                    print(position)
+    except (OSError, ValueError) as error:
+        arg.exit(1, "{}: {}\n".format(args.filename, error))
@@ -3,62 +3,122 @@
 
 """Sorting for burrows-wheeler transform."""
 
+import sys
+from array import array
 
-def counting_sorted(in_arr, max_value):
-    """Sort an array of integers which all are fairly close to each other.
-    :param in_arr: Array for sorting.
-    :param max_value: exclusive upper bound for values in the array.
-    :return: sorted array.
-    """
-    counts = [0] * max_value
-    for num in in_arr:
-        counts[num] += 1
-    sorted_arr = [None] * len(in_arr)
-    index = 0
-    for number in range(max_value):
-        for j in range(counts[number]):
-            sorted_arr[index] = number
-            index += 1
+PREFIX_DEPTH = 8
+INDEX_TYPE = "I"
 
-    if isinstance(in_arr, bytes):
-        return bytes(sorted_arr)
 
-    return sorted_arr
+def rotation_sort(string):
+    """Sort the cyclic rotations of a byte string without creating them.
+    Rotations are ranked by their first PREFIX_DEPTH bytes, and unresolved
+    groups are then refined by prefix doubling: the order of the rotations
+    starting at i is decided by the rank of the rotation starting at i + step.
+    Only groups with equal ranks are sorted again. A group is finished when
+    the rotations step bytes further all belong to the group itself, because
+    its rotations are then identical, as in a run of the same byte.
+    :param string: bytes-like input.
+    :return: array of rotation start indices in sorted order.
+    """
+    length = len(string)
+    order = array(INDEX_TYPE)
+    if length == 0:
+        return order
+    keys = _prefix_keys(string, length)
+    order.extend(sorted(range(length), key=keys.__getitem__))
+    rank = array(INDEX_TYPE, bytes(length * order.itemsize))
+    groups = _split_groups(order, rank, 0, [keys[i] for i in order])
+    del keys
+    step = PREFIX_DEPTH
+    while groups and step < length:
+        shift = step - length
+        unsorted = []
+        for start, end in groups:
+            if end - start == 2:
+                if _sort_pair(order, rank, start, shift):
+                    unsorted.append((start, end))
+                continue
+            members = order[start:end]
+            shifted = [rank[i + shift] for i in members]
+            low, high = min(shifted), max(shifted)
+            if low == high:
+                if low != start:
+                    unsorted.append((start, end))
+                continue
+            pairs = sorted(zip(shifted, members))
+            order[start:end] = array(INDEX_TYPE, [i for _, i in pairs])
+            unsorted.extend(_split_groups(order, rank, start,
+                                          [key for key, _ in pairs]))
+        groups = unsorted
+        step *= 2
+    return order
 
 
-def merge_sort(array):
-    """Sort an array using merge sort. Array is sorted in-place.
-    :param array: input array for sorting.
+def _prefix_keys(string, length):
+    """Read the first PREFIX_DEPTH bytes of every rotation as an integer.
+    :param string: bytes-like input.
+    :param length: length of the input.
+    :return: array of big-endian integer keys, one for each rotation.
     """
-    length = len(array)
-    temp = [None] * length
-    width = 1
-    while width < length:
-        left = 0
-        while left < length:
-            merge(array, left, min(left + width, length),
-                  min(left + 2 * width, length), temp)
-            left += 2 * width
-        width *= 2
-        for left, _ in enumerate(temp):
-            array[left] = temp[left]
+    extended = bytes(string)
+    while len(extended) < length + PREFIX_DEPTH:
+        extended += bytes(string)
+    keys = array("Q", bytes(length * PREFIX_DEPTH))
+    for phase in range(PREFIX_DEPTH):
+        count = (length - phase + PREFIX_DEPTH - 1) // PREFIX_DEPTH
+        words = array("Q", extended[phase:phase + count * PREFIX_DEPTH])
+        if sys.byteorder == "little":
+            words.byteswap()
+        keys[phase::PREFIX_DEPTH] = words
+    return keys
 
 
-def merge(arr, left, mid, right, temp_arr):
-    """Merge two arrays.
-    :param arr: input array.
-    :param left: left bound for first half.
-    :param mid: right bound for first half, left bound for second half.
-    :param right: right bound for second half.
-    :param temp_arr: working array for the output.
+def _split_groups(order, rank, start, keys):
+    """Give every run of equal keys a rank, which is the position of the run.
+    :param order: rotation indices, sorted from position start onwards.
+    :param rank: rank array to update.
+    :param start: position of the first sorted index in order.
+    :param keys: sorted keys for the indices in order[start:].
+    :return: list of (start, end) positions of runs longer than one.
     """
-    l = left
-    r = mid
-
-    for i in range(left, right):
-        if l < mid and (r >= right or arr[l] <= arr[r]):
-            temp_arr[i] = arr[l]
-            l += 1
+    groups = []
+    size = len(keys)
+    group_start = 0
+    prev = keys[0]
+    for offset in range(1, size + 1):
+        if offset < size and keys[offset] == prev:
+            continue
+        position = start + group_start
+        if offset - group_start > 1:
+            groups.append((position, start + offset))
+            for index in order[position:start + offset]:
+                rank[index] = position
         else:
-            temp_arr[i] = arr[r]
-            r += 1
+            rank[order[position]] = position
+        if offset < size:
+            prev = keys[offset]
+            group_start = offset
+    return groups
+
+
+
+def _sort_pair(order, rank, start, shift):
+    """Sort a group of two rotations by the ranks step bytes further.
+    :param order: rotation indices.
+    :param rank: rank array to update.
+    :param start: position of the group in order.
+    :param shift: step minus input length, used as a wrapping offset.
+    :return: True if the rotations still compare equal and are not known to
+    be identical.
+    """
+    first, second = order[start], order[start + 1]
+    key_1, key_2 = rank[first + shift], rank[second + shift]
+    if key_1 == key_2:
+        return key_1 != start
+    if key_1 > key_2:
+        order[start], order[start + 1] = second, first
+        rank[first] = start + 1
+    else:
+        rank[second] = start + 1
+    return False
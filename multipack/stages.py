@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+#  -*- coding: utf-8 -*-
+
+"""Chunked stage protocol for the compression pipelines.
+
+A stage is a function which takes an iterable of byte chunks and returns an
+iterator of byte chunks. A chunk is any bytes-like object: bytes, bytearray or
+memoryview, and it may have any length, also zero. Stages must not keep
+references to the chunks they have consumed, because the producer may reuse
+the memory. Stages are chained with pipeline().
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+CHUNK_SIZE = 64 * 1024
+
+
+def read_chunks(stream, size=CHUNK_SIZE):
+    """Read a binary stream in chunks.
+    :param stream: binary stream to read.
+    :param size: size of the read calls.
+    :return: generator of chunks.
+    """
+    chunk = stream.read(size)
+    while chunk:
+        yield chunk
+        chunk = stream.read(size)
+
+
+def write_chunks(chunks, stream):
+    """Write all chunks to a binary stream.
+    :param chunks: iterable of chunks.
+    :param stream: binary stream to write.
+    :return: number of written bytes.
+    """
+    written = 0
+    for chunk in chunks:
+        stream.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def pipeline(chunks, *stages):
+    """Chain stages, so that each one consumes the output of the previous one.
+    :param chunks: iterable of chunks for the first stage.
+    :param stages: stage functions.
+    :return: iterator of chunks from the last stage.
+    """
+    for stage in stages:
+        chunks = stage(chunks)
+    return chunks
+
+
+def regroup(chunks, size):
+    """Regroup chunks to blocks of the given size. Only the last block may be
+    shorter.
+    :param chunks: iterable of chunks.
+    :param size: length of the blocks.
+    :return: generator of bytes blocks.
+    """
+    buffer = bytearray()
+    for chunk in chunks:
+        if not buffer and len(chunk) == size:
+            yield bytes(chunk)
+            continue
+        buffer += chunk
+        while len(buffer) >= size:
+            yield bytes(buffer[:size])
+            del buffer[:size]
+    if buffer:
+        yield bytes(buffer)
+
+
+def read_exact(source, count, buffer):
+    """Read count bytes from a chunk iterator.
+    :param source: iterator of chunks.
+    :param count: number of bytes to read.
+    :param buffer: bytearray of read but unused bytes, updated in place.
+    :return: read bytes, shorter than count if the iterator ran out.
+    """
+    while len(buffer) < count:
+        chunk = next(source, None)
+        if chunk is None:
+            break
+        buffer += chunk
+    next_bytes = bytes(buffer[:count])
+    del buffer[:count]
+    return next_bytes
+
+
+def parallel_map(function, items, jobs):
+    """Map a function over items in a process pool, keeping the order.
+    At most two items for each worker are submitted ahead of the result being
+    yielded, so the memory use is bounded also for long inputs.
+    :param function: picklable function of one argument.
+    :param items: iterable of arguments.
+    :param jobs: number of worker processes.
+    :return: generator of results in the order of the items.
+    """
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = deque()
+        for item in items:
+            if len(pending) >= 2 * jobs:
+                yield pending.popleft().result()
+            pending.append(executor.submit(function, item))
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+#  -*- coding: utf-8 -*-
+
+"""Tests for the compression functions for other programs."""
+
+import unittest
+import io
+import os
+import tempfile
+
+import multipack
+from multipack.api import *
+
+
+class TestApi(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with open("LICENSE", "rb") as f:
+            cls.data = f.read()
+
+    def test_package_exports(self):
+        self.assertIs(compress, multipack.compress)
+        self.assertIs(decompress_file, multipack.decompress_file)
+
+    def test_bwt(self):
+        self.assertEqual(self.data, decompress(compress(self.data)))
+
+    def test_lzw(self):
+        encoded = compress(self.data, "lzw", max_bits=12, reset=True)
+        self.assertEqual(self.data, decompress(encoded))
+
+    def test_empty(self):
+        self.assertEqual(b"", decompress(compress(b"", "lzw")))
+
+    def test_block_size(self):
+        encoded = compress(self.data * 200, "bwt", block_size=100 * 1024)
+        self.assertEqual(self.data * 200, decompress(encoded, jobs=2))
+
+    def test_fm_index(self):
+        plain = compress(self.data)
+        self.assertGreater(len(compress(self.data, fm_index=True)),
+                           len(plain))
+
+    def test_not_compressed(self):
+        with self.assertRaises(ValueError):
+            decompress(self.data)
+
+    def test_stream_sizes(self):
+        encoded = io.BytesIO()
+        sizes = compress_stream(io.BytesIO(self.data), encoded, "lzw")
+        self.assertEqual((len(self.data), len(encoded.getvalue())), sizes)
+
+    def test_stream_from_start(self):
+        with io.BytesIO(compress(self.data, "lzw")) as stream, \
+                io.BytesIO() as output:
+            stream.seek(10)
+            decompress_stream(stream, output)
+            self.assertEqual(self.data, output.getvalue())
+
+    def test_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            name = os.path.join(directory, "data")
+            with open(name, "wb") as f:
+                f.write(self.data)
+            self.assertEqual(name + ".lzw", compress_file(name, codec="lzw"))
+            self.assertTrue(os.path.exists(name))
+            os.remove(name)
+            self.assertEqual(name, decompress_file(name + ".lzw"))
+            with open(name, "rb") as f:
+                self.assertEqual(self.data, f.read())
+
+    def test_file_unknown_suffix(self):
+        with self.assertRaises(ValueError):
+            decompress_file("data.gz")
+
+    def test_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            compress(self.data, "zip")
+
+    def test_invalid_options(self):
+        with self.assertRaises(ValueError):
+            compress(self.data, "lzw", max_bits=20)
+        with self.assertRaises(ValueError):
+            compress(self.data, "bwt", block_size=10)
+        with self.assertRaises(ValueError):
+            compress(self.data, "bwt", reset=True)
+        with self.assertRaises(ValueError):
+            compress(self.data, "lzw", fm_index=True)
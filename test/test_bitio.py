@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+#  -*- coding: utf-8 -*-
+
+"""Tests for bit writing and reading."""
+
+import unittest
+
+from multipack.bitio import *
+from multipack.bitio import _pack_numpy, _pack_string, _unpack_numpy, \
+    _unpack_string
+
+
+class TestBitIo(unittest.TestCase):
+
+    def test_write_bytes(self):
+        writer = BitWriter()
+        for byte in b"abc":
+            writer.write(byte, 8)
+        self.assertEqual(b"abc", writer.flush())
+
+    def test_write_padding(self):
+        writer = BitWriter()
+        writer.write(0b101, 3)
+        writer.write(0b1, 1)
+        self.assertEqual(b"\xb0", writer.flush())
+
+    def test_write_12_bits(self):
+        writer = BitWriter()
+        writer.write(55, 12)
+        writer.write(4000, 12)
+        self.assertEqual(bytes([0b11, 0b1111111, 0b10100000]),
+                         writer.flush())
+
+    def test_take(self):
+        writer = BitWriter()
+        writer.write(0x1ff, 9)
+        self.assertEqual(b"\xff", writer.take())
+        writer.write(0, 7)
+        self.assertEqual(b"\x80", writer.take())
+        self.assertEqual(b"", writer.flush())
+
+    def test_read(self):
+        reader = BitReader([b"\x03\x7f", b"\xa0"])
+        self.assertEqual(55, reader.read(12))
+        self.assertEqual(4000, reader.read(12))
+        self.assertIsNone(reader.read(1))
+
+    def test_read_padding(self):
+        reader = BitReader([b"\xff\x80"])
+        self.assertEqual(0x1ff, reader.read(9))
+        self.assertIsNone(reader.read(9))
+
+    def test_round_trip(self):
+        values = [(value * 7919) % (1 << width) for value, width in
+                  zip(range(5000), [9, 10, 16, 1, 3, 12] * 1000)]
+        widths = [9, 10, 16, 1, 3, 12] * 1000
+        writer = BitWriter()
+        chunks = []
+        for value, width in zip(values, widths):
+            writer.write(value, width)
+            chunks.append(writer.take())
+        chunks.append(writer.flush())
+        reader = BitReader(chunks)
+        self.assertEqual(values, [reader.read(width) for width in
+                                  widths[:len(values)]])
+
+    def test_write_many(self):
+        writer = BitWriter()
+        writer.write(1, 1)
+        writer.write_many([55, 4000], 12)
+        writer.write_many([], 12)
+        writer.write_many([0x7f], 7)
+        expected = BitWriter()
+        for value, width in ((1, 1), (55, 12), (4000, 12), (0x7f, 7)):
+            expected.write(value, width)
+        self.assertEqual(expected.flush(), writer.flush())
+
+    def test_read_many(self):
+        writer = BitWriter()
+        writer.write_many(list(range(300)), 9)
+        writer.write_many([65535, 1], 16)
+        reader = BitReader([writer.flush()])
+        self.assertEqual([0, 1], reader.read_many(2, 9))
+        self.assertEqual(list(range(2, 300)), reader.read_many(298, 9))
+        self.assertEqual([65535, 1], reader.read_many(5, 16))
+        self.assertEqual([], reader.read_many(5, 16))
+
+    def test_unread(self):
+        writer = BitWriter()
+        writer.write_many([1, 256, 300, 5, 7], 9)
+        reader = BitReader([writer.flush()])
+        values = reader.read_many(4, 9)
+        reader.unread(values[2:], 9)
+        self.assertEqual([300, 5, 7], reader.read_many(3, 9))
+
+    def test_feed(self):
+        reader = BitReader(())
+        reader.feed(b"\xff")
+        self.assertEqual([], reader.read_many(1, 9))
+        reader.feed(b"\x80")
+        self.assertEqual([511], reader.read_many(1, 9))
+
+    def test_pack_string(self):
+        self.assertEqual(3 << 10 | 1020, _pack_string([3, 1020], 10))
+        self.assertEqual([3, 1020], _unpack_string(3 << 10 | 1020, 2, 10))
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_pack_numpy_matches_string(self):
+        values = [(value * 7919) % 8192 for value in range(1000)]
+        packed = _pack_string(values, 13)
+        self.assertEqual(packed, _pack_numpy(values, 13))
+        self.assertEqual(values, _unpack_numpy(packed, 1000, 13))
+        self.assertEqual(values, _unpack_string(packed, 1000, 13))
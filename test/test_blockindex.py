@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+#  -*- coding: utf-8 -*-
+
+"""Tests for the trailing block index."""
+
+import unittest
+import io
+
+from multipack.blockindex import *
+
+
+class TestBlockIndex(unittest.TestCase):
+
+    def test_index_empty(self):
+        with io.BytesIO() as stream:
+            IndexWriter(stream).write_index()
+            self.assertEqual([], read_index(stream))
+
+    def test_no_index(self):
+        with io.BytesIO(b"abc") as stream:
+            self.assertIsNone(read_index(stream))
+
+    def test_no_index_long(self):
+        with io.BytesIO(b"compressed data without index") as stream:
+            self.assertIsNone(read_index(stream))
+
+    def test_index_entries(self):
+        with io.BytesIO() as stream:
+            writer = IndexWriter(stream)
+            writer.write_block(b"abc", 10)
+            writer.write_block(b"de", 20)
+            writer.write_index(b"\x00")
+            self.assertEqual(b"abcde\x00", stream.getvalue()[:6])
+            expected = [IndexEntry(0, 3, 10), IndexEntry(3, 2, 20)]
+            self.assertEqual(expected, read_index(stream))
+
+    def test_index_offset(self):
+        with io.BytesIO() as stream:
+            stream.write(b"head")
+            writer = IndexWriter(stream, 4)
+            writer.write_block(b"abc", 10)
+            writer.write_index()
+            self.assertEqual([IndexEntry(4, 3, 10)], read_index(stream))
+
+    def test_index_length(self):
+        with io.BytesIO() as stream:
+            stream.write(b"head")
+            writer = IndexWriter(stream, 4)
+            writer.write_block(b"abc", 10)
+            length = writer.write_index(b"\x00\x00")
+            self.assertEqual(len(stream.getvalue()), length)
+
+    def test_output_offsets(self):
+        entries = [IndexEntry(0, 3, 10), IndexEntry(3, 2, 20)]
+        self.assertEqual([0, 10, 30], output_offsets(entries))
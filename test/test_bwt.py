@@ -7,59 +7,128 @@ import unittest
 import io
 
 from multipack.bwt import *
-from multipack.bwt import _create_table, _find_decoded
+from multipack.bwt import _inverse_lf, _inverse_numpy, numpy
+from multipack.blockindex import read_index
+from multipack.huffman import huffman_decode
+from multipack.stages import read_chunks
 
 
 class TestBwt(unittest.TestCase):
 
     def test_bwt_len(self):
         with open("LICENSE", "rb") as f:
-            length = len([i for i in bwt_encode(f)])
-            self.assertEqual(1065, length)
+            length = len(b"".join(bwt_encode(read_chunks(f))))
+            self.assertEqual(1061 + BLOCK_HEADER.size, length)
 
     def test_bwt_empty(self):
         with io.BytesIO(b"") as stream:
-            encoded = b"".join(bwt_encode(stream))
-            self.assertEqual(b"\x03\x02", encoded)
+            encoded = b"".join(bwt_encode(read_chunks(stream)))
+            self.assertEqual(b"", encoded)
 
     def test_bwt_short(self):
         with io.BytesIO(b"a") as stream:
-            encoded = b"".join(bwt_encode(stream))
-            self.assertEqual(b"\x03a\x02", encoded)
+            encoded = b"".join(bwt_encode(read_chunks(stream)))
+            self.assertEqual(b"\x00\x00\x00\x01\x00\x00\x00\x00a", encoded)
 
     def test_bwt_short2(self):
         with io.BytesIO(b"ab") as stream:
-            encoded = b"".join(bwt_encode(stream))
-            self.assertEqual(b"\x03b\x02a", encoded)
+            encoded = b"".join(bwt_encode(read_chunks(stream)))
+            self.assertEqual(b"\x00\x00\x00\x02\x00\x00\x00\x00ba", encoded)
+
+    def test_bwt_primary_index(self):
+        with io.BytesIO(b"banana") as stream:
+            encoded = b"".join(bwt_encode(read_chunks(stream)))
+            self.assertEqual(b"\x00\x00\x00\x06\x00\x00\x00\x03nnbaaa",
+                             encoded)
+
+    def test_bwt_blocks(self):
+        with io.BytesIO(b"abcde") as stream:
+            encoded = b"".join(bwt_encode(read_chunks(stream), 3))
+            self.assertEqual(b"\x00\x00\x00\x03\x00\x00\x00\x00cab"
+                             b"\x00\x00\x00\x02\x00\x00\x00\x00ed", encoded)
 
     def test_bwt_decode_empty(self):
-        decoded = bwt_decode(bytes([i]) for i in b"\x03\x02")
+        decoded = bwt_decode(iter([]))
         self.assertEqual(b"", b"".join(decoded))
 
     def test_bwt_decode_short(self):
-        decoded = bwt_decode(bytes([i]) for i in b"\x03ilimo\x02yit k")
+        encoded = b"\x00\x00\x00\x0a\x00\x00\x00\x04lmioiyit k"
+        decoded = bwt_decode(bytes([i]) for i in encoded)
         self.assertEqual(b"kyl toimii", b"".join(decoded))
 
+    def test_bwt_decode_truncated(self):
+        encoded = b"\x00\x00\x00\x0a\x00\x00\x00\x04lmioi"
+        with self.assertRaises(ValueError):
+            b"".join(bwt_decode(bytes([i]) for i in encoded))
+
+    def test_bwt_binary(self):
+        string = bytes(range(256)) * 4 + b"\x03\x02\x00"
+        encoded = bwt_encode([string], 100)
+        self.assertEqual(string, b"".join(bwt_decode(encoded)))
+
     def test_bwt_enc_and_decode(self):
         string = b"kyl toimii"
-        encoded = bwt_encode(io.BytesIO(string))
+        encoded = bwt_encode([string])
+        self.assertEqual(string, b"".join(bwt_decode(encoded)))
+
+    def test_bwt_repetitive(self):
+        string = b"\x00" * 5000 + b"ab" * 3000
+        encoded = bwt_encode([string])
         self.assertEqual(string, b"".join(bwt_decode(encoded)))
 
-    def test_create_table_empty(self):
-        table = _create_table("")
-        self.assertEqual([], table)
+    def test_encode_block(self):
+        string = b"kyl toimii"
+        self.assertEqual(string, decode_block(
+            b"".join(huffman_decode([encode_block(string)]))))
+
+    def test_encode_blocks_empty(self):
+        self.assertEqual([], list(encode_blocks([b""])))
+
+    def test_encode_blocks_independent(self):
+        string = b"banana bandana " * 100
+        frames = list(encode_blocks([string], 600))
+        self.assertEqual(3, len(frames))
+        self.assertEqual(frames[0], encode_block(string[:600]))
+        self.assertEqual(string, b"".join(decode_blocks(frames)))
+
+    def test_inverse_lf(self):
+        self.assertEqual(b"banana", _inverse_lf(b"nnbaaa", 3))
+
+    def test_inverse_lf_short(self):
+        self.assertEqual(b"a", _inverse_lf(b"a", 0))
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_inverse_numpy(self):
+        self.assertEqual(b"banana", _inverse_numpy(b"nnbaaa", 3))
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_inverse_numpy_short(self):
+        self.assertEqual(b"a", _inverse_numpy(b"a", 0))
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_inverse_numpy_matches_lf(self):
+        with open("LICENSE", "rb") as f:
+            encoded = b"".join(bwt_encode(read_chunks(f)))
+        last_column = encoded[BLOCK_HEADER.size:]
+        primary = BLOCK_HEADER.unpack(encoded[:BLOCK_HEADER.size])[1]
+        self.assertEqual(_inverse_lf(last_column, primary),
+                         _inverse_numpy(last_column, primary))
+
+    def test_mtf_empty(self):
+        self.assertEqual(b"", mtf_enc(b""))
 
-    def test_create_table_short(self):
-        table = _create_table("a")
-        self.assertEqual(["a"], table)
+    def test_mtf_one_char(self):
+        self.assertEqual(b"a", mtf_enc(b"a"))
 
-    def test_create_table_short_2(self):
-        table = _create_table("abcde")
-        self.assertEqual(["abcde", "bcdea", "cdeab", "deabc", "eabcd"], table)
+    def test_mtf_short(self):
+        self.assertEqual(b"\x01\x01\x00\x02", mtf_enc(b"\x01\x00\x00\x02"))
 
-    def test_find_etx(self):
-        table = [b"fo\x02o", b"bar\x03"]
-        self.assertEqual(b"bar\x03", _find_decoded(table))
+    def test_mtf_runs(self):
+        self.assertEqual(b"b\x00\x00b\x00\x01", mtf_enc(b"bbbaab"))
+
+    def test_mtf_enc_dec(self):
+        inp = bytes(range(256)) + b"banana" * 10
+        self.assertEqual(inp, mtf_enc_dec(inp))
 
     def test_rle_empty(self):
         input = b""
@@ -85,11 +154,29 @@ class TestBwt(unittest.TestCase):
         inp = b"a" * 256
         self.assertEqual(b"a\xffa\x01", rle_enc(inp))
 
+    def test_rle_encoding_chunks(self):
+        chunks = [b"aa", b"ab", b"", b"bbbc"]
+        self.assertEqual(b"a\x03b\x04c\x01", b"".join(rle_encode(chunks)))
+
+    def test_rle_encoding_buffers(self):
+        inp = b"x" * (RLE_BUFFER_SIZE + 300) + b"yz" * 1000
+        encoded = b"".join(rle_encode([inp[:100], inp[100:]]))
+        self.assertEqual(inp, rle_dec(encoded))
+        self.assertEqual(rle_enc(inp), encoded)
+
+    def test_rle_decoding_buffers(self):
+        inp = bytes(range(256)) * 1000
+        self.assertEqual(inp, rle_enc_dec(inp))
+
     def test_rle_decoding_empty(self):
         input = b""
         expected = b""
         self.assertEqual(expected, rle_dec(input))
 
+    def test_rle_decoding_truncated(self):
+        with self.assertRaises(ValueError):
+            b"".join(rle_decode([b"a\x02b", b"\x01c"]))
+
     def test_rle_decoding_short(self):
         input = b"a\x01"
         expected = b"a"
@@ -134,29 +221,80 @@ class TestBwt(unittest.TestCase):
         inp = b"aaaaaaaabbbcifjejiefieeeeeeeeee" + (b"p" * 10)
         self.assertEqual(inp, bwt_rle_combined(inp))
 
+    def test_compressobj(self):
+        with open("LICENSE", "rb") as f:
+            data = f.read()
+        compressor = compressobj(300)
+        encoded = b"".join(compressor.compress(data[start:start + 100])
+                           for start in range(0, len(data), 100))
+        encoded += compressor.flush()
+        with self.assertRaises(ValueError):
+            compressor.flush()
+        with io.BytesIO(encoded) as stream:
+            self.assertEqual(data, b"".join(decode_blocks(read_chunks(
+                stream))))
+            self.assertEqual([300, 300, 300, 161],
+                             [entry.original_length
+                              for entry in read_index(stream)])
+
+    def test_decompressobj(self):
+        with open("LICENSE", "rb") as f:
+            data = f.read()
+        compressor = compressobj(300)
+        encoded = compressor.compress(data) + compressor.flush()
+        decompressor = decompressobj()
+        output = []
+        for start in range(0, len(encoded), 50):
+            output.append(decompressor.decompress(encoded[start:start + 50],
+                                                  200))
+            while not decompressor.needs_input and not decompressor.eof:
+                output.append(decompressor.decompress(b"", 200))
+        output.append(decompressor.flush())
+        self.assertTrue(all(len(piece) <= 200 for piece in output))
+        self.assertEqual(data, b"".join(output))
+        self.assertTrue(decompressor.eof)
+        self.assertEqual(encoded[-len(decompressor.unused_data):],
+                         decompressor.unused_data)
+
+    def test_decompressobj_truncated(self):
+        compressor = compressobj()
+        encoded = compressor.compress(b"banana") + compressor.flush()
+        decompressor = decompressobj()
+        decompressor.decompress(encoded[:20])
+        with self.assertRaises(ValueError):
+            decompressor.flush()
+
 
 def bwt_rle_combined(bytes_input):
     with io.BytesIO(bytes_input) as input_stream:
-        bwt_encoded = bwt_encode(input_stream)
-        rle_encoded = rle_encode(bwt_encoded)
+        bwt_encoded = bwt_encode(read_chunks(input_stream))
+        rle_encoded = b"".join(rle_encode(bwt_encoded))
         with io.BytesIO(rle_encoded) as rle_stream:
-            bwt_enc = b"".join(rle_decode(rle_stream))
+            bwt_enc = b"".join(rle_decode(read_chunks(rle_stream)))
             bwt_decoded = bwt_decode(bytes([i]) for i in bwt_enc)
             return b"".join(bwt_decoded)
 
 
+def mtf_enc(bytes_input):
+    return b"".join(mtf_encode([bytes_input]))
+
+
+def mtf_enc_dec(bytes_input):
+    return b"".join(mtf_decode(bytes([i]) for i in mtf_enc(bytes_input)))
+
+
 def rle_enc_dec(bytes_input):
-    encoded = rle_encode(bytes([i]) for i in bytes_input)
+    encoded = b"".join(rle_encode(bytes([i]) for i in bytes_input))
     with io.BytesIO(encoded) as stream:
-        decoded = b"".join(rle_decode(stream))
+        decoded = b"".join(rle_decode(read_chunks(stream)))
         return decoded
 
 
 def rle_dec(bytes_input):
     with io.BytesIO(bytes_input) as stream:
-        decoded = b"".join(rle_decode(stream))
+        decoded = b"".join(rle_decode(read_chunks(stream)))
         return decoded
 
 
 def rle_enc(bytes_input):
-    return rle_encode(bytes([i]) for i in bytes_input)
+    return b"".join(rle_encode(bytes([i]) for i in bytes_input))
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+#  -*- coding: utf-8 -*-
+
+"""Tests for the command line interface."""
+
+import unittest
+import os
+import tempfile
+from contextlib import redirect_stdout
+from unittest import mock
+import io
+
+from multipack.cli import *
+
+
+class _Terminal(io.BytesIO):
+    """Output which looks like a terminal."""
+
+    def isatty(self):
+        return True
+
+
+class TestCli(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with open("LICENSE", "rb") as f:
+            cls.data = f.read()
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.name = os.path.join(self.directory.name, "data")
+        self._write(self.name, self.data)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _write(self, name, data):
+        with open(name, "wb") as f:
+            f.write(data)
+
+    def _main(self, *argv):
+        with redirect_stdout(io.StringIO()) as output:
+            main(list(argv))
+        return output.getvalue()
+
+    def _pipe(self, data, *argv):
+        """Run main with data in the standard input, in the directory of the
+        test file, and return the standard output.
+        """
+        stdin = io.TextIOWrapper(io.BytesIO(data))
+        stdout = io.TextIOWrapper(io.BytesIO())
+        directory = os.getcwd()
+        os.chdir(self.directory.name)
+        try:
+            with mock.patch("sys.stdin", stdin), \
+                    mock.patch("sys.stdout", stdout):
+                main(list(argv))
+        finally:
+            os.chdir(directory)
+        stdout.flush()
+        return stdout.buffer.getvalue()
+
+    def test_parse_args(self):
+        args = parse_args(["--lzw", "-j", "2", "a", "b"])
+        self.assertEqual(["a", "b"], args.filenames)
+        self.assertTrue(args.lzw)
+        self.assertEqual(2, args.jobs)
+
+    def test_round_trip(self):
+        for codec in ("--lzw", "--bwt"):
+            self._main(codec, self.name)
+            self.assertFalse(os.path.exists(self.name))
+            self._main(self.name + codec[1:].replace("-", "."))
+            with open(self.name, "rb") as f:
+                self.assertEqual(self.data, f.read())
+
+    def test_pipe_round_trip(self):
+        for codec in ("--lzw", "--bwt"):
+            compressed = self._pipe(self.data, codec)
+            self.assertNotEqual(self.data, compressed)
+            self.assertEqual(self.data, self._pipe(compressed))
+            self.assertEqual(self.data, self._pipe(compressed, "-"))
+            self.assertEqual(["data"], os.listdir(self.directory.name))
+
+    def test_pipe_with_dash(self):
+        compressed = self._pipe(self.data * 50, "--bwt", "-")
+        self.assertEqual(self.data * 50, self._pipe(compressed, "-"))
+        self.assertEqual(["data"], os.listdir(self.directory.name))
+
+    def test_process_file(self):
+        args = parse_args(["--bwt"])
+        result = process_file(self.name, args)
+        self.assertEqual("compress", result.action)
+        self.assertEqual(len(self.data), result.original_size)
+        self.assertEqual(os.stat(self.name + ".bwt").st_size,
+                         result.compressed_size)
+        self.assertFalse(result.failed)
+
+    def test_process_file_not_compressed(self):
+        result = process_file(self.name, parse_args([]))
+        self.assertTrue(result.failed)
+        self.assertTrue(os.path.exists(self.name))
+
+    def test_process_file_missing(self):
+        result = process_file(self.name + "x", parse_args(["--lzw"]))
+        self.assertTrue(result.failed)
+
+    def test_recursive(self):
+        subdirectory = os.path.join(self.directory.name, "sub")
+        os.mkdir(subdirectory)
+        other = os.path.join(subdirectory, "other")
+        self._write(other, self.data[:100])
+        output = self._main("--lzw", "-r", self.directory.name)
+        self.assertIn("Compressed 2 files", output)
+        self.assertTrue(os.path.exists(other + ".lzw"))
+        self._main("-r", self.directory.name)
+        with open(other, "rb") as f:
+            self.assertEqual(self.data[:100], f.read())
+
+    def test_recursive_skips_compressed(self):
+        self._main("--lzw", self.name)
+        other = os.path.join(self.directory.name, "other")
+        self._write(other, self.data[:100])
+        output = self._main("--lzw", "-r", self.directory.name)
+        self.assertIn("Compressed 1 files", output)
+        self.assertIn("Skipped 1 files", output)
+        self.assertTrue(os.path.exists(self.name + ".lzw"))
+        self.assertFalse(os.path.exists(self.name))
+        self.assertTrue(os.path.exists(other + ".lzw"))
+
+    def test_terminal_output(self):
+        terminal = io.TextIOWrapper(_Terminal())
+        with redirect_stdout(terminal):
+            result = cli_stream(self.name, parse_args(["-c", "--lzw"]))
+            self.assertTrue(result.failed)
+            self._main("--lzw", self.name)
+            result = cli_stream(self.name + ".lzw", parse_args(["-c"]))
+        self.assertFalse(result.failed)
+        self.assertEqual(self.data, terminal.buffer.getvalue())
+
+    def test_report_file_sizes(self):
+        self._write(self.name, self.data * 4)
+        compressed = self._main("-v", "--lzw", "-r", self.directory.name)
+        uncompressed = self._main("-v", "-r", self.directory.name)
+        self.assertIn("compressed 4.1 KB -> ", compressed)
+        self.assertIn(" -> 4.1 KB", uncompressed)
+
+    def test_damaged_file_leaves_no_output(self):
+        self._main("--lzw", self.name)
+        with open(self.name + ".lzw", "r+b") as f:
+            f.seek(40)
+            byte = f.read(1)[0]
+            f.seek(40)
+            f.write(bytes([byte ^ 0xff]))
+        result = process_file(self.name + ".lzw", parse_args([]))
+        self.assertTrue(result.failed)
+        self.assertFalse(os.path.exists(self.name))
+        self.assertTrue(os.path.exists(self.name + ".lzw"))
+
+    def test_failed_file_exit_status(self):
+        with self.assertRaises(SystemExit) as context:
+            self._main("--lzw", self.name, self.name + "x")
+        self.assertEqual(1, context.exception.code)
+        self.assertTrue(os.path.exists(self.name + ".lzw"))
+
+    def test_empty_file(self):
+        self._write(self.name, b"")
+        output = self._main("-v", "--lzw", self.name)
+        self.assertIn("Compression ratio: -", output)
+
+    def test_test_damaged(self):
+        self._main("--bwt", self.name)
+        with open(self.name + ".bwt", "r+b") as f:
+            f.seek(100)
+            byte = f.read(1)[0]
+            f.seek(100)
+            f.write(bytes([byte ^ 0xff]))
+        with self.assertRaises(SystemExit):
+            self._main("-t", self.name + ".bwt")
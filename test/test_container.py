@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+#  -*- coding: utf-8 -*-
+
+"""Tests for the container format."""
+
+import unittest
+import io
+
+from multipack.container import *
+from multipack.blockindex import read_index
+
+
+def _container(data, codec="lzw", block_size=300):
+    if codec == "lzw":
+        params = LzwParams(block_size, 16, False)
+    else:
+        params = BwtParams(block_size, 0)
+    encoded = io.BytesIO()
+    with io.BytesIO(data) as stream:
+        compress_stream(stream, encoded, codec, params)
+    return encoded.getvalue()
+
+
+def _damage(encoded, offset):
+    damaged = bytearray(encoded)
+    damaged[offset] ^= 0xff
+    return io.BytesIO(damaged)
+
+
+class _Pipe(io.BytesIO):
+    """Stream which can't be seeked, like the standard input."""
+
+    def seekable(self):
+        return False
+
+    def seek(self, *args):
+        raise io.UnsupportedOperation("seek")
+
+
+class TestContainer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with open("LICENSE", "rb") as f:
+            cls.data = f.read()
+
+    def _uncompress(self, stream, skip_corrupted=False):
+        with io.BytesIO() as output:
+            skipped = uncompress_stream(stream, output, skip_corrupted)
+            return output.getvalue(), skipped
+
+    def test_header(self):
+        header = file_header("lzw", LzwParams(1024, 12, True))
+        with io.BytesIO(header) as stream:
+            read = read_file_header(stream)
+        self.assertEqual("lzw", read.codec)
+        self.assertEqual(LzwParams(1024, 12, True), read.params)
+        self.assertEqual(len(header), read.size)
+
+    def test_header_extra_params(self):
+        header = bytearray(file_header("bwt", BwtParams(100, 8)))
+        header[7] += 2
+        with io.BytesIO(bytes(header) + b"\x00\x00") as stream:
+            read = read_file_header(stream)
+        self.assertEqual(BwtParams(100, 8), read.params)
+        self.assertEqual(len(header) + 2, read.size)
+
+    def test_header_not_container(self):
+        with self.assertRaises(ValueError):
+            read_file_header(io.BytesIO(b"LZW\x10"))
+
+    def test_header_unknown_version(self):
+        header = bytearray(file_header("lzw", LzwParams(1024, 12, False)))
+        header[4] = VERSION + 1
+        with self.assertRaises(ValueError):
+            read_file_header(io.BytesIO(header))
+
+    def test_header_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            file_header("zip", BwtParams(100, 0))
+
+    def test_lzw(self):
+        encoded = _container(self.data)
+        self.assertEqual((self.data, []),
+                         self._uncompress(io.BytesIO(encoded)))
+
+    def test_bwt(self):
+        encoded = _container(self.data, "bwt")
+        self.assertEqual((self.data, []),
+                         self._uncompress(io.BytesIO(encoded)))
+
+    def test_compress_sizes(self):
+        encoded = io.BytesIO()
+        with io.BytesIO(self.data) as stream:
+            sizes = compress_stream(stream, encoded, "bwt",
+                                    BwtParams(300, 0))
+        self.assertEqual((len(self.data), len(encoded.getvalue())), sizes)
+
+    def test_uncompress_not_seekable(self):
+        encoded = _container(self.data, "bwt")
+        self.assertEqual((self.data, []), self._uncompress(_Pipe(encoded)))
+
+    def test_uncompress_parallel(self):
+        encoded = _container(self.data)
+        with io.BytesIO() as output:
+            uncompress_stream(_Pipe(encoded), output, jobs=2)
+            self.assertEqual(self.data, output.getvalue())
+
+    def test_empty(self):
+        encoded = _container(b"")
+        self.assertEqual((b"", []), self._uncompress(io.BytesIO(encoded)))
+
+    def test_index(self):
+        encoded = _container(self.data)
+        index = read_index(io.BytesIO(encoded))
+        self.assertEqual(4, len(index))
+        self.assertEqual(300, index[0].original_length)
+        self.assertEqual(len(self.data) % 300, index[-1].original_length)
+
+    def test_frame_round_trip(self):
+        frame = encode_frame(b"abc", bytes)
+        self.assertEqual(FRAME_HEADER.size + 3, len(frame))
+        self.assertEqual(b"abc", decode_frame(frame, bytes))
+
+    def test_frame_payload_damaged(self):
+        frame = bytearray(encode_frame(b"abc", bytes))
+        frame[-1] ^= 1
+        with self.assertRaises(ValueError):
+            frame_payload(bytes(frame))
+
+    def test_frame_decoded_damaged(self):
+        frame = encode_frame(b"abc", bytes)
+        with self.assertRaises(ValueError):
+            decode_frame(frame, lambda payload: payload + b"d")
+
+    def test_frame_truncated(self):
+        frame = encode_frame(b"abc", bytes)
+        with self.assertRaises(ValueError):
+            decode_frame(frame[:-1], bytes)
+
+    def test_damaged_block_raises(self):
+        encoded = _container(self.data)
+        with self.assertRaises(ValueError):
+            self._uncompress(_damage(encoded, 100))
+
+    def test_skip_corrupted(self):
+        encoded = _container(self.data)
+        index = read_index(io.BytesIO(encoded))
+        output, skipped = self._uncompress(
+            _damage(encoded, index[1].offset + 30), True)
+        self.assertEqual([1], skipped)
+        self.assertEqual(self.data[:300] + self.data[600:], output)
+
+    def test_skip_corrupted_frame_header(self):
+        encoded = _container(self.data, "bwt")
+        index = read_index(io.BytesIO(encoded))
+        output, skipped = self._uncompress(
+            _damage(encoded, index[2].offset + 4), True)
+        self.assertEqual([2], skipped)
+        self.assertEqual(self.data[:600] + self.data[900:], output)
+
+    def test_verify(self):
+        encoded = _container(self.data, "bwt")
+        self.assertEqual([], verify(io.BytesIO(encoded)))
+        index = read_index(io.BytesIO(encoded))
+        errors = verify(_damage(encoded, index[3].offset + 40))
+        self.assertEqual([3], [number for number, _ in errors])
+
+    def test_verify_parallel(self):
+        encoded = _container(self.data)
+        index = read_index(io.BytesIO(encoded))
+        errors = verify(_damage(encoded, index[0].offset + 20), jobs=2)
+        self.assertEqual([0], [number for number, _ in errors])
+
+    def test_verify_not_seekable(self):
+        encoded = _container(self.data)
+        index = read_index(io.BytesIO(encoded))
+        damaged = _damage(encoded, index[2].offset + 20).getvalue()
+        errors = verify(_Pipe(damaged))
+        self.assertEqual([2], [number for number, _ in errors])
+
+    def test_detect(self):
+        self.assertEqual("lzw", detect(io.BytesIO(_container(self.data))))
+        self.assertEqual("bwt",
+                         detect(io.BytesIO(_container(self.data, "bwt"))))
+        self.assertIsNone(detect(io.BytesIO(self.data)))
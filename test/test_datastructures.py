@@ -4,52 +4,17 @@
 """Tests for data structures."""
 
 import unittest
-from multipack.datastructures import Node, LinkedList, HashTable, DynamicArray
+from multipack.datastructures import HashTable, DynamicArray, TypedArray
 
 
 class TestDatastructures(unittest.TestCase):
 
-    def test_node_creation(self):
-        node = Node(1, 2)
-        self.assertEqual(2, node.data)
-
-    def test_node_comparison_1(self):
-        node_1 = Node(1, 1)
-        node_2 = Node(2, 2)
-        node_3 = Node(3, 3)
-        node_4 = Node(4, 4)
-        node_5 = Node(5, 5)
-        node_5_2 = Node(5, 5)
-        self.assertTrue(node_1 < node_2)
-        self.assertEqual(node_5, node_5_2)
-        self.assertTrue(node_4 > node_3)
-
-    def test_linked_list_creation(self):
-        linked_list = LinkedList()
-        self.assertIsNone(linked_list.first)
-
-    def test_linked_list_(self):
-        linked_list = LinkedList()
-        self.assertIsNone(linked_list.first)
-
-    def test_linked_list_add_last(self):
-        linked_list = LinkedList()
-        linked_list.add_last("k", 1)
-        linked_list.add_last("o", 2)
-
-        self.assertEqual(1, linked_list.first.data)
-
-    def test_linked_list_small(self):
-        linked_list = LinkedList()
-        for i in range(1, 5):
-            linked_list.add_first(i, i)
-        total = 0
-        node = linked_list.first
-        while node is not None:
-            total += node.data
-            node = node.next
-
-        self.assertEqual(10, total)
+    def test_hash_table_get(self):
+        hash_table = HashTable()
+        hash_table[1 << 8 | 65] = 300
+        self.assertEqual(300, hash_table.get(321))
+        self.assertIsNone(hash_table.get(322))
+        self.assertEqual(-1, hash_table.get("x", -1))
 
     def test_hash_table_length_same_keys(self):
         hash_table = HashTable()
@@ -69,6 +34,29 @@ class TestDatastructures(unittest.TestCase):
             hash_table[i] = i
         self.assertEqual(4096, len(hash_table))
 
+    def test_hash_table_grows(self):
+        hash_table = HashTable()
+        for i in range(100000):
+            hash_table[i << 8 | 65] = i
+        self.assertEqual(100000, len(hash_table))
+        self.assertGreaterEqual(len(hash_table.keys), 200000)
+        self.assertEqual(54321, hash_table[54321 << 8 | 65])
+        self.assertNotIn(54321 << 8 | 66, hash_table)
+
+    def test_hash_table_size_hint(self):
+        hash_table = HashTable(1000)
+        keys = hash_table.keys
+        for i in range(-500, 500):
+            hash_table[i] = -i
+        self.assertIs(keys, hash_table.keys)
+        self.assertEqual(500, hash_table[-500])
+
+    def test_hash_table_iter(self):
+        hash_table = HashTable()
+        for key in ("a", "b", 3, (4, 5)):
+            hash_table[key] = key
+        self.assertEqual({"a", "b", 3, (4, 5)}, set(hash_table))
+
     def test_hash_table_same_key_value_does_change(self):
         hash_table = HashTable()
         hash_table["ab"] = 3
@@ -117,3 +105,58 @@ class TestDatastructures(unittest.TestCase):
         for i in range(33):
             dyn_arr.append("k")
         self.assertEqual(33, len(dyn_arr))
+
+    def test_typed_array_grows(self):
+        typed = TypedArray("I")
+        for i in range(100):
+            typed.append(i * 1000)
+        self.assertEqual(100, len(typed))
+        self.assertEqual(99000, typed[99])
+
+    def test_typed_array_initial(self):
+        typed = TypedArray("B", 300, range(256))
+        self.assertEqual(300, len(typed))
+        self.assertEqual(255, typed[255])
+        self.assertEqual(0, typed[299])
+
+    def test_typed_array_bytes_storage(self):
+        typed = TypedArray("B")
+        typed.extend(b"abc")
+        self.assertIsInstance(typed.array, bytearray)
+        self.assertEqual(b"abc", bytes(typed[:]))
+
+    def test_typed_array_extend(self):
+        typed = TypedArray("H", 0, [1, 2])
+        typed.extend(range(3, 40))
+        self.assertEqual(list(range(1, 40)), list(typed))
+
+    def test_typed_array_slice(self):
+        typed = TypedArray("I", 0, range(50))
+        self.assertEqual([45, 46, 47, 48, 49], list(typed[45:]))
+        self.assertEqual([0, 10, 20], list(typed[:30:10]))
+
+    def test_typed_array_negative_index(self):
+        typed = TypedArray("I", 0, range(20))
+        self.assertEqual(19, typed[-1])
+        typed[-2] = 7
+        self.assertEqual(7, typed[18])
+
+    def test_typed_array_index_error(self):
+        typed = TypedArray("I", 5)
+        with self.assertRaises(IndexError):
+            typed[5]
+        with self.assertRaises(IndexError):
+            typed[-6]
+
+    def test_typed_array_set_grows(self):
+        typed = TypedArray("H")
+        typed[40] = 3
+        self.assertEqual(41, len(typed))
+        self.assertEqual(3, typed[40])
+
+    def test_typed_array_memoryview(self):
+        typed = TypedArray("I", 0, range(10))
+        view = typed.memoryview()
+        self.assertEqual(10, len(view))
+        view[3] = 300
+        self.assertEqual(300, typed[3])
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+#  -*- coding: utf-8 -*-
+
+"""Tests for the FM-index of BWT blocks."""
+
+import unittest
+import re
+
+from multipack.fmindex import *
+from multipack.huffman import LENGTHS_SIZE
+from multipack.sorting import rotation_sort
+
+
+def _index(block, sample_rate=4, segment_rows=SEGMENT_ROWS):
+    return FmIndex(encode_search_block(block, sample_rate, segment_rows))
+
+
+def _positions(block, pattern):
+    return [match.start() for match in
+            re.finditer(b"(?=" + re.escape(pattern) + b")", block)]
+
+
+class TestFmIndex(unittest.TestCase):
+
+    def test_count(self):
+        index = _index(b"abracadabra")
+        self.assertEqual(5, index.count(b"a"))
+        self.assertEqual(2, index.count(b"abra"))
+        self.assertEqual(0, index.count(b"abc"))
+
+    def test_locate(self):
+        index = _index(b"abracadabra")
+        self.assertEqual([0, 7], index.locate(b"abra"))
+        self.assertEqual([4], index.locate(b"cad"))
+        self.assertEqual([], index.locate(b"x"))
+
+    def test_no_wrap_around(self):
+        index = _index(b"banana")
+        self.assertEqual(0, index.count(b"ab"))
+        self.assertEqual([], index.locate(b"ab"))
+        self.assertEqual(2, index.count(b"ana"))
+
+    def test_pattern_longer_than_block(self):
+        index = _index(b"aaa")
+        self.assertEqual(0, index.count(b"aaaa"))
+        self.assertEqual([], index.locate(b"aaaa"))
+
+    def test_repeated_block(self):
+        for block in (b"\x00" * 100, b"abc" * 30, b"abab"):
+            index = _index(block)
+            for pattern in (block[:1], block[:2], block[:7], block[1:4]):
+                self.assertEqual(_positions(block, pattern),
+                                 index.locate(pattern))
+                self.assertEqual(len(_positions(block, pattern)),
+                                 index.count(pattern))
+
+    def test_head_and_tail(self):
+        index = _index(b"mississippi")
+        self.assertEqual(b"miss", index.head(4))
+        self.assertEqual(b"ppi", index.tail(3))
+        self.assertEqual(b"mississippi", index.head(20))
+        self.assertEqual(b"mississippi", index.tail(20))
+
+    def test_many_segments(self):
+        block = bytes(range(256)) * 40 + b"needle" + b"x" * 5000 + b"needle"
+        index = _index(block, 32, 1000)
+        self.assertEqual(_positions(block, b"needle"),
+                         index.locate(b"needle"))
+        for pattern in (b"\x00\x01", b"xx", b"\xff\x00"):
+            self.assertEqual(len(_positions(block, pattern)),
+                             index.count(pattern))
+        self.assertEqual(block[:300], index.head(300))
+        self.assertEqual(block[-300:], index.tail(300))
+
+    def test_samples_have_only_rows(self):
+        block = bytes(range(256)) * 40
+        order = rotation_sort(block)
+        last_column = bytes([block[start - 1] for start in order])
+        samples = build_samples(block, order, last_column, 32)
+        rows = (256 + 31) // 32
+        self.assertEqual(SAMPLES_HEADER.size + (rows * 14 + 7) // 8,
+                         len(samples))
+
+    def test_count_decodes_few_segments(self):
+        with open("LICENSE", "rb") as f:
+            block = f.read() * 10
+        index = _index(block, 64, 100)
+        self.assertEqual(len(_positions(block, b"Software")),
+                         index.count(b"Software"))
+        self.assertLess(len(index.decoded), len(index.segments) // 4)
+
+    def test_decode(self):
+        block = bytes(range(256)) * 10 + b"x" * 2000
+        for segment_rows in (7, 1000, SEGMENT_ROWS):
+            encoded = encode_search_block(block, 32, segment_rows)
+            self.assertEqual(block, decode_search_block(encoded))
+
+    def test_truncated(self):
+        encoded = encode_search_block(b"abcdef" * 100, 2, 100)
+        for end in (10, len(encoded) // 2, len(encoded) - 1):
+            with self.assertRaises(ValueError):
+                decode_search_block(encoded[:end])
+
+    def test_corrupted_counts(self):
+        encoded = bytearray(encode_search_block(b"abcdef", 2))
+        encoded[SEARCH_HEADER.size + LENGTHS_SIZE + ALPHABET_SIZE +
+                SEGMENT_ENTRY.size + 1] ^= 1
+        with self.assertRaises(ValueError):
+            FmIndex(bytes(encoded))
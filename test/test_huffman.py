@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+#  -*- coding: utf-8 -*-
+
+"""Tests for Huffman coding."""
+
+import unittest
+import io
+
+from multipack.huffman import *
+from multipack.huffman import _encode_frame, _decode_frame, _pack_lengths, \
+    _unpack_lengths
+from multipack.stages import read_chunks
+
+
+class TestHuffman(unittest.TestCase):
+
+    def test_code_lengths_empty(self):
+        self.assertEqual([0, 0], code_lengths([0, 0]))
+
+    def test_code_lengths_one_symbol(self):
+        self.assertEqual([0, 1, 0], code_lengths([0, 5, 0]))
+
+    def test_code_lengths_short(self):
+        self.assertEqual([1, 2, 2], code_lengths([4, 1, 2]))
+
+    def test_code_lengths_limited(self):
+        fibonacci = [1, 1]
+        for i in range(30):
+            fibonacci.append(fibonacci[-1] + fibonacci[-2])
+        lengths = code_lengths(fibonacci)
+        self.assertEqual(MAX_CODE_LENGTH, max(lengths))
+        self.assertEqual(1, sum(2 ** -length for length in lengths))
+
+    def test_canonical_codes(self):
+        self.assertEqual([0b0, 0b10, 0b11], canonical_codes([1, 2, 2]))
+
+    def test_canonical_codes_by_symbol(self):
+        self.assertEqual([0b10, 0b0, 0b11], canonical_codes([2, 1, 2]))
+
+    def test_pack_lengths(self):
+        lengths = list(range(16)) * 16
+        self.assertEqual(lengths, _unpack_lengths(_pack_lengths(lengths)))
+
+    def test_encode_frame(self):
+        lengths = [0] * 256
+        lengths[ord("a")] = 1
+        lengths[ord("b")] = 1
+        self.assertEqual(b"\x60", _encode_frame(b"abba", lengths))
+
+    def test_decode_frame(self):
+        lengths = [0] * 256
+        lengths[ord("a")] = 1
+        lengths[ord("b")] = 1
+        self.assertEqual(b"abba", _decode_frame(b"\x60", lengths, 4))
+
+    def test_huffman_empty(self):
+        self.assertEqual(b"", huffman_enc_dec(b""))
+
+    def test_huffman_one_char(self):
+        self.assertEqual(b"a", huffman_enc_dec(b"a"))
+
+    def test_huffman_one_symbol(self):
+        self.assertEqual(b"a" * 100, huffman_enc_dec(b"a" * 100))
+
+    def test_huffman_short(self):
+        inp = b"banana bandana"
+        self.assertEqual(inp, huffman_enc_dec(inp))
+
+    def test_huffman_every_byte(self):
+        inp = bytes(range(256)) * 3 + b"\x00" * 500
+        self.assertEqual(inp, huffman_enc_dec(inp))
+
+    def test_huffman_frames(self):
+        inp = b"aaaabbbcc" * 20
+        frames = [encode_frame(inp[start:start + 50])
+                  for start in range(0, len(inp), 50)]
+        decoded = huffman_decode(iter(frames))
+        self.assertEqual(inp, b"".join(decoded))
+
+    def test_huffman_end_marker(self):
+        encoded = encode_frame(b"abc") + END_MARKER + b"index"
+        self.assertEqual(b"abc", b"".join(huffman_decode([encoded])))
+
+    def test_huffman_smaller(self):
+        with open("LICENSE", "rb") as f:
+            data = f.read()
+        encoded = encode_frame(data)
+        self.assertLess(len(encoded), len(data))
+
+    def test_huffman_truncated(self):
+        encoded = encode_frame(b"banana bandana")
+        with io.BytesIO(encoded[:-1]) as stream:
+            with self.assertRaises(ValueError):
+                b"".join(huffman_decode(read_chunks(stream)))
+
+    def test_decode_whole_frame(self):
+        frame = encode_frame(b"banana bandana")
+        self.assertEqual(b"banana bandana", decode_frame(frame))
+        with self.assertRaises(ValueError):
+            decode_frame(frame[:-1])
+
+    def test_decode_zero_lengths(self):
+        frame = bytearray(encode_frame(b"banana"))
+        frame[FRAME_HEADER.size:FRAME_HEADER.size + LENGTHS_SIZE] = \
+            bytes(LENGTHS_SIZE)
+        with self.assertRaises(ValueError):
+            decode_frame(bytes(frame))
+
+    def test_decode_invalid_lengths(self):
+        lengths = [0] * 256
+        lengths[ord("a")] = lengths[ord("b")] = lengths[ord("c")] = 1
+        frame = bytearray(encode_frame(b"abc"))
+        frame[FRAME_HEADER.size:FRAME_HEADER.size + LENGTHS_SIZE] = \
+            _pack_lengths(lengths)
+        with self.assertRaises(ValueError):
+            decode_frame(bytes(frame))
+
+    def test_decode_empty_frame(self):
+        self.assertEqual(b"", decode_frame(encode_frame(b"")))
+
+    def test_parts(self):
+        parts = [b"aaaab", b"", b"cbcbcbd", bytes(range(256))]
+        lengths, encoded = encode_parts(parts)
+        self.assertEqual(LENGTHS_SIZE, len(lengths))
+        decode = part_decoder(lengths)
+        for part, codes in reversed(list(zip(parts, encoded))):
+            self.assertEqual(part, decode(codes, len(part)))
+
+
+def huffman_enc_dec(bytes_input):
+    encoded = encode_frame(bytes_input)
+    with io.BytesIO(encoded) as stream:
+        return b"".join(huffman_decode(read_chunks(stream)))
@@ -5,6 +5,7 @@
 
 import unittest
 import io
+import random
 
 import multipack.lzw as lzw
 
@@ -16,8 +17,8 @@ class TestLzw(unittest.TestCase):
         with open("LICENSE", "rb") as in_stream:
             lzw_compressor = lzw.Lzw(in_stream)
             with open("test_output.lzw", "wb") as out_stream:
-                for byte in lzw_compressor.compress():
-                    out_stream.write(bytes([byte]))
+                for chunk in lzw_compressor.compress():
+                    out_stream.write(chunk)
 
     def test_lzw_example_empty_dict(self):
         with io.StringIO("") as empty_stream:
@@ -31,6 +32,250 @@ class TestLzw(unittest.TestCase):
             lzw_encoder.compress()
             self.assertEqual(len(lzw_encoder.dictionary), 256)
 
+    def test_lzw_codes(self):
+        with io.BytesIO(b"TOBEORNOTTOBEORTOBEORNOT") as stream:
+            codes = list(lzw.Lzw(stream).lzw())
+        self.assertEqual([84, 79, 66, 69, 79, 82, 78, 79, 84, 256, 258, 260,
+                          265, 259, 261, 263], codes)
+
+    def test_lzw_codes_empty(self):
+        with io.BytesIO(b"") as stream:
+            self.assertEqual([], list(lzw.Lzw(stream).lzw()))
+
+    def test_lzw_dictionary_limit(self):
+        with io.BytesIO(bytes(range(256)) * 40) as stream:
+            lzw_encoder = lzw.Lzw(stream, 9)
+            codes = list(lzw_encoder.lzw())
+        self.assertEqual(512, len(lzw_encoder.dictionary))
+        self.assertTrue(all(code < 512 for code in codes))
+
+    def test_lzw_round_trip_run_at_start(self):
+        for data in (b"aaaaaaa", b"aaab", b"a", b"ab"):
+            with io.BytesIO(data) as stream:
+                encoded = b"".join(lzw.Lzw(stream).compress())
+            with io.BytesIO(encoded) as stream:
+                self.assertEqual(data, b"".join(lzw.Lzw(stream).uncompress()))
+
+    def test_lzw_round_trip_many_chunks(self):
+        data = bytes(range(256)) * 300 + b"abc" * 50000
+        with io.BytesIO(data) as stream:
+            chunks = list(lzw.Lzw(stream).compress())
+        self.assertGreater(len(chunks), 1)
+        with io.BytesIO(b"".join(chunks)) as stream:
+            decoded = list(lzw.Lzw(stream).uncompress())
+        self.assertGreater(len(decoded), 1)
+        self.assertEqual(data, b"".join(decoded))
+
+    def test_lzw_header(self):
+        with io.BytesIO(b"abc") as stream:
+            encoded = b"".join(lzw.Lzw(stream, 12).compress())
+        self.assertEqual(b"LZW\x0c", encoded[:lzw.HEADER.size])
+
+    def test_lzw_empty(self):
+        with io.BytesIO(b"") as stream:
+            encoded = b"".join(lzw.Lzw(stream).compress())
+        with io.BytesIO(encoded) as stream:
+            self.assertEqual(b"", b"".join(lzw.Lzw(stream).uncompress()))
+
+    def test_lzw_code_width_grows(self):
+        with io.BytesIO(bytes(range(256)) * 2) as stream:
+            encoded = b"".join(lzw.Lzw(stream).compress())
+        # 257 codes fit in 9 bits, then the dictionary has 512 entries and
+        # the last 127 codes take 10 bits
+        self.assertEqual(lzw.HEADER.size + (257 * 9 + 127 * 10 + 7) // 8,
+                         len(encoded))
+
+    def test_lzw_round_trip_max_bits(self):
+        data = bytes(range(256)) * 300 + b"abcd" * 3000
+        for max_bits in (9, 12, 16):
+            with io.BytesIO(data) as stream:
+                encoded = b"".join(lzw.Lzw(stream, max_bits).compress())
+            with io.BytesIO(encoded) as stream:
+                self.assertEqual(data,
+                                 b"".join(lzw.Lzw(stream).uncompress()))
+
+    def test_lzw_uncompress_tables(self):
+        with io.BytesIO(b"TOBEORNOTTOBEORTOBEORNOT") as stream:
+            encoded = b"".join(lzw.Lzw(stream).compress())
+        lzw_decoder = lzw.Lzw(io.BytesIO(encoded))
+        self.assertEqual(b"TOBEORNOTTOBEORTOBEORNOT",
+                         b"".join(lzw_decoder.uncompress()))
+        # entry 265 is "TOB": prefix 256 "TO" and last byte "B"
+        self.assertEqual(256, lzw_decoder.prefixes[265])
+        self.assertEqual(ord("B"), lzw_decoder.last_bytes[265])
+        self.assertEqual(3, lzw_decoder.lengths[265])
+        self.assertEqual(271, lzw_decoder.index)
+
+    def test_lzw_long_run(self):
+        data = b"a" * 100000
+        with io.BytesIO(data) as stream:
+            encoded = b"".join(lzw.Lzw(stream, 9).compress())
+        with io.BytesIO(encoded) as stream:
+            self.assertEqual(data, b"".join(lzw.Lzw(stream).uncompress()))
+
+    def test_width_runs(self):
+        self.assertEqual([(9, 0, 257), (10, 257, 769), (11, 769, 1000)],
+                         list(lzw._width_runs(0, 1000, 16)))
+        self.assertEqual([(9, 0, 7), (10, 7, 10)],
+                         list(lzw._width_runs(250, 10, 16)))
+        self.assertEqual([(10, 0, 10)], list(lzw._width_runs(766, 10, 10)))
+
+    def test_width_runs_reset(self):
+        self.assertEqual([(9, 0, 256), (10, 256, 300)],
+                         list(lzw._width_runs(0, 300, 16, lzw.FIRST_CODE)))
+
+    def test_lzw_codes_reset(self):
+        with io.BytesIO(b"TOBEORNOTTOBEORTOBEORNOT") as stream:
+            codes = list(lzw.Lzw(stream, reset=True).lzw())
+        self.assertEqual([84, 79, 66, 69, 79, 82, 78, 79, 84, 257, 259, 261,
+                          266, 260, 262, 264], codes)
+
+    def test_lzw_header_reset(self):
+        with io.BytesIO(b"abc") as stream:
+            encoded = b"".join(lzw.Lzw(stream, 12, True).compress())
+        self.assertEqual(b"LZW\x8c", encoded[:lzw.HEADER.size])
+
+    def test_lzw_reset_when_ratio_drops(self):
+        data = b"abc" * 100000 + bytes(range(256)) * 1000
+        with io.BytesIO(data) as stream:
+            codes = list(lzw.Lzw(stream, 9, True).lzw())
+        self.assertIn(lzw.CLEAR, codes)
+        with io.BytesIO(data) as stream:
+            plain = b"".join(lzw.Lzw(stream, 9).compress())
+        with io.BytesIO(data) as stream:
+            encoded = b"".join(lzw.Lzw(stream, 9, True).compress())
+        self.assertLess(len(encoded), len(plain))
+        with io.BytesIO(encoded) as stream:
+            lzw_decoder = lzw.Lzw(stream)
+            self.assertEqual(data, b"".join(lzw_decoder.uncompress()))
+        self.assertTrue(lzw_decoder.reset)
+
+    def test_lzw_reset_after_random_data(self):
+        with io.open("LICENSE", "rb") as f:
+            text = f.read() * 200
+        generator = random.Random(1)
+        noise = bytes(generator.getrandbits(8) for _ in range(100000))
+        data = text + noise + text
+        with io.BytesIO(data) as stream:
+            plain = b"".join(lzw.Lzw(stream, 12).compress())
+        with io.BytesIO(data) as stream:
+            encoded = b"".join(lzw.Lzw(stream, 12, True).compress())
+        self.assertLessEqual(len(encoded), len(plain))
+        with io.BytesIO(encoded) as stream:
+            self.assertEqual(data, b"".join(lzw.Lzw(stream).uncompress()))
+
+    def test_lzw_round_trip_reset(self):
+        data = (bytes(range(256)) * 300 + b"abcd" * 30000 +
+                bytes(range(255, -1, -1)) * 300)
+        for max_bits in (9, 12, 16):
+            with io.BytesIO(data) as stream:
+                encoded = b"".join(lzw.Lzw(stream, max_bits, True).compress())
+            with io.BytesIO(encoded) as stream:
+                self.assertEqual(data,
+                                 b"".join(lzw.Lzw(stream).uncompress()))
+
+    def test_lzw_corrupted_code_after_clear(self):
+        with io.BytesIO(b"LZW\x90\x30\xc0\x25\x80") as stream:
+            with self.assertRaises(ValueError):
+                b"".join(lzw.Lzw(stream).uncompress())
+
+    def test_lzw_segmented(self):
+        data = bytes(range(256)) * 300 + b"abcd" * 30000
+        frames = [lzw.compress_segment(data[start:start + 50000], 12, True)
+                  for start in range(0, len(data), 50000)]
+        encoded = (lzw.file_header(12, True, True) + b"".join(frames) +
+                   lzw.SEGMENTS_END + b"index")
+        with io.BytesIO(encoded) as stream:
+            decoded = list(lzw.Lzw(stream).uncompress())
+        self.assertEqual(len(frames), len(decoded))
+        self.assertEqual(data, b"".join(decoded))
+        self.assertEqual(data[50000:100000],
+                         lzw.uncompress_segment(frames[1], 12, True))
+
+    def test_lzw_segment_wrong_length(self):
+        frame = bytearray(lzw.compress_segment(b"abcabcabc"))
+        frame[3] += 1
+        with self.assertRaises(ValueError):
+            lzw.uncompress_segment(bytes(frame))
+        with self.assertRaises(ValueError):
+            lzw.uncompress_segment(bytes(frame[:-1]))
+
+    def test_read_header(self):
+        self.assertEqual((12, True, True),
+                         lzw.read_header(lzw.file_header(12, True, True)))
+        self.assertEqual((16, False, False),
+                         lzw.read_header(lzw.file_header(16)))
+        with self.assertRaises(ValueError):
+            lzw.read_header(b"LZW")
+
+    def test_lzw_invalid_max_bits(self):
+        with self.assertRaises(ValueError):
+            lzw.Lzw(io.BytesIO(), 17)
+        with self.assertRaises(ValueError):
+            lzw.Lzw(io.BytesIO(), 8)
+
+    def test_lzw_not_lzw_data(self):
+        with io.BytesIO(b"BWT\x10abcdef") as stream:
+            with self.assertRaises(ValueError):
+                b"".join(lzw.Lzw(stream).uncompress())
+
+    def test_lzw_corrupted_code(self):
+        with io.BytesIO(b"LZW\x10\xff\xff\xff") as stream:
+            with self.assertRaises(ValueError):
+                b"".join(lzw.Lzw(stream).uncompress())
+
+    def test_compressobj(self):
+        data = bytes(range(256)) * 300 + b"abcd" * 30000
+        with io.BytesIO(data) as stream:
+            expected = b"".join(lzw.Lzw(stream, 12).compress())
+        compressor = lzw.compressobj(12)
+        pieces = [compressor.compress(data[start:start + 1000])
+                  for start in range(0, len(data), 1000)]
+        self.assertEqual(expected, b"".join(pieces) + compressor.flush())
+        with self.assertRaises(ValueError):
+            compressor.compress(b"abc")
+
+    def test_decompressobj(self):
+        data = bytes(range(256)) * 300 + b"abcd" * 30000
+        with io.BytesIO(data) as stream:
+            encoded = b"".join(lzw.Lzw(stream, 12, True).compress())
+        decompressor = lzw.decompressobj()
+        output = []
+        for start in range(0, len(encoded), 100):
+            output.append(decompressor.decompress(
+                encoded[start:start + 100], 500))
+            while not decompressor.needs_input:
+                output.append(decompressor.decompress(b"", 500))
+        output.append(decompressor.flush())
+        self.assertTrue(all(len(piece) <= 500 for piece in output[:-1]))
+        self.assertEqual(data, b"".join(output))
+        self.assertTrue(decompressor.eof)
+
+    def test_decompressobj_segmented(self):
+        data = b"abc" * 1000 + b"xyz" * 1000
+        encoded = (lzw.file_header(16, segmented=True) +
+                   lzw.compress_segment(data[:3000]) +
+                   lzw.compress_segment(data[3000:]) + lzw.SEGMENTS_END)
+        decompressor = lzw.decompressobj()
+        output = b"".join(decompressor.decompress(bytes([byte]))
+                          for byte in encoded + b"index")
+        self.assertEqual(data, output)
+        self.assertTrue(decompressor.eof)
+        self.assertEqual(b"index", decompressor.unused_data)
+
+    def test_decompressobj_truncated(self):
+        with io.BytesIO(b"abcabc") as stream:
+            encoded = b"".join(lzw.Lzw(stream).compress())
+        decompressor = lzw.decompressobj()
+        decompressor.decompress(encoded[:2])
+        with self.assertRaises(ValueError):
+            decompressor.flush()
+        decompressor = lzw.decompressobj()
+        decompressor.decompress(lzw.file_header(16, segmented=True) +
+                                lzw.compress_segment(b"abc"))
+        with self.assertRaises(ValueError):
+            decompressor.flush()
+
     def test_lzw_uncompression(self):
         with open("test_output.lzw", "rb") as in_stream:
             lzw_decoder = lzw.Lzw(in_stream)
@@ -55,78 +300,3 @@ class TestLzw(unittest.TestCase):
             with open("test_output", "wb") as outfile:
                 for byte in lzw_decoder.uncompress():
                     outfile.write(byte)
-
-    def test_bit_convert_zeros(self):
-        byte_1, byte_2, byte_3 = lzw._int12_to_int8(0, 0)
-        self.assertEqual(byte_1, 0b0)
-        self.assertEqual(byte_2, 0b0)
-        self.assertEqual(byte_3, 0b0)
-
-    def test_bit_convert_small(self):
-        byte_1, byte_2, byte_3 = lzw._int12_to_int8(1, 1)
-        self.assertEqual(byte_1, 0b0)
-        self.assertEqual(byte_2, 0b10000)
-        self.assertEqual(byte_3, 0b1)
-
-    def test_bit_convert_smallish(self):
-        byte_1, byte_2, byte_3 = lzw._int12_to_int8(8, 8)
-        self.assertEqual(byte_1, 0b0)
-        self.assertEqual(byte_2, 0b10000000)
-        self.assertEqual(byte_3, 0b1000)
-
-    def test_bit_convert_almost_max(self):
-        byte_1, byte_2, byte_3 = lzw._int12_to_int8(4094, 4094)
-        self.assertEqual(byte_1, 0b11111111)
-        self.assertEqual(byte_2, 0b11101111)
-        self.assertEqual(byte_3, 0b11111110)
-
-    def test_bit_convert_max(self):
-        byte_1, byte_2, byte_3 = lzw._int12_to_int8(4095, 4095)
-        self.assertEqual(byte_1, 0b11111111)
-        self.assertEqual(byte_2, 0b11111111)
-        self.assertEqual(byte_3, 0b11111111)
-
-    def test_bit_convert_different_indexes(self):
-        byte_1, byte_2, byte_3 = lzw._int12_to_int8(55, 4000)
-        self.assertEqual(byte_1, 0b11)
-        self.assertEqual(byte_2, 0b1111111)
-        self.assertEqual(byte_3, 0b10100000)
-
-    def test_bit_convert_one_int(self):
-        byte_1, byte_2 = lzw._int12_to_int8(1)
-        self.assertEqual(byte_1, 0b0)
-        self.assertEqual(byte_2, 0b10000)
-
-    def test_bit_convert_one_int_max(self):
-        byte_1, byte_2 = lzw._int12_to_int8(4095)
-        self.assertEqual(byte_1, 0b11111111)
-        self.assertEqual(byte_2, 0b11110000)
-
-    def test_bit_convert_one_int_min(self):
-        byte_1, byte_2 = lzw._int12_to_int8(0)
-        self.assertEqual(byte_1, 0b0)
-        self.assertEqual(byte_2, 0b0)
-
-    def test_bit_convert_one_int_almost_max(self):
-        byte_1, byte_2 = lzw._int12_to_int8(4093)
-        self.assertEqual(byte_1, 0b11111111)
-        self.assertEqual(byte_2, 0b11010000)
-
-    def test_12bit_convert_minimum(self):
-        byte_1 = lzw._int8_to_int12(0b0, 0b0)
-        self.assertEqual(byte_1, 0b0)
-
-    def test_12bit_convert_medium(self):
-        byte_1, byte_2 = lzw._int8_to_int12(0b10, 0b10, 0b10)
-        self.assertEqual(byte_1, 0b100000)
-        self.assertEqual(byte_2, 0b1000000010)
-
-    def test_12bit_convert_maximum(self):
-        byte_1, byte_2 = lzw._int8_to_int12(0b11111111, 0b11111111, 0b11111111)
-        self.assertEqual(byte_1, 0b111111111111)
-        self.assertEqual(byte_2, 0b111111111111)
-
-    def test_12bit_convert_almost_maximum(self):
-        byte_1, byte_2 = lzw._int8_to_int12(0b1111111, 0b1111111, 0b1111111)
-        self.assertEqual(byte_1, 0b11111110111)
-        self.assertEqual(byte_2, 0b111101111111)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+#  -*- coding: utf-8 -*-
+
+"""Tests for the file objects of compressed files."""
+
+import unittest
+import array
+import io
+import os
+import tempfile
+
+import multipack
+from multipack.api import compress, decompress
+from multipack.bwt import MIN_BLOCK_SIZE
+from multipack.mpfile import *
+
+
+def _pipe(data):
+    """Non-seekable stream of bytes."""
+    read, write = os.pipe()
+    os.write(write, data)
+    os.close(write)
+    return io.open(read, "rb", buffering=0)
+
+
+class TestMultipackFile(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with io.open("LICENSE", "rb") as f:
+            cls.data = f.read() * 20
+
+    def _compress(self, data, **options):
+        output = io.BytesIO()
+        with open(output, "wb", **options) as f:
+            f.write(data)
+            self.assertEqual(len(data), f.tell())
+        return output.getvalue()
+
+    def test_package_exports(self):
+        self.assertIs(open, multipack.open)
+        self.assertIs(MultipackFile, multipack.MultipackFile)
+
+    def test_write_read(self):
+        encoded = self._compress(self.data, block_size=MIN_BLOCK_SIZE)
+        self.assertEqual(self.data, decompress(encoded))
+        with open(io.BytesIO(encoded)) as f:
+            self.assertIsInstance(f, io.BufferedIOBase)
+            self.assertEqual(self.data, f.read())
+            self.assertEqual(b"", f.read())
+
+    def test_small_writes(self):
+        output = io.BytesIO()
+        with open(output, "wb", codec="lzw", block_size=100) as f:
+            for start in range(0, len(self.data), 7):
+                f.write(self.data[start:start + 7])
+        self.assertEqual(self.data, decompress(output.getvalue()))
+
+    def test_read_sizes(self):
+        encoded = self._compress(self.data, codec="lzw", block_size=1000)
+        with open(io.BytesIO(encoded)) as f:
+            self.assertEqual(self.data[:1500], f.read(1500))
+            self.assertEqual(self.data[1500:1700], f.read1(200))
+            self.assertEqual(self.data[1700:2000], f.read1())
+            self.assertEqual(2000, f.tell())
+            self.assertEqual(self.data[2000:], f.read(-1))
+
+    def test_readinto(self):
+        encoded = self._compress(self.data, codec="lzw", block_size=1000)
+        output = bytearray()
+        buffer = bytearray(2500)
+        with open(io.BytesIO(encoded)) as f:
+            while True:
+                count = f.readinto(buffer)
+                output += buffer[:count]
+                if count < len(buffer):
+                    break
+            self.assertEqual(0, f.readinto(buffer))
+        self.assertEqual(self.data, output)
+
+    def test_readinto_array(self):
+        with open(io.BytesIO(compress(self.data))) as f:
+            buffer = array.array("I", bytes(400))
+            self.assertEqual(400, f.readinto1(buffer))
+        self.assertEqual(self.data[:400], buffer.tobytes())
+
+    def test_lines(self):
+        encoded = self._compress(self.data, codec="lzw", block_size=100)
+        lines = self.data.splitlines(keepends=True)
+        with open(io.BytesIO(encoded)) as f:
+            self.assertEqual(lines[0][:5], f.readline(5))
+            self.assertEqual(lines[0][5:], f.readline())
+            self.assertEqual(lines[1], f.readline())
+            self.assertEqual(lines[2:], list(f))
+
+    def test_text_mode(self):
+        output = io.BytesIO()
+        with open(output, "wt", encoding="utf-8") as f:
+            f.write("ääkköset\nrivi\n")
+        with open(io.BytesIO(output.getvalue()), "rt",
+                  encoding="utf-8") as f:
+            self.assertEqual(["ääkköset\n", "rivi\n"], f.readlines())
+
+    def test_filename(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "log.bwt")
+            with open(filename, "wb") as f:
+                f.write(self.data)
+            with open(filename) as f:
+                self.assertEqual(self.data, f.read())
+            with self.assertRaises(FileExistsError):
+                open(filename, "xb")
+
+    def test_not_closing_file_object(self):
+        output = io.BytesIO()
+        open(output, "wb").close()
+        self.assertFalse(output.closed)
+        self.assertEqual(b"", decompress(output.getvalue()))
+
+    def test_pipe(self):
+        with _pipe(compress(self.data, "lzw")) as pipe, open(pipe) as f:
+            self.assertEqual(self.data, f.read())
+
+    def test_parallel(self):
+        encoded = compress(self.data, block_size=MIN_BLOCK_SIZE)
+        with open(io.BytesIO(encoded), jobs=2) as f:
+            self.assertEqual(self.data, f.read())
+
+    def test_flush(self):
+        output = io.BytesIO()
+        with open(output, "wb") as f:
+            f.write(b"first")
+            f.flush()
+            self.assertGreater(len(output.getvalue()), 0)
+            f.write(b"second")
+        self.assertEqual(b"firstsecond", decompress(output.getvalue()))
+
+    def test_wrong_direction(self):
+        with open(io.BytesIO(), "wb") as f:
+            self.assertFalse(f.readable())
+            self.assertRaises(io.UnsupportedOperation, f.read)
+        with open(io.BytesIO(compress(b"data"))) as f:
+            self.assertFalse(f.writable())
+            self.assertRaises(io.UnsupportedOperation, f.write, b"data")
+
+    def test_closed(self):
+        f = open(io.BytesIO(compress(b"data")))
+        f.close()
+        self.assertRaises(ValueError, f.read)
+
+    def test_errors(self):
+        self.assertRaises(ValueError, open, io.BytesIO(), "ab")
+        self.assertRaises(ValueError, open, io.BytesIO(), "rbt")
+        self.assertRaises(ValueError, open, io.BytesIO(), "rb",
+                          encoding="utf-8")
+        self.assertRaises(ValueError, open, io.BytesIO(), "wb", max_bits=4,
+                          codec="lzw")
+        self.assertRaises(ValueError, open, io.BytesIO(b"plain data"))
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+#  -*- coding: utf-8 -*-
+
+"""Tests for random access reads on compressed files."""
+
+import unittest
+import io
+
+from multipack.reader import *
+from multipack.blockindex import read_index
+from multipack.container import BwtParams, LzwParams, FRAME_HEADER, \
+    compress_stream
+
+
+def _container(data, codec, params):
+    stream = io.BytesIO()
+    with io.BytesIO(data) as in_stream:
+        compress_stream(in_stream, stream, codec, params)
+    return stream
+
+
+def _bwt_file(data, block_size):
+    return _container(data, "bwt", BwtParams(block_size, 0))
+
+
+class TestSeekableReader(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with open("LICENSE", "rb") as f:
+            cls.data = f.read()
+
+    def test_read_all(self):
+        reader = SeekableReader(_bwt_file(self.data, 100))
+        self.assertEqual(self.data, reader.read())
+        self.assertEqual(len(self.data), reader.size)
+
+    def test_seek_and_read(self):
+        reader = SeekableReader(_bwt_file(self.data, 100))
+        reader.seek(450)
+        self.assertEqual(self.data[450:500], reader.read(50))
+        self.assertEqual(500, reader.tell())
+        reader.seek(-10, io.SEEK_END)
+        self.assertEqual(self.data[-10:], reader.read())
+        self.assertEqual(b"", reader.read(10))
+
+    def test_read_range(self):
+        reader = SeekableReader(_bwt_file(self.data, 100))
+        self.assertEqual(self.data[90:420], reader.read_range(90, 330))
+        self.assertEqual(self.data[-5:], reader.read_range(len(self.data)
+                                                           - 5, 100))
+        self.assertEqual(0, reader.tell())
+
+    def test_read_stops_at_block_end(self):
+        reader = SeekableReader(_bwt_file(self.data, 100))
+        reader.seek(95)
+        self.assertEqual(self.data[95:100], reader.read(50))
+
+    def test_cache_is_bounded(self):
+        reader = SeekableReader(_bwt_file(self.data, 100), 2)
+        for offset in range(0, 500, 100):
+            reader.read_range(offset, 10)
+        self.assertEqual([3, 4], list(reader.cache))
+        reader.read_range(300, 10)
+        self.assertEqual([4, 3], list(reader.cache))
+
+    def test_lzw(self):
+        encoded = _container(self.data, "lzw", LzwParams(100, 16, False))
+        reader = SeekableReader(encoded)
+        self.assertEqual(len(self.data), reader.size)
+        self.assertEqual(self.data[290:310], reader.read_range(290, 20))
+        self.assertEqual([2, 3], list(reader.cache))
+
+    def test_without_index(self):
+        encoded = _bwt_file(self.data, 100)
+        last = read_index(encoded)[-1]
+        end = last.offset + last.length + FRAME_HEADER.size
+        reader = SeekableReader(io.BytesIO(encoded.getvalue()[:end]))
+        self.assertIsNone(reader.index)
+        self.assertEqual(self.data[10:20], reader.read_range(10, 10))
+
+    def test_not_container(self):
+        with self.assertRaises(ValueError):
+            SeekableReader(io.BytesIO(self.data))
+
+    def test_closed(self):
+        reader = SeekableReader(_bwt_file(self.data, 100))
+        reader.close()
+        with self.assertRaises(ValueError):
+            reader.read(1)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+#  -*- coding: utf-8 -*-
+
+"""Tests for searching BWT compressed data."""
+
+import unittest
+import io
+import re
+
+from multipack.search import *
+from multipack.container import BwtParams, LzwParams, compress_stream
+
+
+def _container(data, codec, params):
+    encoded = io.BytesIO()
+    with io.BytesIO(data) as stream:
+        compress_stream(stream, encoded, codec, params)
+    encoded.seek(0)
+    return encoded
+
+
+def _compressed(data, block_size, sample_rate=8):
+    return _container(data, "bwt", BwtParams(block_size, sample_rate))
+
+
+class TestSearch(unittest.TestCase):
+
+    def setUp(self):
+        with open("LICENSE", "rb") as f:
+            self.data = f.read()
+
+    def test_locate(self):
+        for pattern in (b"the", b"Software", b"\n", b"SOFTWARE IS"):
+            expected = [match.start() for match in
+                        re.finditer(b"(?=" + re.escape(pattern) + b")",
+                                    self.data)]
+            with _compressed(self.data, 100) as stream:
+                self.assertEqual(expected, locate(stream, pattern))
+            with _compressed(self.data, 100) as stream:
+                self.assertEqual(len(expected), count(stream, pattern))
+
+    def test_across_blocks(self):
+        with _compressed(b"abcabcabc", 4) as stream:
+            self.assertEqual([0, 3, 6], locate(stream, b"abc"))
+        with _compressed(b"abcabcabc", 4) as stream:
+            self.assertEqual(3, count(stream, b"abc"))
+
+    def test_not_found(self):
+        with _compressed(self.data, 300) as stream:
+            self.assertEqual([], locate(stream, b"zzz"))
+
+    def test_empty_pattern(self):
+        with _compressed(b"abc", 10) as stream:
+            with self.assertRaises(ValueError):
+                locate(stream, b"")
+
+    def test_without_samples(self):
+        with _compressed(b"abc", 10, 0) as stream:
+            with self.assertRaises(ValueError):
+                count(stream, b"a")
+
+    def test_not_bwt(self):
+        params = LzwParams(100, 16, False)
+        with _container(self.data, "lzw", params) as stream:
+            with self.assertRaises(ValueError):
+                count(stream, b"the")
@@ -5,54 +5,44 @@
 
 import unittest
 
-from multipack.sorting import counting_sorted, merge_sort
+from multipack.sorting import rotation_sort
 
 
 class TestSorting(unittest.TestCase):
 
-    def test_empty_arr(self):
-        result = counting_sorted([], 1)
-        self.assertEqual([], result)
-
-    def test_short_arr(self):
-        result = counting_sorted([1], 2)
-        self.assertEqual([1], result)
-
-    def test_medium_arr(self):
-        result = counting_sorted([3, 1, 2], 4)
-        self.assertEqual([1, 2, 3], result)
-
-    def test_medium_arr2(self):
-        arr = [6, 3, 52, 20, 341, 9]
-        expected = [3, 6, 9, 20, 52, 341]
-        self.assertEqual(expected, counting_sorted(arr, 342))
-
-    def test_bytes(self):
-        arr = b"\x00\x05\x02\x01"
-        expected = b"\x00\x01\x02\x05"
-        self.assertEqual(expected, counting_sorted(arr, 6))
-
-    def test_bytes2(self):
-        arr = b"a\x00bc\x02"
-        expected = b"\x00\x02abc"
-        self.assertEqual(expected, counting_sorted(arr, 256))
-
-    def test_merge_empty(self):
-        arr = []
-        merge_sort(arr)
-        self.assertEqual([], arr)
-
-    def test_merge_ints(self):
-        arr = [3, 2, 1]
-        merge_sort(arr)
-        self.assertEqual([1, 2, 3], arr)
-
-    def test_merge_short(self):
-        arr = [b"aaa", b"ccc", b"bbb"]
-        merge_sort(arr)
-        self.assertEqual([b"aaa", b"bbb", b"ccc"], arr)
-
-    def test_merge_short2(self):
-        arr = [b"p", b"a", b"k"]
-        merge_sort(arr)
-        self.assertEqual([b"a", b"k", b"p"], arr)
+    def test_rotation_sort_empty(self):
+        self.assertEqual([], list(rotation_sort(b"")))
+
+    def test_rotation_sort_short(self):
+        self.assertEqual([0], list(rotation_sort(b"a")))
+
+    def test_rotation_sort_short2(self):
+        self.assertEqual([0, 1, 2, 3, 4], list(rotation_sort(b"abcde")))
+
+    def test_rotation_sort_banana(self):
+        self.assertEqual([5, 3, 1, 0, 4, 2], list(rotation_sort(b"banana")))
+
+    def test_rotation_sort_wraps_around(self):
+        self.assertEqual([1, 0], list(rotation_sort(b"ba")))
+
+    def test_rotation_sort_matches_rotations(self):
+        string = b"abracadabra" * 20 + b"\x00\xff" + b"a" * 30
+        rotations = sorted(string[i:] + string[:i] for i in range(len(string)))
+        result = [string[i:] + string[:i] for i in rotation_sort(string)]
+        self.assertEqual(rotations, result)
+
+    def test_rotation_sort_periodic(self):
+        string = b"\x00" * 1000
+        self.assertEqual(list(range(1000)), sorted(rotation_sort(string)))
+
+    def test_rotation_sort_repeated_block(self):
+        string = b"mississippi" * 50
+        rotations = sorted(string[i:] + string[:i] for i in range(len(string)))
+        result = [string[i:] + string[:i] for i in rotation_sort(string)]
+        self.assertEqual(rotations, result)
+
+    def test_rotation_sort_long_run(self):
+        string = b"\x00" * 300 + b"\x01" + b"\x00" * 200
+        rotations = sorted(string[i:] + string[:i] for i in range(len(string)))
+        result = [string[i:] + string[:i] for i in rotation_sort(string)]
+        self.assertEqual(rotations, result)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+#  -*- coding: utf-8 -*-
+
+"""Tests for the chunked stage protocol."""
+
+import unittest
+import io
+
+from multipack.stages import *
+
+
+class TestStages(unittest.TestCase):
+
+    def test_read_chunks_empty(self):
+        with io.BytesIO(b"") as stream:
+            self.assertEqual([], list(read_chunks(stream)))
+
+    def test_read_chunks(self):
+        with io.BytesIO(b"abcde") as stream:
+            chunks = list(read_chunks(stream, 2))
+            self.assertEqual([b"ab", b"cd", b"e"], chunks)
+
+    def test_write_chunks(self):
+        with io.BytesIO() as stream:
+            written = write_chunks([b"ab", b"", bytearray(b"c")], stream)
+            self.assertEqual(3, written)
+            self.assertEqual(b"abc", stream.getvalue())
+
+    def test_pipeline_no_stages(self):
+        self.assertEqual([b"a"], list(pipeline([b"a"])))
+
+    def test_pipeline(self):
+        upper = lambda chunks: (bytes(chunk).upper() for chunk in chunks)
+        double = lambda chunks: (chunk * 2 for chunk in chunks)
+        result = pipeline([b"a", memoryview(b"b")], upper, double)
+        self.assertEqual([b"AA", b"BB"], list(result))
+
+    def test_regroup_empty(self):
+        self.assertEqual([], list(regroup([b"", b""], 3)))
+
+    def test_regroup(self):
+        chunks = [b"a", b"bcdefg", b"", b"hi"]
+        self.assertEqual([b"abc", b"def", b"ghi"], list(regroup(chunks, 3)))
+
+    def test_regroup_short_last(self):
+        self.assertEqual([b"abc", b"d"], list(regroup([b"abcd"], 3)))
+
+    def test_read_exact(self):
+        source = iter([b"ab", b"cde"])
+        buffer = bytearray()
+        self.assertEqual(b"abc", read_exact(source, 3, buffer))
+        self.assertEqual(b"de", read_exact(source, 3, buffer))
+        self.assertEqual(b"", read_exact(source, 3, buffer))
+
+    def test_parallel_map_empty(self):
+        self.assertEqual([], list(parallel_map(abs, [], 2)))
+
+    def test_parallel_map_order(self):
+        items = list(range(-20, 20))
+        self.assertEqual([abs(i) for i in items],
+                         list(parallel_map(abs, iter(items), 2)))